@@ -1,10 +1,10 @@
 import os
+import asyncio
 import openpyxl
 import re
 from lang import translate_text
 import logging
 from openpyxl import load_workbook
-import sqlite3
 from datetime import datetime
 from aiogram import types
 from aiogram.dispatcher import FSMContext
@@ -12,14 +12,14 @@ from aiogram.dispatcher.filters.state import State, StatesGroup
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 from loader import dp, bot
 from config import ADMIN_IDS, DATA_PATH
-from database import (
-    add_firma, check_firma, get_all_firms, save_file, check_file,
-    save_manual_report, get_firma_name, get_user_language, get_firma_info,
-    save_qqs_report, save_yagona_report, verify_owner_phone, get_firm_docs,
-    today_downloads, log_alert, save_firm_docs, log_download,
-    add_firm_owner
-)
-from lang import get_text, get_month_name, translate_text
+import db
+from database import check_firma
+from database import parse_rate_bp, format_rate, apply_rate, report_dir, SOLIQ_YS
+from config import REPORT_YEAR
+import query_stats
+import search_index
+import firm_pages
+from lang import get_text, get_month_name, translate_text, translate_many, translation_cache_stats, MONTHS
 from converters import convert_to_cyrillic, convert_to_latin
 
 logging.basicConfig(level=logging.INFO, filename="bot.log", encoding="utf-8")
@@ -82,6 +82,7 @@ def parse_excel_file(file_path, lang='uz_latin'):
         workbook = openpyxl.load_workbook(file_path)
         sheet = workbook.active
         firms = {}
+        rows = []
         current_stir = None
         current_oy = None
         current_firma_nomi = None
@@ -106,7 +107,7 @@ def parse_excel_file(file_path, lang='uz_latin'):
                 continue
 
             oy = oy.lower()
-            if oy not in ['yanvar', 'fevral', 'mart', 'aprel', 'may', 'iyun', 'iyul']:
+            if oy not in MONTHS:
                 logger.warning(f"Noto'g'ri oy: {oy}")
                 continue
 
@@ -120,21 +121,22 @@ def parse_excel_file(file_path, lang='uz_latin'):
 
             current_stir = str(stir)
             current_oy = oy
-            if lang == 'uz_cyrillic':
-                current_firma_nomi = convert_to_cyrillic(firma_nomi)
-                lavozim = convert_to_cyrillic(lavozim)
-                ism = convert_to_cyrillic(ism)
-            else:
-                current_firma_nomi = translate_text(firma_nomi, lang)
-                lavozim = translate_text(lavozim, lang)
-                ism = translate_text(ism, lang)
+            current_firma_nomi = firma_nomi
+            rows.append((current_stir, current_oy, firma_nomi, lavozim, ism, yil_boshidan, shu_oy))
+
+        # Matnli ustunlar bittadan chaqiruvda tarjima qilinadi
+        firma_nomlari = translate_many([row[2] for row in rows], lang)
+        lavozimlar = translate_many([row[3] for row in rows], lang)
+        ismlar = translate_many([row[4] for row in rows], lang)
 
-            key = (current_stir, current_oy)
+        for row, firma_nomi, lavozim, ism in zip(rows, firma_nomlari, lavozimlar, ismlar):
+            stir, oy, _, _, _, yil_boshidan, shu_oy = row
+            key = (stir, oy)
             if key not in firms:
                 firms[key] = {
-                    'stir': current_stir,
-                    'oy': current_oy,
-                    'firma_nomi': current_firma_nomi,
+                    'stir': stir,
+                    'oy': oy,
+                    'firma_nomi': firma_nomi,
                     'xodimlar': []
                 }
 
@@ -151,6 +153,25 @@ def parse_excel_file(file_path, lang='uz_latin'):
         return None, f"Excel faylni o'qishda xato: {str(e)}"
     
 
+FIRMA_EXCEL_COLUMNS = ['col_stir', 'col_oy', 'col_firma_nomi', 'col_xodim_lavozimi', 'col_ism_familyasi',
+                       'col_yil_boshidan', 'col_shu_oy_oylik']
+
+
+def _write_firma_sheet(sheet, stir, oy, firma_nomi, xodimlar, lang):
+    sheet.append([get_text(lang, key) for key in FIRMA_EXCEL_COLUMNS])
+    lavozimlar = translate_many([xodim['lavozim'] for xodim in xodimlar], lang)
+    ismlar = translate_many([xodim['ism'] for xodim in xodimlar], lang)
+    for i, (xodim, lavozim, ism) in enumerate(zip(xodimlar, lavozimlar, ismlar)):
+        sheet.append([
+            stir if i == 0 else "",
+            get_month_name(lang, oy) if i == 0 else "",
+            translate_text(firma_nomi, lang) if i == 0 else "",
+            lavozim,
+            ism,
+            xodim['yil_boshidan'],
+            xodim['shu_oy']
+        ])
+
 
 def generate_firma_excel(stir, oy, firma_nomi, xodimlar, dest_path_latin, dest_path_cyrillic):
     try:
@@ -158,28 +179,7 @@ def generate_firma_excel(stir, oy, firma_nomi, xodimlar, dest_path_latin, dest_p
         workbook_latin = openpyxl.Workbook()
         sheet_latin = workbook_latin.active
         sheet_latin.title = "Sheet1"
-        headers_latin = [
-            translate_text("STIR", 'uz_latin'),
-            translate_text("Oy", 'uz_latin'),
-            translate_text("Firma nomi", 'uz_latin'),
-            translate_text("Xodim lavozimi", 'uz_latin'),
-            translate_text("Ism Familyasi", 'uz_latin'),
-            translate_text("Yil boshidan", 'uz_latin'),
-            translate_text("Shu Oy uchun oylik", 'uz_latin')
-        ]
-        sheet_latin.append(headers_latin)
-
-        for i, xodim in enumerate(xodimlar):
-            row = [
-                stir if i == 0 else "",
-                get_month_name('uz_latin', oy) if i == 0 else "",
-                translate_text(firma_nomi, 'uz_latin') if i == 0 else "",
-                translate_text(xodim['lavozim'], 'uz_latin'),
-                translate_text(xodim['ism'], 'uz_latin'),
-                xodim['yil_boshidan'],
-                xodim['shu_oy']
-            ]
-            sheet_latin.append(row)
+        _write_firma_sheet(sheet_latin, stir, oy, firma_nomi, xodimlar, 'uz_latin')
 
         os.makedirs(os.path.dirname(dest_path_latin), exist_ok=True)
         workbook_latin.save(dest_path_latin)
@@ -189,28 +189,7 @@ def generate_firma_excel(stir, oy, firma_nomi, xodimlar, dest_path_latin, dest_p
         workbook_cyrillic = openpyxl.Workbook()
         sheet_cyrillic = workbook_cyrillic.active
         sheet_cyrillic.title = "Лист1"
-        headers_cyrillic = [
-            translate_text("STIR", 'uz_cyrillic'),
-            translate_text("Oy", 'uz_cyrillic'),
-            translate_text("Firma nomi", 'uz_cyrillic'),
-            translate_text("Xodim lavozimi", 'uz_cyrillic'),
-            translate_text("Ism Familyasi", 'uz_cyrillic'),
-            translate_text("Yil boshidan", 'uz_cyrillic'),
-            translate_text("Shu Oy uchun oylik", 'uz_cyrillic')
-        ]
-        sheet_cyrillic.append(headers_cyrillic)
-
-        for i, xodim in enumerate(xodimlar):
-            row = [
-                stir if i == 0 else "",
-                get_month_name('uz_cyrillic', oy) if i == 0 else "",
-                translate_text(firma_nomi, 'uz_cyrillic') if i == 0 else "",
-                translate_text(xodim['lavozim'], 'uz_cyrillic'),
-                translate_text(xodim['ism'], 'uz_cyrillic'),
-                xodim['yil_boshidan'],
-                xodim['shu_oy']
-            ]
-            sheet_cyrillic.append(row)
+        _write_firma_sheet(sheet_cyrillic, stir, oy, firma_nomi, xodimlar, 'uz_cyrillic')
 
         os.makedirs(os.path.dirname(dest_path_cyrillic), exist_ok=True)
         workbook_cyrillic.save(dest_path_cyrillic)
@@ -237,24 +216,41 @@ def create_paginated_keyboard(items, callback_prefix, page=1, per_page=10, lang=
             stir, oy, firma_nomi = item
             keyboard.add(InlineKeyboardButton(f"{translate_text(firma_nomi, lang)} ({stir}, {get_month_name(lang, oy)})", callback_data=f"{callback_prefix}_{stir}_{oy}"))
 
+    _add_page_footer(keyboard, callback_prefix, page, total_pages, lang)
+    return keyboard, page, total_pages
+
+
+async def create_firm_picker_keyboard(callback_prefix, page=1, lang='uz_latin'):
+    """create_paginated_keyboard ning firmalar reyestri uchun varianti: sahifa
+    firm_pages orqali keyset bilan olinadi, tugma yozuvlari tilga qarab keshlanadi."""
+    def build(rows, page, total_pages):
+        return [(row[0], f"{firm_pages.display_name(row, lang)} ({row[0]})") for row in rows]
+
+    labels, page, total_pages = await firm_pages.render_page('picker', lang, page, build)
+    keyboard = InlineKeyboardMarkup(row_width=2)
+    for stir, label in labels:
+        keyboard.add(InlineKeyboardButton(label, callback_data=f"{callback_prefix}_{stir}"))
+    _add_page_footer(keyboard, callback_prefix, page, total_pages, lang)
+    return keyboard, page, total_pages
+
+
+def _add_page_footer(keyboard, callback_prefix, page, total_pages, lang):
     nav_buttons = []
     if page > 1:
-        nav_buttons.append(InlineKeyboardButton(translate_text("⬅️ Oldingi", lang), callback_data=f"{callback_prefix}_page_{page-1}"))
+        nav_buttons.append(InlineKeyboardButton(get_text(lang, 'btn_prev'), callback_data=f"{callback_prefix}_page_{page-1}"))
     if page < total_pages:
-        nav_buttons.append(InlineKeyboardButton(translate_text("Keyingi ➡️", lang), callback_data=f"{callback_prefix}_page_{page+1}"))
+        nav_buttons.append(InlineKeyboardButton(get_text(lang, 'btn_next'), callback_data=f"{callback_prefix}_page_{page+1}"))
     if nav_buttons:
         keyboard.row(*nav_buttons)
 
-    keyboard.add(InlineKeyboardButton(translate_text("🔍 Qidirish", lang), callback_data=f"{callback_prefix}_search"))
-    keyboard.add(InlineKeyboardButton(translate_text("🔙 Orqaga", lang), callback_data="back_to_admin"))
-
-    return keyboard, page, total_pages
+    keyboard.add(InlineKeyboardButton(get_text(lang, 'btn_search'), callback_data=f"{callback_prefix}_search"))
+    keyboard.add(InlineKeyboardButton(get_text(lang, 'btn_back'), callback_data="back_to_admin"))
 
 
 def back_to_admin_keyboard(lang):
     keyboard = InlineKeyboardMarkup(row_width=1)
     keyboard.add(
-        InlineKeyboardButton(translate_text("Admin paneliga qaytish", lang), callback_data="back_to_admin")
+        InlineKeyboardButton(get_text(lang, 'btn_back_to_admin'), callback_data="back_to_admin")
     )
     return keyboard
 
@@ -263,36 +259,29 @@ def back_to_admin_keyboard(lang):
 async def list_firmas(callback_query: types.CallbackQuery):
     await bot.answer_callback_query(callback_query.id)
     user_id = callback_query.from_user.id
-    lang = get_user_language(user_id)
+    lang = await db.get_user_language(user_id)
     page = int(callback_query.data.split("_")[-1])
-    per_page = 10
-
-    # Ma'lumotlar bazasidan firmalarni olish
-    conn = sqlite3.connect(os.path.join(DATA_PATH, "bot.db"))
-    c = conn.cursor()
-    c.execute("SELECT stir, name FROM firms ORDER BY name LIMIT ? OFFSET ?", (per_page, (page - 1) * per_page))
-    firms = c.fetchall()
-    c.execute("SELECT COUNT(*) FROM firms")
-    total_firms = c.fetchone()[0]
-    conn.close()
 
-    if not firms:
+    total_firms = await db.count_firms()
+    if not total_firms:
         await callback_query.message.edit_text(
-            translate_text("❌ Hozirda hech qanday firma mavjud emas.", lang),
+            get_text(lang, 'no_firms_now'),
             reply_markup=back_to_admin_keyboard(lang)
         )
         return
 
-    # ✅ Shu yerda firms_list ni tuzish kerak
-    firms_list = [f"{i + 1 + (page - 1) * per_page}. {name} (STIR: {stir})" for i, (stir, name) in enumerate(firms)]
-    firmalar_text = "\n".join(firms_list)
-    total_pages = (total_firms + per_page - 1) // per_page
+    def build(firms, page, total_pages):
+        start = (page - 1) * firm_pages.PAGE_SIZE
+        firmalar_text = "\n".join(f"{start + i + 1}. {firm_pages.display_name(row, lang)} (STIR: {row[0]})"
+                                  for i, row in enumerate(firms))
+        return (
+            f"📋 {get_text(lang, 'firms_list_title')} ({total_firms} ta):\n\n"
+            f"{firmalar_text}\n\n"
+            f"📄 {get_text(lang, 'page')}: {page}/{total_pages}"
+        )
 
-    response = (
-        f"📋 {translate_text('Firmalar ro‘yxati', lang)} ({total_firms} ta):\n\n"
-        f"{firmalar_text}\n\n"
-        f"📄 {translate_text('Sahifa', lang)}: {page}/{total_pages}"
-    )
+    # Sahifa keyset bilan olinadi, tayyor matn tilga qarab keshlanadi (firm_pages)
+    response, page, total_pages = await firm_pages.render_page('list', lang, page, build)
 
     # Navigatsiya tugmalari
     keyboard = InlineKeyboardMarkup(row_width=3)
@@ -300,7 +289,7 @@ async def list_firmas(callback_query: types.CallbackQuery):
         keyboard.insert(InlineKeyboardButton("⬅️", callback_data=f"list_firmas_page_{page - 1}"))
     if page < total_pages:
         keyboard.insert(InlineKeyboardButton("➡️", callback_data=f"list_firmas_page_{page + 1}"))
-    keyboard.add(InlineKeyboardButton(translate_text("Admin paneliga qaytish", lang), callback_data="back_to_admin"))
+    keyboard.add(InlineKeyboardButton(get_text(lang, 'btn_back_to_admin'), callback_data="back_to_admin"))
 
     await callback_query.message.edit_text(response, reply_markup=keyboard)
 
@@ -312,28 +301,28 @@ async def back_to_admin_handler(callback_query: types.CallbackQuery, state: FSMC
 @dp.message_handler(commands=['admin'], user_id=ADMIN_IDS)
 async def admin_panel(message: types.Message, state: FSMContext):
     user_id = message.from_user.id
-    lang = get_user_language(user_id)
+    lang = await db.get_user_language(user_id)
     logger.info(f"Admin panel: user_id={user_id}, lang={lang}")
     keyboard = InlineKeyboardMarkup(row_width=2)
     keyboard.add(
-        InlineKeyboardButton(translate_text("Yangi firma qo'shish", lang), callback_data="add_firma"),
-        InlineKeyboardButton(translate_text("Excel orqali firmalar qo'shish", lang), callback_data="add_firms_excel"),
-        InlineKeyboardButton(translate_text("Firma tahrirlash", lang), callback_data="edit_firma"),
-        InlineKeyboardButton(translate_text("Fayl yuklash", lang), callback_data="upload_files"),
-        InlineKeyboardButton(translate_text("Qo'lda hisobot kiritish", lang), callback_data="manual_input"),
-        InlineKeyboardButton(translate_text("Hisobot o'chirish", lang), callback_data="delete_report"),
-        InlineKeyboardButton(translate_text("Firmalar ro'yxati", lang), callback_data="list_firmas_page_1"),
-        InlineKeyboardButton(translate_text("📎 Firma hujjat yuklash", lang), callback_data="upload_firm_docs"),
+        InlineKeyboardButton(get_text(lang, 'btn_add_firma'), callback_data="add_firma"),
+        InlineKeyboardButton(get_text(lang, 'btn_add_firms_excel'), callback_data="add_firms_excel"),
+        InlineKeyboardButton(get_text(lang, 'btn_edit_firma'), callback_data="edit_firma"),
+        InlineKeyboardButton(get_text(lang, 'btn_upload_files'), callback_data="upload_files"),
+        InlineKeyboardButton(get_text(lang, 'btn_manual_report'), callback_data="manual_input"),
+        InlineKeyboardButton(get_text(lang, 'btn_delete_report'), callback_data="delete_report"),
+        InlineKeyboardButton(get_text(lang, 'btn_list_firms'), callback_data="list_firmas_page_1"),
+        InlineKeyboardButton(get_text(lang, 'btn_upload_firm_docs'), callback_data="upload_firm_docs"),
         InlineKeyboardButton("📞 Telefon o‘zgartirish", callback_data="edit_firm_phone")        
     )
-    sent_message = await message.answer(translate_text("🔒 Admin paneliga xush kelibsiz!", lang), reply_markup=keyboard)
+    sent_message = await message.answer(get_text(lang, 'admin_welcome'), reply_markup=keyboard)
     await state.update_data(last_message_id=sent_message.message_id)
     await message.delete()
 
 @dp.callback_query_handler(lambda c: c.data == "edit_firm_phone", user_id=ADMIN_IDS)
 async def edit_firm_phone_start(call: types.CallbackQuery, state: FSMContext):
-    lang = get_user_language(call.from_user.id)
-    await call.message.answer(translate_text("✍️ Firma STIR raqamini kiriting:", lang))
+    lang = await db.get_user_language(call.from_user.id)
+    await call.message.answer(get_text(lang, 'enter_firma_stir'))
     await EditFirmPhone.waiting_for_stir.set()
 
 class EditFirmPhone(StatesGroup):
@@ -348,7 +337,7 @@ async def ask_new_phone(message: types.Message, state: FSMContext):
         await message.answer("❌ STIR 9 ta raqam bo‘lishi kerak. Qayta kiriting.")
         return
 
-    firma = get_firma_info(stir)
+    firma = await db.get_firma_info(stir)
     if not firma:
         await message.answer("❌ Bu STIR bo‘yicha firma topilmadi.")
         await state.finish()
@@ -375,35 +364,21 @@ async def add_firma_rahbar(message: types.Message, state: FSMContext):
     await message.answer("Rahbar telefon raqamini kiriting (masalan: +998901234567):")
 
 
-def add_firm_owner(stir, phone):
-    conn = sqlite3.connect(os.path.join(DATA_PATH, "bot.db"))
-    c = conn.cursor()
-    c.execute("SELECT 1 FROM firm_owners WHERE phone=?", (phone,))
-    if not c.fetchone():
-        c.execute("INSERT INTO firm_owners (stir, phone) VALUES (?, ?)", (stir, phone))
-        conn.commit()
-    conn.close()
-
-
-
-
-
-
 @dp.message_handler(state=VerifyPhone.phone)
 async def check_phone(message: types.Message, state: FSMContext):
     phone = message.text.strip()
     data = await state.get_data()
     stir = data['stir']
 
-    if not verify_owner_phone(stir, phone):
-        log_alert(message.from_user.id, phone, stir, "Unauthorized attempt")
+    if not await db.verify_owner_phone(stir, phone):
+        await db.log_alert(message.from_user.id, phone, stir, "Unauthorized attempt")
         await state.finish()
         return await message.answer("❌ Sizda ruxsat yo'q.")
 
-    if today_downloads(phone, stir) >= 3:
+    if await db.today_downloads(phone, stir) >= 3:
         return await message.answer("⚠️ Bugun fayllarni 3 martadan ko‘p yuklab bo‘lmaysiz.")
 
-    files = get_firm_docs(stir)
+    files = await db.get_firm_docs(stir)
     if not files:
         return await message.answer("❌ Firma hujjatlari hali yuklanmagan.")
 
@@ -412,7 +387,7 @@ async def check_phone(message: types.Message, state: FSMContext):
     for fpath in [pdf1, pdf2, pfx]:
         if fpath and os.path.exists(fpath):
             await message.answer_document(open(fpath, 'rb'))
-            log_download(message.from_user.id, phone, stir, fpath)
+            await db.log_download(message.from_user.id, phone, stir, fpath)
 
     await state.finish()
     await message.answer("✅ Hujjatlar yuborildi.")
@@ -426,7 +401,7 @@ async def start_upload_docs(callback: types.CallbackQuery, state: FSMContext):
 @dp.message_handler(state=UploadFirmDocs.stir, user_id=ADMIN_IDS)
 async def docs_stir(message: types.Message, state: FSMContext):
     stir = message.text.strip()
-    if not check_firma(stir):
+    if not await db.check_firma(stir):
         await message.answer("❌ Bunday STIR bazada yo‘q!")
         return
     await state.update_data(stir=stir)
@@ -476,7 +451,7 @@ async def docs_pfx(message: types.Message, state: FSMContext):
 
     await message.document.download(destination_file=save_to)
 
-    save_firm_docs(stir, data["pdf1"], data["pdf2"], save_to)
+    await db.save_firm_docs(stir, data["pdf1"], data["pdf2"], save_to)
 
     await state.finish()
     await message.answer("✅ Firma hujjatlari yuklandi va saqlandi!")
@@ -488,7 +463,7 @@ async def docs_pfx(message: types.Message, state: FSMContext):
 async def user_send_stir(message: types.Message, state: FSMContext):
     stir = message.text
 
-    if not check_firma(stir):
+    if not await db.check_firma(stir):
         return await message.answer("❌ Bunday firma topilmadi.")
 
     await state.update_data(stir=stir)
@@ -510,26 +485,26 @@ async def back_to_admin_panel(callback_query: types.CallbackQuery = None, state:
         else:
             return
 
-    lang = get_user_language(user_id)
+    lang = await db.get_user_language(user_id)
     keyboard = InlineKeyboardMarkup(row_width=2)
     keyboard.add(
-        InlineKeyboardButton(translate_text("Yangi firma qo'shish", lang), callback_data="add_firma"),
-        InlineKeyboardButton(translate_text("Excel orqali firmalar qo'shish", lang), callback_data="add_firms_excel"),
-        InlineKeyboardButton(translate_text("Firma tahrirlash", lang), callback_data="edit_firma"),
-        InlineKeyboardButton(translate_text("Fayl yuklash", lang), callback_data="upload_files"),
-        InlineKeyboardButton(translate_text("Qo'lda hisobot kiritish", lang), callback_data="manual_input"),
-        InlineKeyboardButton(translate_text("Hisobot o'chirish", lang), callback_data="delete_report"),
-        InlineKeyboardButton(translate_text("Firmalar ro'yxati", lang), callback_data="list_firmas_page_1")
+        InlineKeyboardButton(get_text(lang, 'btn_add_firma'), callback_data="add_firma"),
+        InlineKeyboardButton(get_text(lang, 'btn_add_firms_excel'), callback_data="add_firms_excel"),
+        InlineKeyboardButton(get_text(lang, 'btn_edit_firma'), callback_data="edit_firma"),
+        InlineKeyboardButton(get_text(lang, 'btn_upload_files'), callback_data="upload_files"),
+        InlineKeyboardButton(get_text(lang, 'btn_manual_report'), callback_data="manual_input"),
+        InlineKeyboardButton(get_text(lang, 'btn_delete_report'), callback_data="delete_report"),
+        InlineKeyboardButton(get_text(lang, 'btn_list_firms'), callback_data="list_firmas_page_1")
     )
 
     try:
         if message:
             await message.delete()  # Avvalgi xabarni o‘chirish
-        sent_message = await bot.send_message(user_id, translate_text("🔒 Admin paneliga xush kelibsiz!", lang), reply_markup=keyboard)
+        sent_message = await bot.send_message(user_id, get_text(lang, 'admin_welcome'), reply_markup=keyboard)
         await state.update_data(last_message_id=sent_message.message_id)
     except Exception as e:
         logger.error(f"Xabar o'chirish/yuborishda xato: {e}")
-        await bot.send_message(user_id, translate_text("❌ Xatolik yuz berdi, qayta urinib ko'ring.", lang))
+        await bot.send_message(user_id, get_text(lang, 'error_try_again'))
 
     if state:
         await state.finish()
@@ -538,7 +513,7 @@ async def back_to_admin_panel(callback_query: types.CallbackQuery = None, state:
 async def some_callback_handler(callback_query: types.CallbackQuery, state: FSMContext):
     await bot.answer_callback_query(callback_query.id)
     user_id = callback_query.from_user.id
-    lang = get_user_language(user_id)
+    lang = await db.get_user_language(user_id)
     data = await state.get_data()
     last_message_id = data.get('last_message_id')
 
@@ -552,13 +527,13 @@ async def some_callback_handler(callback_query: types.CallbackQuery, state: FSMC
     # InlineKeyboardMarkup obyektini yaratish
     keyboard = InlineKeyboardMarkup(row_width=2)
     keyboard.add(
-        InlineKeyboardButton(translate_text("Orqaga", lang), callback_data="back_to_admin")
+        InlineKeyboardButton(get_text(lang, 'btn_back_plain'), callback_data="back_to_admin")
     )
 
     # Yangi xabar yuborish va ID sini saqlash
     sent_message = await bot.send_message(
         user_id,
-        translate_text("Xabar matni", lang),
+        get_text(lang, 'message_text'),
         reply_markup=keyboard
     )
     await state.update_data(last_message_id=sent_message.message_id)
@@ -569,7 +544,7 @@ async def some_callback_handler(callback_query: types.CallbackQuery, state: FSMC
 async def start_add_firma(callback_query: types.CallbackQuery, state: FSMContext):
     await bot.answer_callback_query(callback_query.id)
     user_id = callback_query.from_user.id
-    lang = get_user_language(user_id)
+    lang = await db.get_user_language(user_id)
     data = await state.get_data()
     last_message_id = data.get('last_message_id')
 
@@ -581,14 +556,26 @@ async def start_add_firma(callback_query: types.CallbackQuery, state: FSMContext
             logger.warning(f"Xabar o'chirishda xato: {e}, message_id={last_message_id}")
 
     await AddFirma.stir.set()
-    sent_message = await bot.send_message(user_id, translate_text("Yangi firma STIR raqamini kiriting (9 raqam, masalan: 302824863):", lang))
+    sent_message = await bot.send_message(user_id, get_text(lang, 'enter_new_firma_stir'))
     await state.update_data(last_message_id=sent_message.message_id)
 
 
+@dp.message_handler(commands=['db_stats'], user_id=ADMIN_IDS, state='*')
+async def db_stats(message: types.Message):
+    cache = db.user_language_cache_stats()
+    text = query_stats.format_report()
+    text += (f"\n\n🌐 Til keshi: {cache['hits']} hit / {cache['misses']} miss, "
+             f"{cache['size']}/{cache['maxsize']}")
+    translit = translation_cache_stats()
+    text += (f"\n🔤 Transliteratsiya keshi: {translit['hits']} hit / {translit['misses']} miss, "
+             f"{translit['size']}/{translit['maxsize']}")
+    await message.answer(text[:4000])
+
+
 @dp.message_handler(commands=['cancel'], user_id=ADMIN_IDS, state='*')
 async def cancel_operation(message: types.Message, state: FSMContext):
     user_id = message.from_user.id
-    lang = get_user_language(user_id)
+    lang = await db.get_user_language(user_id)
     data = await state.get_data()
     last_message_id = data.get('last_message_id')
     excel_file_path = data.get('excel_file_path')
@@ -614,15 +601,15 @@ async def cancel_operation(message: types.Message, state: FSMContext):
     # Admin panelini qayta chiqarish
     keyboard = InlineKeyboardMarkup(row_width=2)
     keyboard.add(
-        InlineKeyboardButton(translate_text("Yangi firma qo'shish", lang), callback_data="add_firma"),
-        InlineKeyboardButton(translate_text("Excel orqali firmalar qo'shish", lang), callback_data="add_firms_excel"),
-        InlineKeyboardButton(translate_text("Firma tahrirlash", lang), callback_data="edit_firma"),
-        InlineKeyboardButton(translate_text("Fayl yuklash", lang), callback_data="upload_files"),
-        InlineKeyboardButton(translate_text("Qo'lda hisobot kiritish", lang), callback_data="manual_input"),
-        InlineKeyboardButton(translate_text("Hisobot o'chirish", lang), callback_data="delete_report"),
-        InlineKeyboardButton(translate_text("Firmalar ro'yxati", lang), callback_data="list_firmas_page_1")
+        InlineKeyboardButton(get_text(lang, 'btn_add_firma'), callback_data="add_firma"),
+        InlineKeyboardButton(get_text(lang, 'btn_add_firms_excel'), callback_data="add_firms_excel"),
+        InlineKeyboardButton(get_text(lang, 'btn_edit_firma'), callback_data="edit_firma"),
+        InlineKeyboardButton(get_text(lang, 'btn_upload_files'), callback_data="upload_files"),
+        InlineKeyboardButton(get_text(lang, 'btn_manual_report'), callback_data="manual_input"),
+        InlineKeyboardButton(get_text(lang, 'btn_delete_report'), callback_data="delete_report"),
+        InlineKeyboardButton(get_text(lang, 'btn_list_firms'), callback_data="list_firmas_page_1")
     )
-    sent_message = await message.answer(translate_text("✅ Amaliyot bekor qilindi, admin paneldasiz.", lang), reply_markup=keyboard)
+    sent_message = await message.answer(get_text(lang, 'operation_cancelled_admin'), reply_markup=keyboard)
     await state.update_data(last_message_id=sent_message.message_id)
     await message.delete()
     logger.info(f"Cancel operation: user_id={user_id}")
@@ -635,28 +622,28 @@ async def cancel_operation(message: types.Message, state: FSMContext):
 async def process_soliq_turi(message: types.Message, state: FSMContext):
     soliq_turi = message.text.strip().lower()
     user_id = message.from_user.id
-    lang = get_user_language(user_id)
+    lang = await db.get_user_language(user_id)
     if soliq_turi not in ['ds-ys', 'ds-qqs']:
-        await message.answer(translate_text("❌ Soliq turi 'ds-ys' yoki 'ds-qqs' bo'lishi kerak.", lang))
+        await message.answer(get_text(lang, 'invalid_soliq_turi_format'))
         return
     await state.update_data(soliq_turi=soliq_turi)
     await AddFirma.name.set()
-    await message.answer(translate_text("Firma nomini kiriting (kamida 3 belgi):", lang))
+    await message.answer(get_text(lang, 'enter_firma_name'))
 
 @dp.message_handler(state=AddFirma.stir, user_id=ADMIN_IDS)
 async def process_stir(message: types.Message, state: FSMContext):
     stir = message.text.strip()
     user_id = message.from_user.id
-    lang = get_user_language(user_id)
+    lang = await db.get_user_language(user_id)
     if not re.match(r'^\d{9}$', stir):
-        await message.answer(translate_text("❌ STIR 9 raqamdan iborat bo'lishi kerak.", lang))
+        await message.answer(get_text(lang, 'stir_must_be_9_digits'))
         return
-    if check_firma(stir):
-        await message.answer(translate_text("❌ Bu STIR allaqachon mavjud.", lang))
+    if await db.check_firma(stir):
+        await message.answer(get_text(lang, 'stir_exists'))
         return
     await state.update_data(stir=stir)
     await AddFirma.soliq_turi.set()
-    await message.answer(translate_text("Soliq turini kiriting (ds-ys, ds-qqs):", lang))
+    await message.answer(get_text(lang, 'enter_soliq_turi'))
 
 # 📌 Firma nomini qabul qilish
 @dp.message_handler(state=AddFirma.name, user_id=ADMIN_IDS)
@@ -688,22 +675,20 @@ async def process_rahbar(message: types.Message, state: FSMContext):
 async def start_edit_firma(callback_query: types.CallbackQuery):
     await bot.answer_callback_query(callback_query.id)
     user_id = callback_query.from_user.id
-    lang = get_user_language(user_id)
-    firms = get_all_firms()
-    if not firms:
-        await bot.send_message(callback_query.from_user.id, translate_text("❌ Hozircha firmalar mavjud emas.", lang))
+    lang = await db.get_user_language(user_id)
+    if not await db.count_firms():
+        await bot.send_message(callback_query.from_user.id, get_text(lang, 'no_firms_yet'))
         return
-    keyboard, page, total_pages = create_paginated_keyboard(firms, "edit_firm", page=1, lang=lang)
+    keyboard, page, total_pages = await create_firm_picker_keyboard("edit_firm", page=1, lang=lang)
     await bot.send_message(callback_query.from_user.id, translate_text(f"Tahrir qilmoqchi bo'lgan firmani tanlang (Sahifa {page}/{total_pages}):", lang), reply_markup=keyboard)
 
 @dp.callback_query_handler(lambda c: c.data.startswith("edit_firm_page_"), user_id=ADMIN_IDS)
 async def edit_firma_paginate(callback_query: types.CallbackQuery):
     await bot.answer_callback_query(callback_query.id)
     user_id = callback_query.from_user.id
-    lang = get_user_language(user_id)
+    lang = await db.get_user_language(user_id)
     page = int(callback_query.data.split("_")[-1])
-    firms = get_all_firms()
-    keyboard, page, total_pages = create_paginated_keyboard(firms, "edit_firm", page=page, lang=lang)
+    keyboard, page, total_pages = await create_firm_picker_keyboard("edit_firm", page=page, lang=lang)
     await bot.edit_message_text(
         translate_text(f"Tahrir qilmoqchi bo'lgan firmani tanlang (Sahifa {page}/{total_pages}):", lang),
         callback_query.from_user.id,
@@ -717,20 +702,20 @@ async def edit_firma_paginate(callback_query: types.CallbackQuery):
 async def start_edit_firma_search(callback_query: types.CallbackQuery, state: FSMContext):
     await bot.answer_callback_query(callback_query.id)
     user_id = callback_query.from_user.id
-    lang = get_user_language(user_id)
+    lang = await db.get_user_language(user_id)
     await state.finish()
     await ManualInput.search.set()
     await state.update_data(search_context="edit_firma")
-    await bot.send_message(callback_query.from_user.id, translate_text("Firma STIR yoki nomini kiriting (qisman moslik uchun):", lang))
+    await bot.send_message(callback_query.from_user.id, get_text(lang, 'search_firma_prompt'))
 
 @dp.callback_query_handler(lambda c: c.data.startswith("edit_firm_"), user_id=ADMIN_IDS)
 async def select_firma_to_edit(callback_query: types.CallbackQuery, state: FSMContext):
     await bot.answer_callback_query(callback_query.id)
     user_id = callback_query.from_user.id
-    lang = get_user_language(user_id)
+    lang = await db.get_user_language(user_id)
     stir = callback_query.data.split("_", 2)[2]
     await state.update_data(stir=stir)
-    firma_name = get_firma_name(stir)
+    firma_name = await db.get_firma_name(stir)
     await EditFirma.new_name.set()
     await bot.send_message(callback_query.from_user.id, translate_text(f"Hozirgi firma nomi: {firma_name}\nYangi nomni kiriting (kamida 3 belgi):", lang))
 
@@ -738,17 +723,13 @@ async def select_firma_to_edit(callback_query: types.CallbackQuery, state: FSMCo
 async def process_new_name(message: types.Message, state: FSMContext):
     new_name = message.text.strip()
     user_id = message.from_user.id
-    lang = get_user_language(user_id)
+    lang = await db.get_user_language(user_id)
     if len(new_name) < 3:
-        await message.answer(translate_text("❌ Firma nomi kamida 3 ta belgidan iborat bo'lishi kerak.", lang))
+        await message.answer(get_text(lang, 'firma_name_too_short'))
         return
     data = await state.get_data()
     stir = data['stir']
-    conn = sqlite3.connect(os.path.join(DATA_PATH, "bot.db"))
-    c = conn.cursor()
-    c.execute("UPDATE firms SET name = ? WHERE stir = ?", (new_name, stir))
-    conn.commit()
-    conn.close()
+    await db.update_firma_name(stir, new_name)
     await state.finish()
     await message.answer(translate_text(f"✅ Firma nomi o'zgartirildi: {new_name} ({stir})", lang))
     logger.info(f"Firma nomi o'zgartirildi: STIR={stir}, Yangi nom={new_name}")
@@ -757,12 +738,11 @@ async def process_new_name(message: types.Message, state: FSMContext):
 async def start_upload_files(callback_query: types.CallbackQuery):
     await bot.answer_callback_query(callback_query.id)
     user_id = callback_query.from_user.id
-    lang = get_user_language(user_id)
-    firms = get_all_firms()  # await olib tashlandi
-    if not firms:
-        await bot.send_message(callback_query.from_user.id, translate_text("❌ Hozircha firmalar mavjud emas.", lang))
+    lang = await db.get_user_language(user_id)
+    if not await db.count_firms():
+        await bot.send_message(callback_query.from_user.id, get_text(lang, 'no_firms_yet'))
         return
-    keyboard, page, total_pages = create_paginated_keyboard(firms, "firm_upload", page=1, lang=lang)
+    keyboard, page, total_pages = await create_firm_picker_keyboard("firm_upload", page=1, lang=lang)
     await bot.send_message(callback_query.from_user.id, translate_text(f"Fayl yuklash uchun firma tanlang (Sahifa {page}/{total_pages}):", lang), reply_markup=keyboard)
 
 
@@ -770,10 +750,9 @@ async def start_upload_files(callback_query: types.CallbackQuery):
 async def upload_files_paginate(callback_query: types.CallbackQuery):
     await bot.answer_callback_query(callback_query.id)
     user_id = callback_query.from_user.id
-    lang = get_user_language(user_id)
+    lang = await db.get_user_language(user_id)
     page = int(callback_query.data.split("_")[-1])
-    firms = get_all_firms()  # await olib tashlandi
-    keyboard, page, total_pages = create_paginated_keyboard(firms, "firm_upload", page=page, lang=lang)
+    keyboard, page, total_pages = await create_firm_picker_keyboard("firm_upload", page=page, lang=lang)
     await bot.edit_message_text(
         translate_text(f"Fayl yuklash uchun firma tanlang (Sahifa {page}/{total_pages}):", lang),
         callback_query.from_user.id,
@@ -785,11 +764,11 @@ async def upload_files_paginate(callback_query: types.CallbackQuery):
 async def start_upload_files_search(callback_query: types.CallbackQuery, state: FSMContext):
     await bot.answer_callback_query(callback_query.id)
     user_id = callback_query.from_user.id
-    lang = get_user_language(user_id)
+    lang = await db.get_user_language(user_id)
     await state.finish()
     await ManualInput.search.set()
     await state.update_data(search_context="upload_files")
-    await bot.send_message(callback_query.from_user.id, translate_text("Firma STIR yoki nomini kiriting (qisman moslik uchun):", lang))
+    await bot.send_message(callback_query.from_user.id, get_text(lang, 'search_firma_prompt'))
 
 logger = logging.getLogger(__name__)
 
@@ -797,61 +776,53 @@ logger = logging.getLogger(__name__)
 async def select_soliq_turi(callback_query: types.CallbackQuery, state: FSMContext):
     await bot.answer_callback_query(callback_query.id)
     user_id = callback_query.from_user.id
-    lang = get_user_language(user_id)
+    lang = await db.get_user_language(user_id)
     stir = callback_query.data.split("_", 2)[2]
     await state.update_data(stir=stir)
     logger.info(f"select_soliq_turi boshlandi: user_id={user_id}, stir={stir}, lang={lang}")
 
     # Firma ma'lumotlarini olish
     try:
-        conn = sqlite3.connect(os.path.join(DATA_PATH, "bot.db"))
-        c = conn.cursor()
-        c.execute("SELECT name, rahbar, soliq_turi, ds_stavka, ys_stavka, qqs_stavka FROM firms WHERE stir = ?", (stir,))
-        result = c.fetchone()
-        conn.close()
+        result = await db.get_firma_info(stir)
     except Exception as e:
         logger.error(f"Ma'lumotlar bazasidan xato: {e}, STIR={stir}")
-        await bot.send_message(user_id, translate_text("❌ Ma'lumotlar bazasida xato yuz berdi.", lang), parse_mode='Markdown')
+        await bot.send_message(user_id, get_text(lang, 'db_error'), parse_mode='Markdown')
         return
 
     if not result:
         logger.error(f"Firma topilmadi: STIR={stir}")
-        await bot.send_message(user_id, translate_text("❌ Firma topilmadi.", lang), parse_mode='Markdown')
+        await bot.send_message(user_id, get_text(lang, 'firma_not_found'), parse_mode='Markdown')
         return
 
     name, rahbar, soliq_turi, ds_stavka, ys_stavka, qqs_stavka = result
     soliq_turi = soliq_turi.lower() if soliq_turi else 'ds-ys'  # Standart qiymat
+    flags = await db.get_soliq_flags(stir)
     logger.info(f"Firma ma'lumotlari: STIR={stir}, Name={name}, Soliq_turi={soliq_turi}")
 
     # Firma ma'lumotlarini ko'rsatish
     message_text = get_text(lang, 'firma_info',
                             stir=stir,
                             firma_nomi=name,
-                            rahbar=rahbar if rahbar else translate_text("Noma'lum", lang),
+                            rahbar=rahbar if rahbar else get_text(lang, 'unknown'),
                             soliq_turi=soliq_turi,
                             ds_stavka=ds_stavka if ds_stavka else "Noma'lum",
                             ys_stavka=ys_stavka if ys_stavka else "Noma'lum",
                             qqs_stavka=qqs_stavka if qqs_stavka else "Noma'lum") + "\n\n" + \
                    f"📊 STIR: {stir}\n" + \
-                   translate_text("Soliq turini tanlang", lang) + ":"
+                   get_text(lang, 'choose_tax_type') + ":"
 
     # Soliq turiga qarab tugmalar
     keyboard = InlineKeyboardMarkup(row_width=2)
-    if soliq_turi == 'ds-ys':
+    if flags & SOLIQ_YS:
         keyboard.add(
-            InlineKeyboardButton(text=translate_text("Daromad solig'i", lang), callback_data="upload_daromad"),
-            InlineKeyboardButton(text=translate_text("Yagona soliq", lang), callback_data="upload_yagona")
-        )
-    elif soliq_turi == 'ds-qqs':
-        keyboard.add(
-            InlineKeyboardButton(text=translate_text("Daromad solig'i", lang), callback_data="upload_daromad"),
-            InlineKeyboardButton(text=translate_text("Qo‘shilgan qiymat solig‘i", lang), callback_data="upload_qqs")
+            InlineKeyboardButton(text=get_text(lang, 'btn_daromad'), callback_data="upload_daromad"),
+            InlineKeyboardButton(text=get_text(lang, 'btn_yagona'), callback_data="upload_yagona")
         )
     else:
-        logger.error(f"Noto'g'ri soliq_turi: {soliq_turi} firma uchun {stir}")
+        # ds-qqs (yoki noma'lum tur) - QQS tugmasi
         keyboard.add(
-            InlineKeyboardButton(text=translate_text("Daromad solig'i", lang), callback_data="upload_daromad"),
-            InlineKeyboardButton(text=translate_text("Qo‘shilgan qiymat solig‘i", lang), callback_data="upload_qqs")
+            InlineKeyboardButton(text=get_text(lang, 'btn_daromad'), callback_data="upload_daromad"),
+            InlineKeyboardButton(text=get_text(lang, 'btn_qqs'), callback_data="upload_qqs")
         )  # Standart tugmalar
         
 
@@ -871,35 +842,35 @@ async def select_soliq_turi(callback_query: types.CallbackQuery, state: FSMConte
 async def select_month_for_upload(callback_query: types.CallbackQuery, state: FSMContext):
     await bot.answer_callback_query(callback_query.id)
     user_id = callback_query.from_user.id
-    lang = get_user_language(user_id)
+    lang = await db.get_user_language(user_id)
     soliq_turi = callback_query.data.split("_", 1)[1]
     await state.update_data(soliq_turi=soliq_turi)
     keyboard = InlineKeyboardMarkup(row_width=3)
-    oylar = ["yanvar", "fevral", "mart", "aprel", "may", "iyun", "iyul"]
+    oylar = MONTHS
     for oy in oylar:
         keyboard.insert(InlineKeyboardButton(get_month_name(lang, oy), callback_data=f"start_upload_{oy}"))
-    await bot.send_message(callback_query.from_user.id, translate_text("Fayllarni qaysi oy uchun yuklamoqchisiz?", lang), reply_markup=keyboard)
+    await bot.send_message(callback_query.from_user.id, get_text(lang, 'upload_which_month'), reply_markup=keyboard)
 
 @dp.callback_query_handler(lambda c: c.data.startswith("start_upload_"), user_id=ADMIN_IDS)
 async def start_file_upload(callback_query: types.CallbackQuery, state: FSMContext):
     await bot.answer_callback_query(callback_query.id)
     user_id = callback_query.from_user.id
-    lang = get_user_language(user_id)
+    lang = await db.get_user_language(user_id)
     oy = callback_query.data.split("_", 2)[2]
     data = await state.get_data()
     stir = data.get('stir')
     soliq_turi = data.get('soliq_turi')
     
     if not stir:
-        await bot.send_message(callback_query.from_user.id, translate_text("❌ STIR ma'lumoti yo'q. Iltimos, qayta boshlang.", lang))
+        await bot.send_message(callback_query.from_user.id, get_text(lang, 'no_stir_restart'))
         await state.finish()
         return
     await state.update_data(oy=oy)
     
     # Fayllarni tekshirish
-    file_path_latin = os.path.normpath(os.path.join(DATA_PATH, stir, soliq_turi, f"{get_month_name('uz_latin', oy)}1.xlsx"))
-    file_path_cyrillic = os.path.normpath(os.path.join(DATA_PATH, stir, soliq_turi, f"{get_month_name('uz_cyrillic', oy)}1.xlsx"))
-    existing_file = check_file(stir, soliq_turi, oy, "excel1_latin") or check_file(stir, soliq_turi, oy, "excel1_cyrillic")
+    file_path_latin = os.path.normpath(os.path.join(report_dir(stir, soliq_turi), f"{get_month_name('uz_latin', oy)}1.xlsx"))
+    file_path_cyrillic = os.path.normpath(os.path.join(report_dir(stir, soliq_turi), f"{get_month_name('uz_cyrillic', oy)}1.xlsx"))
+    existing_file = await db.check_file(stir, soliq_turi, oy, "excel1_latin") or await db.check_file(stir, soliq_turi, oy, "excel1_cyrillic")
     
     if existing_file and os.path.exists(existing_file):
         # Agar fayl mavjud bo'lsa, 2-Excel faylini so'rash
@@ -923,14 +894,13 @@ async def start_file_upload(callback_query: types.CallbackQuery, state: FSMConte
 async def overwrite_file(callback_query: types.CallbackQuery, state: FSMContext):
     await bot.answer_callback_query(callback_query.id)
     user_id = callback_query.from_user.id
-    lang = get_user_language(user_id)
+    lang = await db.get_user_language(user_id)
     oy = callback_query.data.split("_", 1)[1]
     await state.update_data(oy=oy)
     await UploadFiles.excel1.set()
-    await bot.send_message(callback_query.from_user.id, translate_text("1-Excel faylni yuklang (.xlsx):", lang))
+    await bot.send_message(callback_query.from_user.id, get_text(lang, 'upload_excel1'))
 
 
-from database import add_firma, add_firm_owner
 
 # 📌 Telefonni qabul qilish — Bazaga saqlash
 @dp.message_handler(state=AddFirma.phone, user_id=ADMIN_IDS)
@@ -946,15 +916,15 @@ async def process_phone(message: types.Message, state: FSMContext):
     rahbar = data["rahbar"]
     soliq_turi = data["soliq_turi"]
 
-    add_firma(stir, name, rahbar, soliq_turi)
-    add_firm_owner(stir, phone)
+    await db.add_firma(stir, name, rahbar, soliq_turi)
+    await db.add_firm_owner(stir, phone)
 
     # papka
-    os.makedirs(os.path.join(DATA_PATH, stir, "daromad"), exist_ok=True)
+    os.makedirs(report_dir(stir, "daromad"), exist_ok=True)
     if soliq_turi == "ds-ys":
-        os.makedirs(os.path.join(DATA_PATH, stir, "yagona"), exist_ok=True)
+        os.makedirs(report_dir(stir, "yagona"), exist_ok=True)
     else:
-        os.makedirs(os.path.join(DATA_PATH, stir, "qqs"), exist_ok=True)
+        os.makedirs(report_dir(stir, "qqs"), exist_ok=True)
 
     await message.answer(
         f"✅ Firma qo‘shildi!\n"
@@ -990,18 +960,18 @@ def parse_yagona_excel(file_path, lang='uz_latin'):
                 logger.warning(f"STIR ma'lumotlar bazasida yo'q: {stir}")
                 continue
             oy = oy.lower()
-            if oy not in ['yanvar', 'fevral', 'mart', 'aprel', 'may', 'iyun', 'iyul']:
+            if oy not in MONTHS:
                 logger.warning(f"Noto'g'ri oy: {oy}")
                 continue
-            # Standardize soliq_turi_yagona to string with % for consistency
-            if isinstance(soliq_turi_yagona, (int, float)):
-                soliq_turi_yagona = f"{soliq_turi_yagona}%"
-            if lang == 'uz_cyrillic':
-                firma_nomi = convert_to_cyrillic(firma_nomi)
-                rahbar = convert_to_cyrillic(rahbar)
-            else:
-                firma_nomi = translate_text(firma_nomi, lang)
-                rahbar = translate_text(rahbar, lang)
+            # Stavka shu yerda bir marta tekshiriladi; ko'rsatish uchun "4%" ko'rinishi
+            try:
+                soliq_bp = parse_rate_bp(soliq_turi_yagona)
+            except ValueError as e:
+                logger.warning(f"Noto'g'ri stavka: {e}, qator: {row}")
+                continue
+            soliq_turi_yagona = f"{format_rate(soliq_bp)}%"
+            firma_nomi = translate_text(firma_nomi, lang)
+            rahbar = translate_text(rahbar, lang)
             key = (str(stir), oy)
             firms[key] = {
                 'stir': str(stir),
@@ -1009,6 +979,7 @@ def parse_yagona_excel(file_path, lang='uz_latin'):
                 'firma_nomi': firma_nomi,
                 'rahbar': rahbar,
                 'soliq_turi_yagona': soliq_turi_yagona,
+                'soliq_bp': soliq_bp,
                 'yil_boshidan_aylanma': int(yil_boshidan_aylanma),
                 'shu_oy_aylanma': int(shu_oy_aylanma)
             }
@@ -1039,17 +1010,18 @@ def parse_qqs_excel(file_path, lang='uz_latin'):
                 continue
 
             oy = oy.lower()
-            if oy not in ['yanvar', 'fevral', 'mart', 'aprel', 'may', 'iyun', 'iyul']:
+            if oy not in MONTHS:
                 logger.warning(f"Noto'g'ri oy: {oy}")
                 continue
+            try:
+                soliq_bp = parse_rate_bp(soliq_turi_qqs)
+            except ValueError as e:
+                logger.warning(f"Noto'g'ri stavka: {e}, qator: {row}")
+                continue
 
             # Ma'lumotlarni tilga qarab tarjima qilish
-            if lang == 'uz_cyrillic':
-                firma_nomi = convert_to_cyrillic(firma_nomi)
-                rahbar = convert_to_cyrillic(rahbar)
-            else:
-                firma_nomi = translate_text(firma_nomi, lang)
-                rahbar = translate_text(rahbar, lang)
+            firma_nomi = translate_text(firma_nomi, lang)
+            rahbar = translate_text(rahbar, lang)
 
             key = (str(stir), oy)
             firms[key] = {
@@ -1058,6 +1030,7 @@ def parse_qqs_excel(file_path, lang='uz_latin'):
                 'firma_nomi': firma_nomi,
                 'rahbar': rahbar,
                 'soliq_turi_qqs': soliq_turi_qqs,
+                'soliq_bp': soliq_bp,
                 'yil_boshidan_qqs': int(yil_boshidan_qqs),
                 'shu_oy_qqs': int(shu_oy_qqs)
             }
@@ -1076,13 +1049,13 @@ def generate_yagona_excel(stir, oy, firma_nomi, rahbar, soliq_turi_yagona, yil_b
         sheet_latin = workbook_latin.active
         sheet_latin.title = "Sheet1"
         headers_latin = [
-            translate_text("STIR", 'uz_latin'),
-            translate_text("Oy", 'uz_latin'),
-            translate_text("Firma nomi", 'uz_latin'),
-            translate_text("Raxbar", 'uz_latin'),
-            translate_text("Soliq turi yagona", 'uz_latin'),
-            translate_text("Yil boshidan aylanma", 'uz_latin'),
-            translate_text("Shu oy uchun aylanma", 'uz_latin')
+            get_text('uz_latin', 'col_stir'),
+            get_text('uz_latin', 'col_oy'),
+            get_text('uz_latin', 'col_firma_nomi'),
+            get_text('uz_latin', 'col_rahbar'),
+            get_text('uz_latin', 'col_soliq_turi_yagona'),
+            get_text('uz_latin', 'col_yil_boshidan_aylanma'),
+            get_text('uz_latin', 'col_shu_oy_aylanma')
         ]
         sheet_latin.append(headers_latin)
         row = [
@@ -1105,13 +1078,13 @@ def generate_yagona_excel(stir, oy, firma_nomi, rahbar, soliq_turi_yagona, yil_b
         sheet_cyrillic = workbook_cyrillic.active
         sheet_cyrillic.title = "Лист1"
         headers_cyrillic = [
-            translate_text("STIR", 'uz_cyrillic'),
-            translate_text("Oy", 'uz_cyrillic'),
-            translate_text("Firma nomi", 'uz_cyrillic'),
-            translate_text("Raxbar", 'uz_cyrillic'),
-            translate_text("Soliq turi yagona", 'uz_cyrillic'),
-            translate_text("Yil boshidan aylanma", 'uz_cyrillic'),
-            translate_text("Shu oy uchun aylanma", 'uz_cyrillic')
+            get_text('uz_cyrillic', 'col_stir'),
+            get_text('uz_cyrillic', 'col_oy'),
+            get_text('uz_cyrillic', 'col_firma_nomi'),
+            get_text('uz_cyrillic', 'col_rahbar'),
+            get_text('uz_cyrillic', 'col_soliq_turi_yagona'),
+            get_text('uz_cyrillic', 'col_yil_boshidan_aylanma'),
+            get_text('uz_cyrillic', 'col_shu_oy_aylanma')
         ]
         sheet_cyrillic.append(headers_cyrillic)
         row = [
@@ -1137,9 +1110,9 @@ def generate_yagona_excel(stir, oy, firma_nomi, rahbar, soliq_turi_yagona, yil_b
 @dp.message_handler(content_types=['document'], state=UploadFiles.excel1, user_id=ADMIN_IDS)
 async def process_excel1(message: types.Message, state: FSMContext):
     user_id = message.from_user.id
-    lang = get_user_language(user_id)
+    lang = await db.get_user_language(user_id)
     if not message.document.file_name.endswith('.xlsx'):
-        await message.answer(translate_text("❌ Faqat .xlsx fayllarni yuklang.", lang))
+        await message.answer(get_text(lang, 'only_xlsx'))
         logger.warning(f"Noto'g'ri fayl formati: {message.document.file_name}")
         return
     data = await state.get_data()
@@ -1147,8 +1120,8 @@ async def process_excel1(message: types.Message, state: FSMContext):
     soliq_turi = data['soliq_turi']
     oy = data['oy'].lower()
 
-    file_path_latin = os.path.normpath(os.path.join(DATA_PATH, stir, soliq_turi, f"{get_month_name('uz_latin', oy)}1.xlsx"))
-    file_path_cyrillic = os.path.normpath(os.path.join(DATA_PATH, stir, soliq_turi, f"{get_month_name('uz_cyrillic', oy)}1.xlsx"))
+    file_path_latin = os.path.normpath(os.path.join(report_dir(stir, soliq_turi), f"{get_month_name('uz_latin', oy)}1.xlsx"))
+    file_path_cyrillic = os.path.normpath(os.path.join(report_dir(stir, soliq_turi), f"{get_month_name('uz_cyrillic', oy)}1.xlsx"))
     os.makedirs(os.path.dirname(file_path_latin), exist_ok=True)
 
     temp_path = os.path.normpath(os.path.join(DATA_PATH, "temp", f"excel1_{user_id}_{int(datetime.now().timestamp())}.xlsx"))
@@ -1188,8 +1161,8 @@ async def process_excel1(message: types.Message, state: FSMContext):
             shutil.copy(temp_path, file_path_latin)
             shutil.copy(temp_path, file_path_cyrillic)
 
-        save_file(stir, soliq_turi, oy, "excel1_latin", file_path_latin)
-        save_file(stir, soliq_turi, oy, "excel1_cyrillic", file_path_cyrillic)
+        await db.save_file(stir, soliq_turi, oy, "excel1_latin", file_path_latin)
+        await db.save_file(stir, soliq_turi, oy, "excel1_cyrillic", file_path_cyrillic)
         logger.info(f"Fayl yuklandi: {file_path_latin}, {file_path_cyrillic}")
 
         if os.path.exists(temp_path):
@@ -1198,7 +1171,7 @@ async def process_excel1(message: types.Message, state: FSMContext):
 
         await state.update_data(excel_file_path=temp_path)  # Vaqtinchalik fayl yo‘lini saqlash
         await UploadFiles.excel2.set()
-        sent_message = await message.answer(translate_text("✅ 1-Excel fayl yuklangan, endi 2-Excel faylni yuklang (.xlsx). Bekor qilish uchun /cancel bosing.", lang))
+        sent_message = await message.answer(get_text(lang, 'excel1_uploaded_send_excel2'))
         await state.update_data(last_message_id=sent_message.message_id)
         logger.info(f"excel1 holatidan excel2 holatiga o'tildi: user_id={user_id}, stir={stir}, oy={oy}")
     except Exception as e:
@@ -1208,9 +1181,9 @@ async def process_excel1(message: types.Message, state: FSMContext):
 @dp.message_handler(content_types=['document'], state=UploadFiles.excel2, user_id=ADMIN_IDS)
 async def process_excel2(message: types.Message, state: FSMContext):
     user_id = message.from_user.id
-    lang = get_user_language(user_id)
+    lang = await db.get_user_language(user_id)
     if not message.document.file_name.endswith('.xlsx'):
-        await message.answer(translate_text("❌ Faqat .xlsx fayllarni yuklang.", lang))
+        await message.answer(get_text(lang, 'only_xlsx'))
         logger.warning(f"Noto'g'ri fayl formati: {message.document.file_name}, user_id={user_id}")
         return
     data = await state.get_data()
@@ -1219,13 +1192,13 @@ async def process_excel2(message: types.Message, state: FSMContext):
     oy = data.get('oy').lower()
     
     if not all([stir, soliq_turi, oy]):
-        await message.answer(translate_text("❌ STIR, soliq turi yoki oy ma'lumotlari yo'q. Qayta boshlang.", lang))
+        await message.answer(get_text(lang, 'missing_upload_data'))
         logger.error(f"Not enough data: stir={stir}, soliq_turi={soliq_turi}, oy={oy}")
         await state.finish()
         return
     
-    file_path_latin = os.path.normpath(os.path.join(DATA_PATH, stir, soliq_turi, f"{get_month_name('uz_latin', oy)}2.xlsx"))
-    file_path_cyrillic = os.path.normpath(os.path.join(DATA_PATH, stir, soliq_turi, f"{get_month_name('uz_cyrillic', oy)}2.xlsx"))
+    file_path_latin = os.path.normpath(os.path.join(report_dir(stir, soliq_turi), f"{get_month_name('uz_latin', oy)}2.xlsx"))
+    file_path_cyrillic = os.path.normpath(os.path.join(report_dir(stir, soliq_turi), f"{get_month_name('uz_cyrillic', oy)}2.xlsx"))
     os.makedirs(os.path.dirname(file_path_latin), exist_ok=True)
     
     temp_path = os.path.normpath(os.path.join(DATA_PATH, "temp", f"excel2_{user_id}_{int(datetime.now().timestamp())}.xlsx"))
@@ -1238,8 +1211,8 @@ async def process_excel2(message: types.Message, state: FSMContext):
         shutil.copy(temp_path, file_path_cyrillic)
         logger.info(f"Fayllar nusxalandi: temp={temp_path}, latin={file_path_latin}, cyrillic={file_path_cyrillic}")
         
-        save_file(stir, soliq_turi, oy, "excel2_latin", file_path_latin)
-        save_file(stir, soliq_turi, oy, "excel2_cyrillic", file_path_cyrillic)
+        await db.save_file(stir, soliq_turi, oy, "excel2_latin", file_path_latin)
+        await db.save_file(stir, soliq_turi, oy, "excel2_cyrillic", file_path_cyrillic)
         logger.info(f"Fayl yuklandi: {file_path_latin}, {file_path_cyrillic}")
         
         if os.path.exists(temp_path):
@@ -1248,7 +1221,7 @@ async def process_excel2(message: types.Message, state: FSMContext):
         
         await state.update_data(excel_file_path=temp_path)  # Vaqtinchalik fayl yo‘lini saqlash
         await UploadFiles.next()
-        sent_message = await message.answer(translate_text("html_xlsx faylni yuklang yoki /cancel bosib amaliyotni bekor qilin", lang))
+        sent_message = await message.answer(get_text(lang, 'upload_html_xlsx_or_cancel'))
         await state.update_data(last_message_id=sent_message.message_id)
         logger.info(f"excel2 holatidan html holatiga o'tildi: user_id={user_id}, stir={stir}, oy={oy}")
     except Exception as e:
@@ -1258,11 +1231,11 @@ async def process_excel2(message: types.Message, state: FSMContext):
 @dp.message_handler(content_types=['document'], state=UploadFiles.html, user_id=ADMIN_IDS)
 async def process_html(message: types.Message, state: FSMContext):
     user_id = message.from_user.id
-    lang = get_user_language(user_id)
+    lang = await db.get_user_language(user_id)
     logger.info(f"process_html boshlandi: user_id={user_id}, file_name={message.document.file_name}")
 
     if not message.document.file_name.endswith('.html'):
-        await message.answer(translate_text("❌ Faqat .html fayllarni yuklang.", lang), parse_mode='Markdown')
+        await message.answer(get_text(lang, 'only_html'), parse_mode='Markdown')
         logger.warning(f"Noto'g'ri fayl formati: {message.document.file_name}, user_id={user_id}")
         return
 
@@ -1272,14 +1245,14 @@ async def process_html(message: types.Message, state: FSMContext):
     oy = data.get('oy')
 
     if not all([stir, soliq_turi, oy, user_id]):
-        await message.answer(translate_text("❌ STIR, soliq turi, oy yoki user_id ma'lumotlari yo'q. Qayta boshlang.", lang), parse_mode='Markdown')
+        await message.answer(get_text(lang, 'missing_upload_data_user'), parse_mode='Markdown')
         logger.error(f"Not enough data: stir={stir}, soliq_turi={soliq_turi}, oy={oy}, user_id={user_id}")
         await state.finish()
         return
 
     oy = oy.lower()
-    file_path_latin = os.path.normpath(os.path.join(DATA_PATH, stir, soliq_turi, f"{get_month_name('uz_latin', oy)}3.html"))
-    file_path_cyrillic = os.path.normpath(os.path.join(DATA_PATH, stir, soliq_turi, f"{get_month_name('uz_cyrillic', oy)}3.html"))
+    file_path_latin = os.path.normpath(os.path.join(report_dir(stir, soliq_turi), f"{get_month_name('uz_latin', oy)}3.html"))
+    file_path_cyrillic = os.path.normpath(os.path.join(report_dir(stir, soliq_turi), f"{get_month_name('uz_cyrillic', oy)}3.html"))
     os.makedirs(os.path.dirname(file_path_latin), exist_ok=True)
     
     temp_path = os.path.normpath(os.path.join(DATA_PATH, "temp", f"html_{user_id}_{int(datetime.now().timestamp())}.html"))
@@ -1292,7 +1265,7 @@ async def process_html(message: types.Message, state: FSMContext):
         shutil.copy(temp_path, file_path_cyrillic)
         logger.info(f"Fayllar nusxalandi: temp={temp_path}, latin={file_path_latin}, cyrillic={file_path_cyrillic}")
 
-        save_file(stir, soliq_turi, oy, "html", file_path_latin)
+        await db.save_file(stir, soliq_turi, oy, "html", file_path_latin)
         logger.info(f"Fayl yuklandi: {file_path_latin}, user_id={user_id}")
 
         if os.path.exists(temp_path):
@@ -1313,22 +1286,20 @@ async def process_html(message: types.Message, state: FSMContext):
 async def start_delete_report(callback_query: types.CallbackQuery):
     await bot.answer_callback_query(callback_query.id)
     user_id = callback_query.from_user.id
-    lang = get_user_language(user_id)
-    firms = get_all_firms()
-    if not firms:
-        await bot.send_message(callback_query.from_user.id, translate_text("❌ Hozircha firmalar mavjud emas.", lang))
+    lang = await db.get_user_language(user_id)
+    if not await db.count_firms():
+        await bot.send_message(callback_query.from_user.id, get_text(lang, 'no_firms_yet'))
         return
-    keyboard, page, total_pages = create_paginated_keyboard(firms, "delete_firm", page=1, lang=lang)
+    keyboard, page, total_pages = await create_firm_picker_keyboard("delete_firm", page=1, lang=lang)
     await bot.send_message(callback_query.from_user.id, translate_text(f"Hisobotni o'chirish uchun firma tanlang (Sahifa {page}/{total_pages}):", lang), reply_markup=keyboard)
 
 @dp.callback_query_handler(lambda c: c.data.startswith("delete_firm_page_"), user_id=ADMIN_IDS)
 async def delete_firma_paginate(callback_query: types.CallbackQuery):
     await bot.answer_callback_query(callback_query.id)
     user_id = callback_query.from_user.id
-    lang = get_user_language(user_id)
+    lang = await db.get_user_language(user_id)
     page = int(callback_query.data.split("_")[-1])
-    firms = get_all_firms()
-    keyboard, page, total_pages = create_paginated_keyboard(firms, "delete_firm", page=page, lang=lang)
+    keyboard, page, total_pages = await create_firm_picker_keyboard("delete_firm", page=page, lang=lang)
     await bot.edit_message_text(
         translate_text(f"Hisobotni o'chirish uchun firma tanlang (Sahifa {page}/{total_pages}):", lang),
         callback_query.from_user.id,
@@ -1340,36 +1311,36 @@ async def delete_firma_paginate(callback_query: types.CallbackQuery):
 async def start_delete_firma_search(callback_query: types.CallbackQuery, state: FSMContext):
     await bot.answer_callback_query(callback_query.id)
     user_id = callback_query.from_user.id
-    lang = get_user_language(user_id)
+    lang = await db.get_user_language(user_id)
     await state.finish()
     await ManualInput.search.set()
     await state.update_data(search_context="delete_report")
-    await bot.send_message(callback_query.from_user.id, translate_text("Firma STIR yoki nomini kiriting (qisman moslik uchun):", lang))
+    await bot.send_message(callback_query.from_user.id, get_text(lang, 'search_firma_prompt'))
 
 @dp.callback_query_handler(lambda c: c.data.startswith("delete_firm_"), user_id=ADMIN_IDS)
 async def select_month_to_delete(callback_query: types.CallbackQuery, state: FSMContext):
     await bot.answer_callback_query(callback_query.id)
     user_id = callback_query.from_user.id
-    lang = get_user_language(user_id)
+    lang = await db.get_user_language(user_id)
     stir = callback_query.data.split("_", 2)[2]
     await state.update_data(stir=stir)
     keyboard = InlineKeyboardMarkup(row_width=3)
-    oylar = ["yanvar", "fevral", "mart", "aprel", "may", "iyun", "iyul"]
+    oylar = MONTHS
     for oy in oylar:
         keyboard.insert(InlineKeyboardButton(get_month_name(lang, oy), callback_data=f"delete_oy_{stir}_{oy}"))
-    await bot.send_message(callback_query.from_user.id, translate_text("Qaysi oyning hisobotini o'chirishni xohlaysiz?", lang), reply_markup=keyboard)
+    await bot.send_message(callback_query.from_user.id, get_text(lang, 'delete_which_month'), reply_markup=keyboard)
 
 @dp.callback_query_handler(lambda c: c.data.startswith("delete_oy_"), user_id=ADMIN_IDS)
 async def confirm_delete_report(callback_query: types.CallbackQuery, state: FSMContext):
     await bot.answer_callback_query(callback_query.id)
     user_id = callback_query.from_user.id
-    lang = get_user_language(user_id)
+    lang = await db.get_user_language(user_id)
     _, _, stir, oy = callback_query.data.split("_")
     await state.update_data(oy=oy)
     keyboard = InlineKeyboardMarkup(row_width=2)
     keyboard.add(
-        InlineKeyboardButton(translate_text("Ha, o'chirish", lang), callback_data=f"confirm_delete_{stir}_{oy}"),
-        InlineKeyboardButton(translate_text("Yo'q, bekor qilish", lang), callback_data="cancel_delete")
+        InlineKeyboardButton(get_text(lang, 'btn_confirm_delete'), callback_data=f"confirm_delete_{stir}_{oy}"),
+        InlineKeyboardButton(get_text(lang, 'btn_cancel_delete'), callback_data="cancel_delete")
     )
     await bot.send_message(callback_query.from_user.id, translate_text(f"{get_month_name(lang, oy)} oyi uchun hisobotni o'chirishni xohlaysizmi?", lang), reply_markup=keyboard)
 
@@ -1377,26 +1348,20 @@ async def confirm_delete_report(callback_query: types.CallbackQuery, state: FSMC
 async def delete_report(callback_query: types.CallbackQuery, state: FSMContext):
     await bot.answer_callback_query(callback_query.id)
     user_id = callback_query.from_user.id
-    lang = get_user_language(user_id)
+    lang = await db.get_user_language(user_id)
     _, _, stir, oy = callback_query.data.split("_")
     
     # Firma soliq turini olish
-    conn = sqlite3.connect(os.path.join(DATA_PATH, "bot.db"))
-    c = conn.cursor()
-    c.execute("SELECT soliq_turi FROM firms WHERE stir = ?", (stir,))
-    result = c.fetchone()
-    soliq_turi = result[0].lower() if result and result[0] else 'daromad'
+    result = await db.get_firma_info(stir)
+    soliq_turi = result[2].lower() if result and result[2] else 'daromad'
     
     # Hisobot va fayllarni o'chirish
-    c.execute("DELETE FROM reports WHERE stir = ? AND oy = ?", (stir, oy))
-    c.execute("DELETE FROM files WHERE stir = ? AND oy = ?", (stir, oy))
-    conn.commit()
-    conn.close()
+    await db.delete_report_data(stir, oy)
     
     # Faqat firma soliq turiga mos fayllarni o'chirish
     for file_type in ["excel1_latin", "excel1_cyrillic", "excel2_latin", "excel2_cyrillic", "html"]:
-        file_path_latin = os.path.join(DATA_PATH, stir, soliq_turi, f"{get_month_name('uz_latin', oy)}{'1' if 'excel1' in file_type else '2' if 'excel2' in file_type else '3'}{'' if file_type == 'html' else '.xlsx'}")
-        file_path_cyrillic = os.path.join(DATA_PATH, stir, soliq_turi, f"{get_month_name('uz_cyrillic', oy)}{'1' if 'excel1' in file_type else '2' if 'excel2' in file_type else '3'}{'' if file_type == 'html' else '.xlsx'}")
+        file_path_latin = os.path.join(report_dir(stir, soliq_turi), f"{get_month_name('uz_latin', oy)}{'1' if 'excel1' in file_type else '2' if 'excel2' in file_type else '3'}{'' if file_type == 'html' else '.xlsx'}")
+        file_path_cyrillic = os.path.join(report_dir(stir, soliq_turi), f"{get_month_name('uz_cyrillic', oy)}{'1' if 'excel1' in file_type else '2' if 'excel2' in file_type else '3'}{'' if file_type == 'html' else '.xlsx'}")
         for file_path in [file_path_latin, file_path_cyrillic]:
             if os.path.exists(file_path):
                 os.remove(file_path)
@@ -1411,25 +1376,25 @@ async def delete_report(callback_query: types.CallbackQuery, state: FSMContext):
 async def cancel_delete(callback_query: types.CallbackQuery, state: FSMContext):
     await bot.answer_callback_query(callback_query.id)
     user_id = callback_query.from_user.id
-    lang = get_user_language(user_id)
+    lang = await db.get_user_language(user_id)
     await state.finish()
-    await bot.send_message(callback_query.from_user.id, translate_text("❌ O'chirish bekor qilindi.", lang))
+    await bot.send_message(callback_query.from_user.id, get_text(lang, 'delete_cancelled'))
 
 @dp.callback_query_handler(lambda c: c.data == "manual_input", user_id=ADMIN_IDS)
 async def start_manual_input(callback_query: types.CallbackQuery, state: FSMContext):
     await bot.answer_callback_query(callback_query.id)
     user_id = callback_query.from_user.id
-    lang = get_user_language(user_id)
+    lang = await db.get_user_language(user_id)
     keyboard = InlineKeyboardMarkup(row_width=2)
     keyboard.add(
-        InlineKeyboardButton(translate_text("Daromad solig'i", lang), callback_data="manual_daromad"),
-        InlineKeyboardButton(translate_text("Yagona soliq", lang), callback_data="manual_yagona"),
-        InlineKeyboardButton(translate_text("Qo‘shilgan qiymat solig‘i", lang), callback_data="manual_qqs")
+        InlineKeyboardButton(get_text(lang, 'btn_daromad'), callback_data="manual_daromad"),
+        InlineKeyboardButton(get_text(lang, 'btn_yagona'), callback_data="manual_yagona"),
+        InlineKeyboardButton(get_text(lang, 'btn_qqs'), callback_data="manual_qqs")
     )
     await ManualInput.select_soliq_turi.set()
     await bot.send_message(
         callback_query.from_user.id,
-        translate_text("Hisobot kiritish uchun soliq turini tanlang:", lang),
+        get_text(lang, 'manual_choose_tax_type'),
         reply_markup=keyboard
     )
 
@@ -1437,14 +1402,14 @@ async def start_manual_input(callback_query: types.CallbackQuery, state: FSMCont
 async def process_soliq_turi_selection(callback_query: types.CallbackQuery, state: FSMContext):
     await bot.answer_callback_query(callback_query.id)
     user_id = callback_query.from_user.id
-    lang = get_user_language(user_id)
+    lang = await db.get_user_language(user_id)
     soliq_turi = callback_query.data.split("_")[1]  # "daromad", "yagona", or "qqs"
     await state.update_data(soliq_turi=soliq_turi)
 
     keyboard = InlineKeyboardMarkup(row_width=2)
     keyboard.add(
-        InlineKeyboardButton(translate_text("Excel fayl yuklash", lang), callback_data="upload_excel"),
-        InlineKeyboardButton(translate_text("Qo'lda kiritish", lang), callback_data="manual_no_excel")
+        InlineKeyboardButton(get_text(lang, 'btn_upload_excel'), callback_data="upload_excel"),
+        InlineKeyboardButton(get_text(lang, 'btn_manual_input'), callback_data="manual_no_excel")
     )
     await ManualInput.excel_upload.set()
     await bot.send_message(
@@ -1459,7 +1424,7 @@ async def process_soliq_turi_selection(callback_query: types.CallbackQuery, stat
 async def request_excel_file(callback_query: types.CallbackQuery, state: FSMContext):
     await bot.answer_callback_query(callback_query.id)
     user_id = callback_query.from_user.id
-    lang = get_user_language(user_id)
+    lang = await db.get_user_language(user_id)
     data = await state.get_data()
     last_message_id = data.get('last_message_id')
 
@@ -1472,15 +1437,15 @@ async def request_excel_file(callback_query: types.CallbackQuery, state: FSMCont
 
     sent_message = await bot.send_message(
         callback_query.from_user.id,
-        translate_text("xlsx faylni yuklang yoki /cancel bosib amaliyotni bekor qilin", lang)
+        get_text(lang, 'upload_xlsx_or_cancel')
     )
     await state.update_data(last_message_id=sent_message.message_id)
 @dp.message_handler(content_types=['document'], state=ManualInput.excel_upload, user_id=ADMIN_IDS)
 async def process_excel_upload(message: types.Message, state: FSMContext):
     user_id = message.from_user.id
-    lang = get_user_language(user_id)
+    lang = await db.get_user_language(user_id)
     if not message.document.file_name.endswith('.xlsx'):
-        await message.answer(translate_text("❌ Faqat .xlsx fayllarni yuklang.", lang))
+        await message.answer(get_text(lang, 'only_xlsx'))
         return
     data = await state.get_data()
     soliq_turi = data.get('soliq_turi')
@@ -1495,7 +1460,7 @@ async def process_excel_upload(message: types.Message, state: FSMContext):
     elif soliq_turi == 'qqs':
         firms, error = parse_qqs_excel(file_path, lang)
     else:
-        await message.answer(translate_text("❌ Noto'g'ri soliq turi.", lang))
+        await message.answer(get_text(lang, 'invalid_soliq_turi'))
         return
 
     if not firms:
@@ -1518,10 +1483,20 @@ async def process_excel_upload(message: types.Message, state: FSMContext):
 async def manual_firm_paginate(callback_query: types.CallbackQuery, state: FSMContext):
     await bot.answer_callback_query(callback_query.id)
     user_id = callback_query.from_user.id
-    lang = get_user_language(user_id)
+    lang = await db.get_user_language(user_id)
     page = int(callback_query.data.split("_")[-1])
     data = await state.get_data()
-    firms = data.get('firms', {})
+    firms = data.get('firms')
+    if not firms:
+        # Excel siz kiritish (skip_excel_upload) - firmalar reyestridan
+        keyboard, page, total_pages = await create_firm_picker_keyboard("manual_firm", page=page, lang=lang)
+        await bot.edit_message_text(
+            translate_text(f"Hisobot kiritish uchun firmani tanlang (Sahifa {page}/{total_pages}):", lang),
+            callback_query.from_user.id,
+            callback_query.message.message_id,
+            reply_markup=keyboard
+        )
+        return
     firms_list = [(k[0], k[1], v['firma_nomi']) for k, v in firms.items()]
     keyboard, page, total_pages = create_paginated_keyboard(firms_list, "manual_firm", page=page, lang=lang)
     await bot.edit_message_text(
@@ -1535,26 +1510,25 @@ async def manual_firm_paginate(callback_query: types.CallbackQuery, state: FSMCo
 async def start_manual_firm_search(callback_query: types.CallbackQuery, state=FSMContext):
     await bot.answer_callback_query(callback_query.id)
     user_id = callback_query.from_user.id
-    lang = get_user_language(user_id)
+    lang = await db.get_user_language(user_id)
     await ManualInput.search.set()
     await state.update_data(search_context="manual_excel")
-    await bot.send_message(callback_query.from_user.id, translate_text("Excel faylidagi firma STIR yoki nomini kiriting (qisman moslik uchun):", lang))
+    await bot.send_message(callback_query.from_user.id, get_text(lang, 'search_excel_firma_prompt'))
 
 @dp.callback_query_handler(lambda c: c.data == "manual_no_excel", user_id=ADMIN_IDS, state=ManualInput.excel_upload)
 async def skip_excel_upload(callback_query: types.CallbackQuery, state: FSMContext):
     await bot.answer_callback_query(callback_query.id)
     user_id = callback_query.from_user.id
-    lang = get_user_language(user_id)
+    lang = await db.get_user_language(user_id)
     data = await state.get_data()
     soliq_turi = data.get('soliq_turi')
 
-    firms = get_all_firms()
-    if not firms:
-        await bot.send_message(callback_query.from_user.id, translate_text("❌ Hozircha firmalar mavjud emas.", lang))
+    if not await db.count_firms():
+        await bot.send_message(callback_query.from_user.id, get_text(lang, 'no_firms_yet'))
         await state.finish()
         return
 
-    keyboard, page, total_pages = create_paginated_keyboard(firms, "manual_firm", page=1, lang=lang)
+    keyboard, page, total_pages = await create_firm_picker_keyboard("manual_firm", page=1, lang=lang)
     await ManualInput.stir.set()
     await bot.send_message(
         callback_query.from_user.id,
@@ -1565,7 +1539,7 @@ async def skip_excel_upload(callback_query: types.CallbackQuery, state: FSMConte
 async def select_firma_or_month(callback_query: types.CallbackQuery, state=FSMContext):
     await bot.answer_callback_query(callback_query.id)
     user_id = callback_query.from_user.id
-    lang = get_user_language(user_id)
+    lang = await db.get_user_language(user_id)
     data = await state.get_data()
     parts = callback_query.data.split("_")
     stir = parts[2]
@@ -1573,14 +1547,14 @@ async def select_firma_or_month(callback_query: types.CallbackQuery, state=FSMCo
     soliq_turi = data.get('soliq_turi')
 
     if not re.match(r'^\d{9}$', stir):
-        await bot.send_message(callback_query.from_user.id, translate_text("❌ Noto'g'ri STIR formati. /admin orqali qayta boshlang.", lang))
+        await bot.send_message(callback_query.from_user.id, get_text(lang, 'invalid_stir_restart'))
         return
 
     await state.update_data(stir=stir)
 
     if oy:
-        if oy not in ['yanvar', 'fevral', 'mart', 'aprel', 'may', 'iyun', 'iyul']:
-            await bot.send_message(callback_query.from_user.id, translate_text("❌ Noto'g'ri oy formati. /admin orqali qayta boshlang.", lang))
+        if oy not in MONTHS:
+            await bot.send_message(callback_query.from_user.id, get_text(lang, 'invalid_month_restart'))
             return
         await state.update_data(oy=oy)
         if soliq_turi == 'daromad':
@@ -1591,19 +1565,12 @@ async def select_firma_or_month(callback_query: types.CallbackQuery, state=FSMCo
             if key in firms:
                 firm = firms[key]
                 try:
-                    # Handle soliq_turi_yagona as string or float
                     soliq_turi_yagona = firm['soliq_turi_yagona']
-                    if isinstance(soliq_turi_yagona, str):
-                        soliq_rate = float(soliq_turi_yagona.strip('%')) / 100
-                    elif isinstance(soliq_turi_yagona, (int, float)):
-                        soliq_rate = soliq_turi_yagona / 100
-                    else:
-                        raise ValueError(f"Invalid soliq_turi_yagona format: {soliq_turi_yagona}")
-                    
-                    yagona_soliq = int(firm['shu_oy_aylanma'] * soliq_rate)
+                    yagona_soliq = apply_rate(firm['shu_oy_aylanma'], firm['soliq_bp'])
                     result = get_text(
                         lang,
                         'yagona_report',
+                        yil=REPORT_YEAR,
                         firma_nomi=firm['firma_nomi'],
                         rahbar=firm['rahbar'],
                         oy=get_month_name(lang, oy),
@@ -1623,18 +1590,18 @@ async def select_firma_or_month(callback_query: types.CallbackQuery, state=FSMCo
                     )
                     keyboard = InlineKeyboardMarkup(row_width=2)
                     keyboard.add(
-                        InlineKeyboardButton(translate_text("Tasdiqlash", lang), callback_data="confirm_report"),
-                        InlineKeyboardButton(translate_text("Tahrirlash", lang), callback_data="edit_report"),
-                        InlineKeyboardButton(translate_text("Bekor qilish", lang), callback_data="cancel_report")
+                        InlineKeyboardButton(get_text(lang, 'btn_confirm'), callback_data="confirm_report"),
+                        InlineKeyboardButton(get_text(lang, 'btn_edit'), callback_data="edit_report"),
+                        InlineKeyboardButton(get_text(lang, 'btn_cancel'), callback_data="cancel_report")
                     )
                     await ManualInput.confirm.set()
-                    await bot.send_message(callback_query.from_user.id, result + "\n" + translate_text("Tasdiqlaysizmi?", lang), reply_markup=keyboard)
+                    await bot.send_message(callback_query.from_user.id, result + "\n" + get_text(lang, 'confirm_question'), reply_markup=keyboard)
                 except Exception as e:
                     logger.error(f"Yagona soliq hisoblashda xato: STIR={stir}, Oy={oy}, Error={str(e)}")
                     await bot.send_message(callback_query.from_user.id, translate_text(f"❌ Yagona soliq hisoblashda xato: {str(e)}", lang))
                     return
             else:
-                firma_name = get_firma_name(stir)
+                firma_name = await db.get_firma_name(stir)
                 await state.update_data(firma_name=firma_name)
                 await ManualInput.yagona_data.set()
                 await bot.send_message(
@@ -1651,19 +1618,12 @@ async def select_firma_or_month(callback_query: types.CallbackQuery, state=FSMCo
             if key in firms:
                 firm = firms[key]
                 try:
-                    # Handle soliq_turi_qqs as string or float
                     soliq_turi_qqs = firm['soliq_turi_qqs']
-                    if isinstance(soliq_turi_qqs, str):
-                        soliq_rate = float(soliq_turi_qqs.strip('%')) / 100
-                    elif isinstance(soliq_turi_qqs, (int, float)):
-                        soliq_rate = soliq_turi_qqs / 100
-                    else:
-                        raise ValueError(f"Invalid soliq_turi_qqs format: {soliq_turi_qqs}")
-                    
-                    qqs_soliq = int(firm['shu_oy_qqs'] * soliq_rate)
+                    qqs_soliq = apply_rate(firm['shu_oy_qqs'], firm['soliq_bp'])
                     result = get_text(
                         lang,
                         'qqs_report',
+                        yil=REPORT_YEAR,
                         firma_nomi=firm['firma_nomi'],
                         rahbar=firm['rahbar'],
                         oy=get_month_name(lang, oy),
@@ -1683,18 +1643,18 @@ async def select_firma_or_month(callback_query: types.CallbackQuery, state=FSMCo
                     )
                     keyboard = InlineKeyboardMarkup(row_width=2)
                     keyboard.add(
-                        InlineKeyboardButton(translate_text("Tasdiqlash", lang), callback_data="confirm_report"),
-                        InlineKeyboardButton(translate_text("Tahrirlash", lang), callback_data="edit_report"),
-                        InlineKeyboardButton(translate_text("Bekor qilish", lang), callback_data="cancel_report")
+                        InlineKeyboardButton(get_text(lang, 'btn_confirm'), callback_data="confirm_report"),
+                        InlineKeyboardButton(get_text(lang, 'btn_edit'), callback_data="edit_report"),
+                        InlineKeyboardButton(get_text(lang, 'btn_cancel'), callback_data="cancel_report")
                     )
                     await ManualInput.confirm.set()
-                    await bot.send_message(callback_query.from_user.id, result + "\n" + translate_text("Tasdiqlaysizmi?", lang), reply_markup=keyboard)
+                    await bot.send_message(callback_query.from_user.id, result + "\n" + get_text(lang, 'confirm_question'), reply_markup=keyboard)
                 except Exception as e:
                     logger.error(f"QQS soliq hisoblashda xato: STIR={stir}, Oy={oy}, Error={str(e)}")
                     await bot.send_message(callback_query.from_user.id, translate_text(f"❌ QQS soliq hisoblashda xato: {str(e)}", lang))
                     return
             else:
-                firma_name = get_firma_name(stir)
+                firma_name = await db.get_firma_name(stir)
                 await state.update_data(firma_name=firma_name)
                 await ManualInput.qqs_data.set()
                 await bot.send_message(
@@ -1707,12 +1667,12 @@ async def select_firma_or_month(callback_query: types.CallbackQuery, state=FSMCo
                 )
     else:
         keyboard = InlineKeyboardMarkup(row_width=3)
-        oylar = ["yanvar", "fevral", "mart", "aprel", "may", "iyun", "iyul"]
+        oylar = MONTHS
         for oy in oylar:
             keyboard.insert(InlineKeyboardButton(get_month_name(lang, oy), callback_data=f"manual_oy_{stir}_{oy}"))
         await bot.send_message(
             callback_query.from_user.id,
-            translate_text("Qaysi oy uchun hisobot kiritmoqchisiz?", lang),
+            get_text(lang, 'manual_which_month'),
             reply_markup=keyboard
         )
 
@@ -1720,7 +1680,7 @@ async def select_firma_or_month(callback_query: types.CallbackQuery, state=FSMCo
 async def select_month_manual(callback_query: types.CallbackQuery, state=FSMContext):
     await bot.answer_callback_query(callback_query.id)
     user_id = callback_query.from_user.id
-    lang = get_user_language(user_id)
+    lang = await db.get_user_language(user_id)
     try:
         parts = callback_query.data.split("_")
         if len(parts) != 4:
@@ -1728,20 +1688,20 @@ async def select_month_manual(callback_query: types.CallbackQuery, state=FSMCont
         stir = parts[2]
         oy = parts[3]
         if not re.match(r'^\d{9}$', stir):
-            await bot.send_message(callback_query.from_user.id, translate_text("❌ Noto'g'ri STIR formati. /admin orqali qayta boshlang.", lang))
+            await bot.send_message(callback_query.from_user.id, get_text(lang, 'invalid_stir_restart'))
             return
-        if oy not in ['yanvar', 'fevral', 'mart', 'aprel', 'may', 'iyun', 'iyul']:
-            await bot.send_message(callback_query.from_user.id, translate_text("❌ Noto'g'ri oy formati. /admin orqali qayta boshlang.", lang))
+        if oy not in MONTHS:
+            await bot.send_message(callback_query.from_user.id, get_text(lang, 'invalid_month_restart'))
             return
         await state.update_data(stir=stir, oy=oy)
         await process_excel_data(callback_query, state)
     except Exception as e:
         logger.error(f"select_month_manual xatosi: {e}, callback_data={callback_query.data}")
-        await bot.send_message(callback_query.from_user.id, translate_text("❌ Xatolik yuz berdi. /admin orqali qayta boshlang.", lang))
+        await bot.send_message(callback_query.from_user.id, get_text(lang, 'error_restart_admin'))
 
 async def process_excel_data(callback_query: types.CallbackQuery, state: FSMContext):
     user_id = callback_query.from_user.id
-    lang = get_user_language(user_id)
+    lang = await db.get_user_language(user_id)
     data = await state.get_data()
     stir = data.get('stir')
     oy = data.get('oy')
@@ -1760,8 +1720,8 @@ async def process_excel_data(callback_query: types.CallbackQuery, state: FSMCont
         # Xodimlar ma'lumotlarini to'g'ri formatda shakllantirish
         xodimlar_data = [
             f"{i+1} ({x['lavozim']}) – {x['ism']}, "
-            f"{translate_text('bu_oy_uchun_hisobotda', lang)}: {x['shu_oy']:,} {translate_text('so‘m', lang)} "
-            f"({translate_text('yil_boshidan_hisobotda', lang)}: {x['yil_boshidan']:,} {translate_text('so‘m', lang)})"
+            f"{get_text(lang, 'bu_oy_uchun_hisobotda')}: {x['shu_oy']:,} {get_text(lang, 'som')} "
+            f"({get_text(lang, 'yil_boshidan_hisobotda')}: {x['yil_boshidan']:,} {get_text(lang, 'som')})"
             for i, x in enumerate(xodimlar)
         ]
 
@@ -1784,14 +1744,14 @@ async def process_excel_data(callback_query: types.CallbackQuery, state: FSMCont
         )
         keyboard = InlineKeyboardMarkup(row_width=2)
         keyboard.add(
-            InlineKeyboardButton(translate_text("Tasdiqlash", lang), callback_data="confirm_report"),
-            InlineKeyboardButton(translate_text("Tahrirlash", lang), callback_data="edit_report"),
-            InlineKeyboardButton(translate_text("Bekor qilish", lang), callback_data="cancel_report")
+            InlineKeyboardButton(get_text(lang, 'btn_confirm'), callback_data="confirm_report"),
+            InlineKeyboardButton(get_text(lang, 'btn_edit'), callback_data="edit_report"),
+            InlineKeyboardButton(get_text(lang, 'btn_cancel'), callback_data="cancel_report")
         )
         await ManualInput.confirm.set()
-        await bot.send_message(callback_query.from_user.id, result + "\n" + translate_text("Tasdiqlaysizmi?", lang), reply_markup=keyboard)
+        await bot.send_message(callback_query.from_user.id, result + "\n" + get_text(lang, 'confirm_question'), reply_markup=keyboard)
     else:
-        firma_name = get_firma_name(stir)
+        firma_name = await db.get_firma_name(stir)
         await state.update_data(firma_name=firma_name)
         await ManualInput.firma_name.set()
         await bot.send_message(callback_query.from_user.id, translate_text(f"Excel faylida {stir} uchun {get_month_name(lang, oy)} ma'lumotlari topilmadi.\nFirma nomi (hozirgi: {firma_name}, o'zgartirish uchun yangi nom kiriting yoki bo'sh qoldiring):", lang))
@@ -1800,7 +1760,7 @@ async def process_excel_data(callback_query: types.CallbackQuery, state: FSMCont
 @dp.message_handler(state=ManualInput.yagona_data, user_id=ADMIN_IDS)
 async def process_yagona_data(message: types.Message, state: FSMContext):
     user_id = message.from_user.id
-    lang = get_user_language(user_id)
+    lang = await db.get_user_language(user_id)
     data = await state.get_data()
     stir = data.get('stir')
     oy = data.get('oy')
@@ -1826,15 +1786,23 @@ async def process_yagona_data(message: types.Message, state: FSMContext):
         yil_boshidan_aylanma = int(yil_boshidan_aylanma.replace(" ", ""))
         shu_oy_aylanma = int(shu_oy_aylanma.replace(" ", ""))
     except ValueError:
-        await message.answer(translate_text("❌ Aylanma summalari raqam bo'lishi kerak.", lang))
+        await message.answer(get_text(lang, 'aylanma_not_number'))
+        return
+    # Stavka bir marta bazis punktga o'giriladi; soliq Excel yo'li kabi apply_rate bilan
+    try:
+        soliq_bp = parse_rate_bp(soliq_turi_yagona)
+    except ValueError:
+        await message.answer(get_text(lang, 'invalid_rate', stavka=soliq_turi_yagona))
         return
+    soliq_turi_yagona = f"{format_rate(soliq_bp)}%"
 
-    yagona_soliq = int(shu_oy_aylanma * (float(soliq_turi_yagona.strip('%')) / 100))
-    rahbar = get_firma_info(stir)[1] or "Noma'lum"
+    yagona_soliq = apply_rate(shu_oy_aylanma, soliq_bp)
+    rahbar = (await db.get_firma_info(stir))[1] or "Noma'lum"
 
     result = get_text(
         lang,
         'yagona_report',
+        yil=REPORT_YEAR,
         firma_nomi=firma_name,
         rahbar=rahbar,
         oy=get_month_name(lang, oy),
@@ -1852,17 +1820,17 @@ async def process_yagona_data(message: types.Message, state: FSMContext):
     )
     keyboard = InlineKeyboardMarkup(row_width=2)
     keyboard.add(
-        InlineKeyboardButton(translate_text("Tasdiqlash", lang), callback_data="confirm_report"),
-        InlineKeyboardButton(translate_text("Tahrirlash", lang), callback_data="edit_report"),
-        InlineKeyboardButton(translate_text("Bekor qilish", lang), callback_data="cancel_report")
+        InlineKeyboardButton(get_text(lang, 'btn_confirm'), callback_data="confirm_report"),
+        InlineKeyboardButton(get_text(lang, 'btn_edit'), callback_data="edit_report"),
+        InlineKeyboardButton(get_text(lang, 'btn_cancel'), callback_data="cancel_report")
     )
     await ManualInput.confirm.set()
-    await message.answer(result + "\n" + translate_text("Tasdiqlaysizmi?", lang), reply_markup=keyboard)
+    await message.answer(result + "\n" + get_text(lang, 'confirm_question'), reply_markup=keyboard)
 
 @dp.message_handler(state=ManualInput.qqs_data, user_id=ADMIN_IDS)
 async def process_qqs_data(message: types.Message, state: FSMContext):
     user_id = message.from_user.id
-    lang = get_user_language(user_id)
+    lang = await db.get_user_language(user_id)
     data = await state.get_data()
     stir = data.get('stir')
     oy = data.get('oy')
@@ -1888,15 +1856,23 @@ async def process_qqs_data(message: types.Message, state: FSMContext):
         yil_boshidan_qqs = int(yil_boshidan_qqs.replace(" ", ""))
         shu_oy_qqs = int(shu_oy_qqs.replace(" ", ""))
     except ValueError:
-        await message.answer(translate_text("❌ QQS summalari raqam bo'lishi kerak.", lang))
+        await message.answer(get_text(lang, 'qqs_not_number'))
+        return
+    # Stavka bir marta bazis punktga o'giriladi; soliq Excel yo'li kabi apply_rate bilan
+    try:
+        soliq_bp = parse_rate_bp(soliq_turi_qqs)
+    except ValueError:
+        await message.answer(get_text(lang, 'invalid_rate', stavka=soliq_turi_qqs))
         return
+    soliq_turi_qqs = f"{format_rate(soliq_bp)}%"
 
-    qqs_soliq = int(shu_oy_qqs * (float(soliq_turi_qqs.strip('%')) / 100))
-    rahbar = get_firma_info(stir)[1] or "Noma'lum"
+    qqs_soliq = apply_rate(shu_oy_qqs, soliq_bp)
+    rahbar = (await db.get_firma_info(stir))[1] or "Noma'lum"
 
     result = get_text(
         lang,
         'qqs_report',
+        yil=REPORT_YEAR,
         firma_nomi=firma_name,
         rahbar=rahbar,
         oy=get_month_name(lang, oy),
@@ -1914,12 +1890,12 @@ async def process_qqs_data(message: types.Message, state: FSMContext):
     )
     keyboard = InlineKeyboardMarkup(row_width=2)
     keyboard.add(
-        InlineKeyboardButton(translate_text("Tasdiqlash", lang), callback_data="confirm_report"),
-        InlineKeyboardButton(translate_text("Tahrirlash", lang), callback_data="edit_report"),
-        InlineKeyboardButton(translate_text("Bekor qilish", lang), callback_data="cancel_report")
+        InlineKeyboardButton(get_text(lang, 'btn_confirm'), callback_data="confirm_report"),
+        InlineKeyboardButton(get_text(lang, 'btn_edit'), callback_data="edit_report"),
+        InlineKeyboardButton(get_text(lang, 'btn_cancel'), callback_data="cancel_report")
     )
     await ManualInput.confirm.set()
-    await message.answer(result + "\n" + translate_text("Tasdiqlaysizmi?", lang), reply_markup=keyboard)
+    await message.answer(result + "\n" + get_text(lang, 'confirm_question'), reply_markup=keyboard)
 
 
 
@@ -1927,35 +1903,35 @@ async def process_qqs_data(message: types.Message, state: FSMContext):
 @dp.message_handler(state=ManualInput.firma_name, user_id=ADMIN_IDS)
 async def process_firma_name(message: types.Message, state=FSMContext):
     user_id = message.from_user.id
-    lang = get_user_language(user_id)
+    lang = await db.get_user_language(user_id)
     firma_name = message.text.strip()
     data = await state.get_data()
     stir = data['stir']
     if not firma_name:
-        firma_name = data.get('firma_name', get_firma_name(stir))
+        firma_name = data.get('firma_name', await db.get_firma_name(stir))
     if len(firma_name) < 3:
-        await message.answer(translate_text("❌ Firma nomi kamida 3 ta belgidan iborat bo'lishi kerak.", lang))
+        await message.answer(get_text(lang, 'firma_name_too_short'))
         return
     if lang == 'uz_cyrillic':
         firma_name = convert_to_cyrillic(firma_name)
     await state.update_data(firma_name=firma_name)
     await ManualInput.xodimlar_soni.set()
-    await message.answer(translate_text(f"Xodimlar sonini kiriting (raqam bilan, masalan: 2):", lang))
+    await message.answer(get_text(lang, 'enter_xodimlar_soni'))
 
 @dp.message_handler(state=ManualInput.xodimlar_soni, user_id=ADMIN_IDS)
 async def process_xodimlar_soni(message: types.Message, state=FSMContext):
     user_id = message.from_user.id
-    lang = get_user_language(user_id)
+    lang = await db.get_user_language(user_id)
     try:
         xodimlar_soni = int(message.text.strip())
         if xodimlar_soni <= 0:
-            await message.answer(translate_text("❌ Xodimlar soni 0 dan katta bo'lishi kerak.", lang))
+            await message.answer(get_text(lang, 'xodimlar_soni_positive'))
             return
         await state.update_data(xodimlar_soni=xodimlar_soni, xodimlar_data=[], xodimlar=[])
         await ManualInput.xodimlar_data.set()
-        await message.answer(translate_text(f"Xodimlar ma'lumotlarini kiriting (har bir xodim uchun: raqam (lavozim) – shu oy summasi so'm (yil boshidan jami so'm), masalan:\n1 (Rahbar) – 0 so'm (5000000 so'm)\nHar bir xodimni alohida kiriting, 1-xodimdan boshlang:"), lang)
+        await message.answer(get_text(lang, 'enter_xodimlar_data'))
     except ValueError:
-        await message.answer(translate_text("❌ Xodimlar soni raqam bo'lishi kerak.", lang))
+        await message.answer(get_text(lang, 'xodimlar_soni_not_number'))
 
 logger = logging.getLogger(__name__)
 
@@ -2052,6 +2028,25 @@ def parse_firms_excel(file_path, lang='uz_latin'):
     
 
 
+def create_firm_dirs(firms):
+    """Import qilingan firmalar uchun data/<stir>/<soliq_turi> papkalarini yaratadi."""
+    created = 0
+    for firm in firms:
+        stir = firm['stir']
+        subdirs = ["daromad"]
+        if firm['soliq_turi'] == 'ds-ys':
+            subdirs.append("yagona")
+        elif firm['soliq_turi'] == 'ds-qqs':
+            subdirs.append("qqs")
+        for sub in subdirs:
+            try:
+                os.makedirs(report_dir(stir, sub), exist_ok=True)
+                created += 1
+            except OSError as e:
+                logger.error(f"Papka yaratishda xato: {stir}/{sub}: {e}")
+    logger.info(f"Firma papkalari tayyor: {created} ta")
+
+
 class AddFirmsFromExcel(StatesGroup):
     excel_upload = State()
 
@@ -2059,7 +2054,7 @@ class AddFirmsFromExcel(StatesGroup):
 async def start_add_firms_excel(callback_query: types.CallbackQuery, state: FSMContext):
     await bot.answer_callback_query(callback_query.id)
     user_id = callback_query.from_user.id
-    lang = get_user_language(user_id)
+    lang = await db.get_user_language(user_id)
     data = await state.get_data()
     last_message_id = data.get('last_message_id')
 
@@ -2073,7 +2068,7 @@ async def start_add_firms_excel(callback_query: types.CallbackQuery, state: FSMC
     await AddFirmsFromExcel.excel_upload.set()
     sent_message = await bot.send_message(
         callback_query.from_user.id,
-        translate_text("xlsx faylni yuklang yoki /cancel bosib amaliyotni bekor qilin", lang)
+        get_text(lang, 'upload_xlsx_or_cancel')
     )
     await state.update_data(last_message_id=sent_message.message_id)
 
@@ -2082,10 +2077,10 @@ async def start_add_firms_excel(callback_query: types.CallbackQuery, state: FSMC
 @dp.message_handler(content_types=['document'], state=AddFirmsFromExcel.excel_upload, user_id=ADMIN_IDS)
 async def process_firms_excel(message: types.Message, state: FSMContext):
     user_id = message.from_user.id
-    lang = get_user_language(user_id)
+    lang = await db.get_user_language(user_id)
     await state.update_data(user_id=user_id)  # user_id ni state ga saqlash
     if not message.document.file_name.endswith('.xlsx'):
-        await message.answer(translate_text("❌ Faqat .xlsx fayllarni yuklang.", lang))
+        await message.answer(get_text(lang, 'only_xlsx'))
         await state.finish()
         return
 
@@ -2101,40 +2096,31 @@ async def process_firms_excel(message: types.Message, state: FSMContext):
         await state.finish()
         return
 
-    added_firms = []
-    for firm in firms:
-        stir = firm['stir']
-        firma_nomi = firm['firma_nomi']
-        rahbar = firm['rahbar']
-        phone = firm['phone']
-        soliq_turi = firm['soliq_turi'].lower()
-        ds_stavka = firm['ds_stavka']
-        ys_stavka = firm['ys_stavka']
-        qqs_stavka = firm['qqs_stavka']
-
-        add_firma(stir, firma_nomi, rahbar, soliq_turi, ds_stavka, ys_stavka, qqs_stavka)
-        add_firm_owner(stir, phone)
-        logger.info(f"Telefon saqlandi: {phone} -> STIR {stir}")
-        try:
-            os.makedirs(os.path.join(DATA_PATH, stir, "daromad"), exist_ok=True)
-            if soliq_turi == 'ds-ys':
-                os.makedirs(os.path.join(DATA_PATH, stir, "yagona"), exist_ok=True)
-                logger.info(f"Papka yaratildi: data/{stir}/yagona")
-            elif soliq_turi == 'ds-qqs':
-                os.makedirs(os.path.join(DATA_PATH, stir, "qqs"), exist_ok=True)
-                logger.info(f"Papka yaratildi: data/{stir}/qqs")
-            else:
-                logger.warning(f"Noto'g'ri soliq_turi: {soliq_turi} firma uchun {stir}")
-        except Exception as e:
-            logger.error(f"Papka yaratishda xato: {e}")
-        added_firms.append(f"{firma_nomi} ({stir})")
-        logger.info(f"Yangi firma qo'shildi: STIR={stir}, Name={firma_nomi}, Soliq_turi={soliq_turi}")
+    try:
+        result = await db.bulk_upsert_firms(firms)
+    except Exception as e:
+        logger.error(f"Firmalarni import qilishda xato: {e}")
+        await message.answer(translate_text(f"❌ Firmalarni saqlashda xato yuz berdi, hech narsa o'zgarmadi: {e}", lang))
+        if os.path.exists(file_path):
+            os.remove(file_path)
+        await state.finish()
+        return
+
+    # Papkalar bazaga yozilgandan keyin bitta o'tishda, faqat qabul qilingan
+    # firmalar uchun yaratiladi (takrorlangan STIR da oxirgi qator, bazadagidek)
+    accepted = set(result['accepted'])
+    saved = {str(firm['stir']).strip(): firm for firm in firms if str(firm.get('stir') or '').strip() in accepted}
+    await asyncio.get_running_loop().run_in_executor(None, create_firm_dirs, list(saved.values()))
 
     if os.path.exists(file_path):
         os.remove(file_path)
         logger.info(f"Vaqtinchalik fayl o'chirildi: {file_path}")
 
-    await message.answer(translate_text(f"✅ Quyidagi firmalar qo'shildi:\n{', '.join(added_firms)}", lang))
+    await message.answer(translate_text(
+        f"✅ Firmalar yuklandi: {result['inserted']} ta yangi, {result['updated']} ta yangilandi, "
+        f"{result['rejected']} ta rad etildi",
+        lang
+    ))
     await state.finish()
     await state.update_data(user_id=user_id)
     await back_to_admin_panel(state=state) # message orqali user_id uzatiladi
@@ -2142,7 +2128,7 @@ async def process_firms_excel(message: types.Message, state: FSMContext):
 @dp.message_handler(state=ManualInput.xodimlar_data, user_id=ADMIN_IDS)
 async def process_xodimlar_data(message: types.Message, state=FSMContext):
     user_id = message.from_user.id
-    lang = get_user_language(user_id)
+    lang = await db.get_user_language(user_id)
     data = await state.get_data()
     xodimlar_soni = data['xodimlar_soni']
     xodimlar_data = data.get('xodimlar_data', [])
@@ -2174,18 +2160,15 @@ async def process_xodimlar_data(message: types.Message, state=FSMContext):
         return
 
     # Tilga qarab lavozim va ismni tarjima qilish
-    if lang == 'uz_cyrillic':
-        lavozim = convert_to_cyrillic(lavozim)
-        ism_familya = convert_to_cyrillic(ism_familya)
-    else:
-        lavozim = translate_text(lavozim, 'uz_latin')
-        ism_familya = translate_text(ism_familya, 'uz_latin')
+    xodim_lang = 'uz_cyrillic' if lang == 'uz_cyrillic' else 'uz_latin'
+    lavozim = translate_text(lavozim, xodim_lang)
+    ism_familya = translate_text(ism_familya, xodim_lang)
 
     # To‘liq formatni shakllantirish
     xodimlar_data.append(
         f"{index} ({lavozim}) – {ism_familya}, "
-        f"{translate_text('bu_oy_uchun_hisobotda', lang)}: {shu_oy:,} {translate_text('so‘m', lang)} "
-        f"({translate_text('yil_boshidan_hisobotda', lang)}: {yil_boshidan:,} {translate_text('so‘m', lang)})"
+        f"{get_text(lang, 'bu_oy_uchun_hisobotda')}: {shu_oy:,} {get_text(lang, 'som')} "
+        f"({get_text(lang, 'yil_boshidan_hisobotda')}: {yil_boshidan:,} {get_text(lang, 'som')})"
     )
     xodimlar.append({
         'lavozim': lavozim,
@@ -2223,12 +2206,12 @@ async def process_xodimlar_data(message: types.Message, state=FSMContext):
     )
     keyboard = InlineKeyboardMarkup(row_width=2)
     keyboard.add(
-        InlineKeyboardButton(translate_text("Tasdiqlash", lang), callback_data="confirm_report"),
-        InlineKeyboardButton(translate_text("Tahrirlash", lang), callback_data="edit_report"),
-        InlineKeyboardButton(translate_text("Bekor qilish", lang), callback_data="cancel_report")
+        InlineKeyboardButton(get_text(lang, 'btn_confirm'), callback_data="confirm_report"),
+        InlineKeyboardButton(get_text(lang, 'btn_edit'), callback_data="edit_report"),
+        InlineKeyboardButton(get_text(lang, 'btn_cancel'), callback_data="cancel_report")
     )
     await ManualInput.confirm.set()
-    await message.answer(result + "\n" + translate_text("Tasdiqlaysizmi?", lang), reply_markup=keyboard)
+    await message.answer(result + "\n" + get_text(lang, 'confirm_question'), reply_markup=keyboard)
 
 
 
@@ -2236,7 +2219,7 @@ async def process_xodimlar_data(message: types.Message, state=FSMContext):
 async def confirm_manual_report(callback_query: types.CallbackQuery, state=FSMContext):
     await bot.answer_callback_query(callback_query.id)
     user_id = callback_query.from_user.id
-    lang = get_user_language(user_id)
+    lang = await db.get_user_language(user_id)
     data = await state.get_data()
     stir = data.get('stir')
     oy = data.get('oy')
@@ -2245,12 +2228,12 @@ async def confirm_manual_report(callback_query: types.CallbackQuery, state=FSMCo
     # Retrieve firma_name from state or database
     firma_name = data.get('firma_name')
     if not firma_name:
-        firma_name = get_firma_name(stir)
+        firma_name = await db.get_firma_name(stir)
         if not firma_name:
             logger.error(f"Firma nomi topilmadi: STIR={stir}, user_id={user_id}")
             await bot.send_message(
                 callback_query.from_user.id,
-                translate_text("❌ Firma nomi topilmadi. Iltimos, qayta boshlang.", lang)
+                get_text(lang, 'firma_name_missing_restart')
             )
             await state.finish()
             return
@@ -2265,19 +2248,19 @@ async def confirm_manual_report(callback_query: types.CallbackQuery, state=FSMCo
             soliq = data['soliq']
             xodimlar = data.get('xodimlar', [])
 
-            save_manual_report(stir, oy, firma_name, xodimlar_soni, "\n".join(xodimlar_data), hisobot_davri_oylik, jami_oylik, soliq)
+            await db.save_manual_report(stir, oy, firma_name, xodimlar_soni, "\n".join(xodimlar_data), hisobot_davri_oylik, jami_oylik, soliq)
 
-            dest_path_latin = os.path.join(DATA_PATH, stir, "daromad", f"{get_month_name('uz_latin', oy)}1.xlsx")
-            dest_path_cyrillic = os.path.join(DATA_PATH, stir, "daromad", f"{get_month_name('uz_cyrillic', oy)}1.xlsx")
+            dest_path_latin = os.path.join(report_dir(stir, "daromad"), f"{get_month_name('uz_latin', oy)}1.xlsx")
+            dest_path_cyrillic = os.path.join(report_dir(stir, "daromad"), f"{get_month_name('uz_cyrillic', oy)}1.xlsx")
             if generate_firma_excel(stir, oy, firma_name, xodimlar, dest_path_latin, dest_path_cyrillic):
-                save_file(stir, "daromad", oy, "excel1_latin", dest_path_latin)
-                save_file(stir, "daromad", oy, "excel1_cyrillic", dest_path_cyrillic)
+                await db.save_file(stir, "daromad", oy, "excel1_latin", dest_path_latin)
+                await db.save_file(stir, "daromad", oy, "excel1_cyrillic", dest_path_cyrillic)
                 logger.info(f"Excel fayllari saqlandi: {dest_path_latin}, {dest_path_cyrillic}")
             else:
                 logger.error(f"Excel fayllarini saqlashda xato: {dest_path_latin}, {dest_path_cyrillic}")
                 await bot.send_message(
                     callback_query.from_user.id,
-                    translate_text("⚠️ Hisobot saqlandi, lekin Excel fayllarini yaratishda xato yuz berdi.", lang)
+                    get_text(lang, 'report_saved_excel_failed')
                 )
         elif soliq_turi == 'yagona':
             soliq_turi_yagona = data['soliq_turi_yagona']
@@ -2286,19 +2269,19 @@ async def confirm_manual_report(callback_query: types.CallbackQuery, state=FSMCo
             yagona_soliq = data['yagona_soliq']
             rahbar = data['rahbar']
 
-            save_yagona_report(stir, oy, firma_name, rahbar, soliq_turi_yagona, yil_boshidan_aylanma, shu_oy_aylanma, yagona_soliq)
+            await db.save_yagona_report(stir, oy, firma_name, rahbar, soliq_turi_yagona, yil_boshidan_aylanma, shu_oy_aylanma, yagona_soliq)
 
-            dest_path_latin = os.path.join(DATA_PATH, stir, "yagona", f"{get_month_name('uz_latin', oy)}1.xlsx")
-            dest_path_cyrillic = os.path.join(DATA_PATH, stir, "yagona", f"{get_month_name('uz_cyrillic', oy)}1.xlsx")
+            dest_path_latin = os.path.join(report_dir(stir, "yagona"), f"{get_month_name('uz_latin', oy)}1.xlsx")
+            dest_path_cyrillic = os.path.join(report_dir(stir, "yagona"), f"{get_month_name('uz_cyrillic', oy)}1.xlsx")
             if generate_yagona_excel(stir, oy, firma_name, rahbar, soliq_turi_yagona, yil_boshidan_aylanma, shu_oy_aylanma, dest_path_latin, dest_path_cyrillic):
-                save_file(stir, "yagona", oy, "excel1_latin", dest_path_latin)
-                save_file(stir, "yagona", oy, "excel1_cyrillic", dest_path_cyrillic)
+                await db.save_file(stir, "yagona", oy, "excel1_latin", dest_path_latin)
+                await db.save_file(stir, "yagona", oy, "excel1_cyrillic", dest_path_cyrillic)
                 logger.info(f"Yagona Excel fayllari saqlandi: {dest_path_latin}, {dest_path_cyrillic}")
             else:
                 logger.error(f"Yagona Excel fayllarini saqlashda xato: {dest_path_latin}, {dest_path_cyrillic}")
                 await bot.send_message(
                     callback_query.from_user.id,
-                    translate_text("⚠️ Hisobot saqlandi, lekin Excel fayllarini yaratishda xato yuz berdi.", lang)
+                    get_text(lang, 'report_saved_excel_failed')
                 )
         elif soliq_turi == 'qqs':
             soliq_turi_qqs = data['soliq_turi_qqs']
@@ -2307,25 +2290,25 @@ async def confirm_manual_report(callback_query: types.CallbackQuery, state=FSMCo
             qqs_soliq = data['qqs_soliq']
             rahbar = data['rahbar']
 
-            save_qqs_report(stir, oy, firma_name, rahbar, soliq_turi_qqs, yil_boshidan_qqs, shu_oy_qqs, qqs_soliq)
+            await db.save_qqs_report(stir, oy, firma_name, rahbar, soliq_turi_qqs, yil_boshidan_qqs, shu_oy_qqs, qqs_soliq)
 
-            dest_path_latin = os.path.join(DATA_PATH, stir, "qqs", f"{get_month_name('uz_latin', oy)}1.xlsx")
-            dest_path_cyrillic = os.path.join(DATA_PATH, stir, "qqs", f"{get_month_name('uz_cyrillic', oy)}1.xlsx")
+            dest_path_latin = os.path.join(report_dir(stir, "qqs"), f"{get_month_name('uz_latin', oy)}1.xlsx")
+            dest_path_cyrillic = os.path.join(report_dir(stir, "qqs"), f"{get_month_name('uz_cyrillic', oy)}1.xlsx")
             if generate_yagona_excel(stir, oy, firma_name, rahbar, soliq_turi_qqs, yil_boshidan_qqs, shu_oy_qqs, dest_path_latin, dest_path_cyrillic):
-                save_file(stir, "qqs", oy, "excel1_latin", dest_path_latin)
-                save_file(stir, "qqs", oy, "excel1_cyrillic", dest_path_cyrillic)
+                await db.save_file(stir, "qqs", oy, "excel1_latin", dest_path_latin)
+                await db.save_file(stir, "qqs", oy, "excel1_cyrillic", dest_path_cyrillic)
                 logger.info(f"QQS Excel fayllari saqlandi: {dest_path_latin}, {dest_path_cyrillic}")
             else:
                 logger.error(f"QQS Excel fayllarini saqlashda xato: {dest_path_latin}, {dest_path_cyrillic}")
                 await bot.send_message(
                     callback_query.from_user.id,
-                    translate_text("⚠️ Hisobot saqlandi, lekin Excel fayllarini yaratishda xato yuz berdi.", lang)
+                    get_text(lang, 'report_saved_excel_failed')
                 )
         else:
             logger.error(f"Noto'g'ri soliq_turi: {soliq_turi}, STIR={stir}, Oy={oy}")
             await bot.send_message(
                 callback_query.from_user.id,
-                translate_text("❌ Noto'g'ri soliq turi. Iltimos, qayta boshlang.", lang)
+                get_text(lang, 'invalid_soliq_turi_restart')
             )
             await state.finish()
             return
@@ -2355,7 +2338,7 @@ async def confirm_manual_report(callback_query: types.CallbackQuery, state=FSMCo
 async def edit_manual_report(callback_query: types.CallbackQuery, state=FSMContext):
     await bot.answer_callback_query(callback_query.id)
     user_id = callback_query.from_user.id
-    lang = get_user_language(user_id)
+    lang = await db.get_user_language(user_id)
     data = await state.get_data()
     firma_name = data['firma_name']
     soliq_turi = data.get('soliq_turi')
@@ -2370,19 +2353,13 @@ async def edit_manual_report(callback_query: types.CallbackQuery, state=FSMConte
         await ManualInput.yagona_data.set()
         await bot.send_message(
             callback_query.from_user.id,
-            translate_text(
-                f"Yagona soliq ma'lumotlarini qayta kiriting (soliq stavkasi %, yil boshidan aylanma, shu oy aylanma, masalan: 4%, 10000000, 5000000):",
-                lang
-            )
+            get_text(lang, 'reenter_yagona_data')
         )
     elif soliq_turi == 'qqs':
         await ManualInput.qqs_data.set()
         await bot.send_message(
             callback_query.from_user.id,
-            translate_text(
-                f"QQS ma'lumotlarini qayta kiriting (soliq stavkasi %, yil boshidan QQS, shu oy QQS, masalan: 15%, 20000000, 10000000):",
-                lang
-            )
+            get_text(lang, 'reenter_qqs_data')
         )
 
 
@@ -2390,35 +2367,30 @@ async def edit_manual_report(callback_query: types.CallbackQuery, state=FSMConte
 async def cancel_manual_report(callback_query: types.CallbackQuery, state=FSMContext):
     await bot.answer_callback_query(callback_query.id)
     user_id = callback_query.from_user.id
-    lang = get_user_language(user_id)
+    lang = await db.get_user_language(user_id)
     data = await state.get_data()
     excel_file_path = data.get('excel_file_path')
     if excel_file_path and os.path.exists(excel_file_path):
         os.remove(excel_file_path)
         logger.info(f"Vaqtinchalik fayl o'chirildi: {excel_file_path}")
     await state.finish()
-    await bot.send_message(callback_query.from_user.id, translate_text("❌ Hisobot kiritish bekor qilindi.", lang))
+    await bot.send_message(callback_query.from_user.id, get_text(lang, 'report_input_cancelled'))
     logger.info(f"Hisobot kiritish bekor qilindi: user_id={callback_query.from_user.id}")
 
     
 @dp.message_handler(state=ManualInput.search, user_id=ADMIN_IDS)
 async def process_search(message: types.Message, state: FSMContext):
     user_id = message.from_user.id
-    lang = get_user_language(user_id)
-    search_query = message.text.strip().lower()
+    lang = await db.get_user_language(user_id)
+    search_query = message.text.strip()
 
     data = await state.get_data()
     search_context = data.get("search_context")
 
-    firms = get_all_firms()
-
-    filtered_firms = []
-    for stir, name in firms:
-        if search_query in stir.lower() or search_query in name.lower():
-            filtered_firms.append((stir, name))
+    filtered_firms = await search_index.find_firms(search_query)
 
     if not filtered_firms:
-        await message.answer(translate_text("❌ Qidiruv bo‘yicha firma topilmadi.", lang))
+        await message.answer(get_text(lang, 'search_no_results'))
         await state.finish()
         return
 
@@ -6,3 +6,12 @@ load_dotenv()
 BOT_TOKEN = os.getenv("BOT_TOKEN")
 ADMIN_IDS = [1234567891, 1234567891]  # Admin Telegram IDlarini kiriting
 DATA_PATH = "data"
+# Joriy hisobot yili - bot faqat shu yil hisobotlari va fayllarini ko'rsatadi.
+# Aniq qiymat: migratsiya 4 mavjud yozuvlar va fayllarni
+# database.LEGACY_REPORT_YEAR (2025) ga yozgan, ular shu qiymatda ko'rinadi.
+# Yangi yilga o'tish README da: .env da REPORT_YEAR=<yil> va botni qayta ishga tushirish.
+REPORT_YEAR = int(os.getenv("REPORT_YEAR", "2025"))
+TRANSLATE_CACHE_SIZE = int(os.getenv("TRANSLATE_CACHE_SIZE", "4096"))  # translate_text LRU keshi hajmi
+SEARCH_BACKEND = os.getenv("SEARCH_BACKEND", "memory")  # firma qidiruvi: "memory" (search_index.py) yoki "fts" (SQLite FTS5)
+INLINE_CACHE_TIME = int(os.getenv("INLINE_CACHE_TIME", "60"))  # inline natijalarni Telegram keshlaydigan vaqt (soniya)
+INLINE_RESULTS = 20  # inline rejimda ko'rsatiladigan firmalar soni (Telegram cheklovi 50)
@@ -1,108 +1,119 @@
+import re
+import unicodedata
+from itertools import product
+
+# Lotin -> kirill. Kalit katta-kichik harfdan qat'i nazar mos keladi, natija
+# asl matn registrini saqlaydi (OʻZ -> ЎЗ, Ch -> Ч).
+LATIN_TO_CYRILLIC = {
+    # 'shch': 'щ',  # Olib tashlandi, chunki bu O‘zbek tilida kerak emas
+    'ch': 'ч', 'sh': 'ш', 'yo': 'ё', 'yu': 'ю', 'ya': 'я',
+    'oʻ': 'ў', 'gʻ': 'ғ', 'ʻ': 'ъ', 'a': 'а', 'b': 'б', 'v': 'в',
+    'g': 'г', 'd': 'д', 'e': 'е', 'z': 'з', 'i': 'и', 'y': 'й',
+    'k': 'к', 'l': 'л', 'm': 'м', 'n': 'н', 'o': 'о', 'p': 'п',
+    'r': 'р', 's': 'с', 't': 'т', 'u': 'у', 'f': 'ф', 'x': 'ҳ',
+    'ts': 'ц', 'q': 'қ', 'h': 'ҳ', 'j': 'ж'
+}
+
+# Kirill -> lotin, registr aniq mos kelishi kerak
+CYRILLIC_TO_LATIN = {
+    'Щ': 'Shch', 'щ': 'shch',
+    'Шаҳ': 'Shah', 'шаҳ': 'shah',  # Maxsus qayta ishlash
+    'Ш': 'Sh', 'ш': 'sh',
+    'Ч': 'Ch', 'ч': 'ch',
+    'Ў': 'Oʻ', 'ў': 'oʻ',
+    'Ғ': 'Gʻ', 'ғ': 'gʻ',
+    'Ҳ': 'X', 'ҳ': 'x',
+    'Қ': 'Q', 'қ': 'q',
+    'Ё': 'Yo', 'ё': 'yo',
+    'Ю': 'Yu', 'ю': 'yu',
+    'Я': 'Ya', 'я': 'ya',
+    'ъ': "'", 'ь': '',
+    'А': 'A', 'а': 'a',
+    'Б': 'B', 'б': 'b',
+    'В': 'V', 'в': 'v',
+    'Г': 'G', 'г': 'g',
+    'Д': 'D', 'д': 'd',
+    'Е': 'E', 'е': 'e',
+    'Ж': 'J', 'ж': 'j',
+    'З': 'Z', 'з': 'z',
+    'И': 'I', 'и': 'i',
+    'Й': 'Y', 'й': 'y',
+    'К': 'K', 'к': 'k',
+    'Л': 'L', 'л': 'l',
+    'М': 'M', 'м': 'm',
+    'Н': 'N', 'н': 'n',
+    'О': 'O', 'о': 'o',
+    'П': 'P', 'п': 'p',
+    'Р': 'R', 'р': 'r',
+    'С': 'S', 'с': 's',
+    'Т': 'T', 'т': 't',
+    'У': 'U', 'у': 'u',
+    'Ф': 'F', 'ф': 'f',
+    'Х': 'X', 'х': 'x',
+    'Ц': 'Ts', 'ц': 'ts',
+    'Ы': 'Y', 'ы': 'y',
+    'Э': 'E', 'э': 'e',
+}
+
+
+def _case_variants():
+    """Har bir lotin harfi uchun .lower() qilganda shu harfga aylanadigan
+    belgilar (masalan, 'k' uchun 'k', 'K' va Kelvin belgisi 'K').
+
+    BMP dan tashqaridagi belgilarning kichik harf shakli hech qachon lotin
+    harfi yoki 'ʻ' bo'lmaydi, shuning uchun faqat U+0000..U+FFFF ko'riladi.
+    """
+    letters = frozenset(''.join(LATIN_TO_CYRILLIC))
+    variants = {}
+    for char in map(chr, range(0x10000)):
+        lowered = char.lower()
+        if lowered in letters:
+            variants.setdefault(lowered, []).append(char)
+    return variants
+
+
+def _convert_case(original, base):
+    if original.isupper():
+        return base.upper()
+    if original.istitle():
+        return base.capitalize()
+    return base.lower()
+
+
+def _build_latin_engine():
+    variants = _case_variants()
+    table = {}
+    for key, base in LATIN_TO_CYRILLIC.items():
+        for chars in product(*(variants[ch] for ch in key)):
+            original = ''.join(chars)
+            table[original] = _convert_case(original, base)
+    # Uzunroq kalitlar birinchi: 'sh' -> 'ш', 's' + 'h' emas
+    alternatives = sorted(table, key=lambda k: (-len(k), k))
+    return re.compile('|'.join(map(re.escape, alternatives))), table
+
+
+def _build_cyrillic_engine():
+    alternatives = sorted(CYRILLIC_TO_LATIN, key=lambda k: (-len(k), k))
+    return re.compile('|'.join(map(re.escape, alternatives))), CYRILLIC_TO_LATIN
+
+
+# Import paytida bir marta quriladi
+_LATIN_RE, _LATIN_TABLE = _build_latin_engine()
+_CYRILLIC_RE, _CYRILLIC_TABLE = _build_cyrillic_engine()
+
+
 def convert_to_cyrillic(text):
     text = text.replace("'", 'ʻ').replace('‘', 'ʻ').replace('’', 'ʻ')
-
-    translit_map = {
-        # 'shch': 'щ',  # Olib tashlandi, chunki bu O‘zbek tilida kerak emas
-        'ch': 'ч', 'sh': 'ш', 'yo': 'ё', 'yu': 'ю', 'ya': 'я',
-        'oʻ': 'ў', 'gʻ': 'ғ', 'ʻ': 'ъ', 'a': 'а', 'b': 'б', 'v': 'в',
-        'g': 'г', 'd': 'д', 'e': 'е', 'z': 'з', 'i': 'и', 'y': 'й',
-        'k': 'к', 'l': 'л', 'm': 'м', 'n': 'н', 'o': 'о', 'p': 'п',
-        'r': 'р', 's': 'с', 't': 'т', 'u': 'у', 'f': 'ф', 'x': 'ҳ',
-        'ts': 'ц', 'q': 'қ', 'h': 'ҳ', 'j': 'ж'
-    }
-
-    sorted_keys = sorted(translit_map.keys(), key=lambda x: (-len(x), x))
-    result = []
-    i = 0
-
-    while i < len(text):
-        matched = False
-        for key in sorted_keys:
-            end = i + len(key)
-            if end > len(text):
-                continue
-            substring = text[i:end].lower()
-            if substring == key.lower():
-                base = translit_map[key]
-                original = text[i:end]
-                if original.isupper():
-                    converted = base.upper()
-                elif original.istitle():
-                    converted = base.capitalize()
-                else:
-                    converted = base.lower()
-                result.append(converted)
-                i = end
-                matched = True
-                break
-        if not matched:
-            result.append(text[i])
-            i += 1
-
-    return ''.join(result)
+    return _LATIN_RE.sub(lambda m: _LATIN_TABLE[m.group()], text)
 
 
 def convert_to_latin(text):
-    translit_map = {
-        'Щ': 'Shch', 'щ': 'shch',
-        'Шаҳ': 'Shah', 'шаҳ': 'shah',  # Maxsus qayta ishlash
-        'Ш': 'Sh', 'ш': 'sh',
-        'Ч': 'Ch', 'ч': 'ch',
-        'Ў': 'Oʻ', 'ў': 'oʻ',
-        'Ғ': 'Gʻ', 'ғ': 'gʻ',
-        'Ҳ': 'X', 'ҳ': 'x',
-        'Қ': 'Q', 'қ': 'q',
-        'Ё': 'Yo', 'ё': 'yo',
-        'Ю': 'Yu', 'ю': 'yu',
-        'Я': 'Ya', 'я': 'ya',
-        'ъ': "'", 'ь': '',
-        'А': 'A', 'а': 'a',
-        'Б': 'B', 'б': 'b',
-        'В': 'V', 'в': 'v',
-        'Г': 'G', 'г': 'g',
-        'Д': 'D', 'д': 'd',
-        'Е': 'E', 'е': 'e',
-        'Ж': 'J', 'ж': 'j',
-        'З': 'Z', 'з': 'z',
-        'И': 'I', 'и': 'i',
-        'Й': 'Y', 'й': 'y',
-        'К': 'K', 'к': 'k',
-        'Л': 'L', 'л': 'l',
-        'М': 'M', 'м': 'm',
-        'Н': 'N', 'н': 'n',
-        'О': 'O', 'о': 'o',
-        'П': 'P', 'п': 'p',
-        'Р': 'R', 'р': 'r',
-        'С': 'S', 'с': 's',
-        'Т': 'T', 'т': 't',
-        'У': 'U', 'у': 'u',
-        'Ф': 'F', 'ф': 'f',
-        'Х': 'X', 'х': 'x',
-        'Ц': 'Ts', 'ц': 'ts',
-        'Ы': 'Y', 'ы': 'y',
-        'Э': 'E', 'э': 'e',
-    }
-
-    sorted_keys = sorted(translit_map.keys(), key=lambda x: (-len(x), x))
-    result = []
-    i = 0
-    
-    while i < len(text):
-        matched = False
-        for key in sorted_keys:
-            end = i + len(key)
-            if end > len(text):
-                continue
-            substring = text[i:end]
-            if substring == key:
-                base = translit_map[key]
-                result.append(base)
-                i = end
-                matched = True
-                break
-        if not matched:
-            result.append(text[i])
-            i += 1
-            
-    return ''.join(result)
+    return _CYRILLIC_RE.sub(lambda m: _CYRILLIC_TABLE[m.group()], text)
+
 
+def normalize_text(text):
+    """Unicode normalizatsiya (NFKC) + ortiqcha bo'shliqlarni yig'ish."""
+    if not text:
+        return ""
+    text = unicodedata.normalize("NFKC", text)
+    return re.sub(r"\s+", " ", text.strip())
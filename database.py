@@ -1,14 +1,264 @@
 import sqlite3
 import os
-from config import DATA_PATH
-import asyncio
+import json
+import threading
+import time
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+from collections import OrderedDict, deque
+from config import DATA_PATH, REPORT_YEAR
 import logging
+import query_stats
+from converters import convert_to_latin, convert_to_cyrillic, normalize_text
 
 logger = logging.getLogger(__name__)
 
+DB_PATH = os.path.join(DATA_PATH, "bot.db")
+STATEMENT_CACHE_SIZE = 256  # Har bir ulanish uchun tayyorlangan so'rovlar keshi
+
+_local = threading.local()
+_connections = []
+_connections_lock = threading.Lock()
+_generation = 0
+
+
+def get_connection():
+    """Joriy oqim uchun doimiy SQLite ulanishini qaytaradi (WAL rejimida)."""
+    conn = getattr(_local, "conn", None)
+    if conn is not None and getattr(_local, "generation", None) == _generation:
+        return conn
+
+    os.makedirs(DATA_PATH, exist_ok=True)
+    conn = sqlite3.connect(
+        DB_PATH,
+        timeout=30,
+        check_same_thread=False,  # faqat close_connections() boshqa oqimdan yopadi
+        cached_statements=STATEMENT_CACHE_SIZE,
+    )
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    _local.conn = conn
+    _local.generation = _generation
+    with _connections_lock:
+        _connections.append(conn)
+    logger.info(f"Yangi SQLite ulanishi ochildi: thread={threading.current_thread().name}")
+    return conn
+
+
+def close_connections():
+    """Barcha oqimlardagi ulanishlarni yopadi (bot to'xtaganda chaqiriladi)."""
+    global _generation
+    with _connections_lock:
+        for conn in _connections:
+            try:
+                conn.close()
+            except sqlite3.Error as e:
+                logger.error(f"Ulanishni yopishda xato: {e}")
+        _connections.clear()
+        _generation += 1
+
+
+# --- So'rovlar katalogi ---
+# Ish vaqtida bajariladigan barcha so'rovlar shu yerda nom bilan turadi va
+# fetch_one/fetch_all/run_query/run_query_many orqali chaqiriladi: har bir
+# chaqiruv vaqti va qatorlar soni query_stats ga yoziladi. Jadval yaratish va
+# migratsiyalar bundan mustasno.
+
+QUERIES = {
+    # users
+    'users.get_language': "SELECT language FROM users WHERE user_id = ?",
+    'users.set_language': "INSERT OR REPLACE INTO users (user_id, language) VALUES (?, ?)",
+    # firms
+    'firms.all': """
+        SELECT stir, name, rahbar, soliq_turi, ds_stavka, ys_stavka, qqs_stavka,
+               soliq_flags, ds_bp, ys_bp, qqs_bp,
+               name_latin, name_cyrillic, name_search, rahbar_latin, rahbar_cyrillic
+        FROM firms
+    """,
+    'firms.insert': """
+        INSERT INTO firms (stir, name, rahbar, soliq_turi, ds_stavka, ys_stavka, qqs_stavka,
+                           soliq_flags, ds_bp, ys_bp, qqs_bp,
+                           name_latin, name_cyrillic, name_search, rahbar_latin, rahbar_cyrillic)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """,
+    'firms.upsert': """
+        INSERT INTO firms (stir, name, rahbar, soliq_turi, ds_stavka, ys_stavka, qqs_stavka,
+                           soliq_flags, ds_bp, ys_bp, qqs_bp,
+                           name_latin, name_cyrillic, name_search, rahbar_latin, rahbar_cyrillic)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT (stir) DO UPDATE SET
+            name = excluded.name, rahbar = excluded.rahbar, soliq_turi = excluded.soliq_turi,
+            ds_stavka = excluded.ds_stavka, ys_stavka = excluded.ys_stavka, qqs_stavka = excluded.qqs_stavka,
+            soliq_flags = excluded.soliq_flags, ds_bp = excluded.ds_bp, ys_bp = excluded.ys_bp,
+            qqs_bp = excluded.qqs_bp,
+            name_latin = excluded.name_latin, name_cyrillic = excluded.name_cyrillic,
+            name_search = excluded.name_search, rahbar_latin = excluded.rahbar_latin,
+            rahbar_cyrillic = excluded.rahbar_cyrillic
+    """,
+    'firms.rename': """
+        UPDATE firms SET name = ?, name_latin = ?, name_cyrillic = ?, name_search = ?
+        WHERE stir = ?
+    """,
+    'firms.set_names': """
+        UPDATE firms SET name_latin = ?, name_cyrillic = ?, name_search = ?, rahbar_latin = ?, rahbar_cyrillic = ?
+        WHERE stir = ?
+    """,
+    # Keyset (seek) sahifalash: ix_firms_name_stir bo'yicha, OFFSET siz
+    'firms.page_first': "SELECT stir, name, name_latin, name_cyrillic FROM firms ORDER BY name, stir LIMIT ?",
+    'firms.page_after': """
+        SELECT stir, name, name_latin, name_cyrillic FROM firms WHERE (name, stir) > (?, ?)
+        ORDER BY name, stir LIMIT ?
+    """,
+    # Sovuq keshda sahifa chegarasi: faqat ix_firms_name_stir indeksi o'qiladi
+    'firms.page_anchor': "SELECT name, stir FROM firms ORDER BY name, stir LIMIT 1 OFFSET ?",
+    # NULL nomlar birinchi keladi va (name, stir) > (NULL, ?) hech narsa qaytarmaydi
+    'firms.page_after_null': """
+        SELECT stir, name, name_latin, name_cyrillic FROM firms WHERE (name IS NULL AND stir > ?) OR name IS NOT NULL
+        ORDER BY name, stir LIMIT ?
+    """,
+    # firms_fts (trigram FTS5): qism-satr qidiruvi, bm25 bo'yicha tartib
+    'firms_fts.search': """
+        SELECT stir, name FROM firms_fts WHERE firms_fts MATCH ?
+        ORDER BY bm25(firms_fts), name LIMIT ? OFFSET ?
+    """,
+    # 3 belgidan qisqa so'rovlar uchun trigram ishlamaydi - LIKE bilan
+    'firms_fts.search_short': """
+        SELECT stir, name FROM firms_fts
+        WHERE stir LIKE ?1 ESCAPE '\\' OR name LIKE ?1 ESCAPE '\\'
+           OR name_latin LIKE ?1 ESCAPE '\\' OR name_cyrillic LIKE ?1 ESCAPE '\\'
+        ORDER BY name LIMIT ?2 OFFSET ?3
+    """,
+    # firm_owners, firm_docs
+    'firm_owners.add': "INSERT OR IGNORE INTO firm_owners (stir, phone) VALUES (?, ?)",
+    'firm_owners.verify': "SELECT id FROM firm_owners WHERE stir=? AND phone=?",
+    'firm_owners.phone': "SELECT phone FROM firm_owners WHERE stir=?",
+    'firm_owners.by_phone': "SELECT 1 FROM firm_owners WHERE phone=?",
+    'firm_owners.update_phone': "UPDATE firm_owners SET phone=? WHERE stir=?",
+    'firm_docs.save': "INSERT OR REPLACE INTO firm_docs (stir, pdf1, pdf2, pfx) VALUES (?, ?, ?, ?)",
+    'firm_docs.get': "SELECT pdf1, pdf2, pfx FROM firm_docs WHERE stir=?",
+    # files
+    'files.save': "INSERT OR REPLACE INTO files (stir, soliq_turi, yil, oy, file_type, file_path) VALUES (?, ?, ?, ?, ?, ?)",
+    'files.get': "SELECT file_path FROM files WHERE stir=? AND soliq_turi=? AND yil=? AND oy=? AND file_type=?",
+    'files.for_month': "SELECT file_type, file_path FROM files WHERE stir=? AND soliq_turi=? AND yil=? AND oy=?",
+    'files.delete_month': "DELETE FROM files WHERE stir = ? AND yil = ? AND oy = ?",
+    # reports: (stir, yil, oy) bo'yicha bitta qator, tuzatishlar revision ni oshiradi
+    'reports.upsert': """
+        INSERT INTO reports (stir, oy, firma_name, xodimlar_soni, xodimlar_data, hisobot_davri_oylik, jami_oylik, soliq, yil)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT(stir, yil, oy) DO UPDATE SET
+            firma_name = excluded.firma_name,
+            xodimlar_soni = excluded.xodimlar_soni,
+            xodimlar_data = excluded.xodimlar_data,
+            hisobot_davri_oylik = excluded.hisobot_davri_oylik,
+            jami_oylik = excluded.jami_oylik,
+            soliq = excluded.soliq,
+            revision = revision + 1,
+            updated_at = CURRENT_TIMESTAMP
+    """,
+    'reports.get': """
+        SELECT firma_name, xodimlar_soni, xodimlar_data, hisobot_davri_oylik, jami_oylik, soliq
+        FROM reports WHERE stir = ? AND yil = ? AND oy = ?
+    """,
+    # To'liq qator (report_revisions ga yoziladigan holat)
+    'reports.snapshot': "SELECT * FROM reports WHERE stir = ? AND yil = ? AND oy = ?",
+    'reports.delete_month': "DELETE FROM reports WHERE stir = ? AND yil = ? AND oy = ?",
+    'reports_yagona.upsert': """
+        INSERT INTO reports_yagona (stir, oy, firma_name, rahbar, soliq_turi_yagona, yil_boshidan_aylanma, shu_oy_aylanma, yagona_soliq, yil)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT(stir, yil, oy) DO UPDATE SET
+            firma_name = excluded.firma_name,
+            rahbar = excluded.rahbar,
+            soliq_turi_yagona = excluded.soliq_turi_yagona,
+            yil_boshidan_aylanma = excluded.yil_boshidan_aylanma,
+            shu_oy_aylanma = excluded.shu_oy_aylanma,
+            yagona_soliq = excluded.yagona_soliq,
+            revision = revision + 1,
+            updated_at = CURRENT_TIMESTAMP
+    """,
+    'reports_yagona.get': """
+        SELECT firma_name, rahbar, soliq_turi_yagona, yil_boshidan_aylanma, shu_oy_aylanma, yagona_soliq
+        FROM reports_yagona WHERE stir = ? AND yil = ? AND oy = ?
+    """,
+    'reports_yagona.snapshot': "SELECT * FROM reports_yagona WHERE stir = ? AND yil = ? AND oy = ?",
+    'reports_qqs.upsert': """
+        INSERT INTO reports_qqs (stir, oy, firma_name, rahbar, soliq_turi_qqs, yil_boshidan_qqs, shu_oy_qqs, qqs_soliq, yil)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT(stir, yil, oy) DO UPDATE SET
+            firma_name = excluded.firma_name,
+            rahbar = excluded.rahbar,
+            soliq_turi_qqs = excluded.soliq_turi_qqs,
+            yil_boshidan_qqs = excluded.yil_boshidan_qqs,
+            shu_oy_qqs = excluded.shu_oy_qqs,
+            qqs_soliq = excluded.qqs_soliq,
+            revision = revision + 1,
+            updated_at = CURRENT_TIMESTAMP
+    """,
+    'reports_qqs.get': """
+        SELECT firma_name, rahbar, soliq_turi_qqs, yil_boshidan_qqs, shu_oy_qqs, qqs_soliq
+        FROM reports_qqs WHERE stir = ? AND yil = ? AND oy = ?
+    """,
+    'reports_qqs.snapshot': "SELECT * FROM reports_qqs WHERE stir = ? AND yil = ? AND oy = ?",
+    'report_revisions.add': """
+        INSERT INTO report_revisions (report_table, stir, yil, oy, revision, data)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """,
+    'report_revisions.list': """
+        SELECT revision, data, replaced_at FROM report_revisions
+        WHERE report_table = ? AND stir = ? AND yil = ? AND oy = ?
+        ORDER BY revision
+    """,
+    # xavfsizlik va audit
+    'access_log.recent': """
+        SELECT stir, user_id, timestamp FROM firm_access_log
+        WHERE timestamp > strftime('%s','now') - ?
+        ORDER BY timestamp
+    """,
+    'audit.download': "INSERT INTO downloads_log (user_id, phone, stir, file_type, downloaded_at) VALUES (?,?,?,?,?)",
+    'audit.alert': "INSERT INTO security_alerts (user_id, phone, stir, event, created_at) VALUES (?,?,?,?,?)",
+    'audit.access': "INSERT INTO firm_access_log (stir, phone, user_id, timestamp) VALUES (?,?,?,?)",
+    'download_counters.add': """
+        INSERT INTO download_counters (phone, stir, day, count) VALUES (?, ?, ?, ?)
+        ON CONFLICT (phone, stir, day) DO UPDATE SET count = count + excluded.count
+    """,
+    'download_counters.today': "SELECT count FROM download_counters WHERE phone=? AND stir=? AND day=DATE('now')",
+}
+
+
+def fetch_one(name, params=(), conn=None):
+    conn = conn or get_connection()
+    started = time.perf_counter()
+    row = conn.execute(QUERIES[name], params).fetchone()
+    query_stats.record(name, time.perf_counter() - started, 1 if row else 0)
+    return row
+
+
+def fetch_all(name, params=(), conn=None):
+    conn = conn or get_connection()
+    started = time.perf_counter()
+    rows = conn.execute(QUERIES[name], params).fetchall()
+    query_stats.record(name, time.perf_counter() - started, len(rows))
+    return rows
+
+
+def run_query(name, params=(), conn=None):
+    """Yozish so'rovi; tranzaksiyani chaqiruvchi boshqaradi (with conn:)."""
+    conn = conn or get_connection()
+    started = time.perf_counter()
+    c = conn.execute(QUERIES[name], params)
+    query_stats.record(name, time.perf_counter() - started, max(c.rowcount, 0))
+    return c
+
+
+def run_query_many(name, seq, conn=None):
+    conn = conn or get_connection()
+    started = time.perf_counter()
+    c = conn.executemany(QUERIES[name], seq)
+    query_stats.record(name, time.perf_counter() - started, max(c.rowcount, 0))
+    return c
+
 def init_db():
     try:
-        conn = sqlite3.connect(os.path.join(DATA_PATH, "bot.db"))
+        conn = get_connection()
         c = conn.cursor()
         # Mavjud jadvallar
         c.execute('''CREATE TABLE IF NOT EXISTS users (
@@ -72,13 +322,12 @@ def init_db():
             pfx TEXT
         )''')
         conn.commit()
-        conn.close()
         logger.info("Ma'lumotlar bazasi muvaffaqiyatli yangilandi.")
     except Exception as e:
         logger.error(f"Ma'lumotlar bazasi yangilashda xato: {e}")
 
 def init_security_tables():
-    conn = sqlite3.connect(os.path.join(DATA_PATH, "bot.db"))
+    conn = get_connection()
     c = conn.cursor()
 
     # Firma egasi telefon bazasi
@@ -125,243 +374,830 @@ def init_security_tables():
     """)
 
     conn.commit()
-    conn.close()
+
+
+
+# --- Sxema migratsiyalari ---
+# Har bir migratsiya bir marta, o'z tranzaksiyasida bajariladi va
+# schema_migrations jadvaliga yoziladi. Yangi o'zgarish = ro'yxat oxiriga
+# yangi (versiya, tavsif, funksiya) qo'shish.
+
+def _m001_hot_query_indexes(conn):
+    # files: takroriy qatorlardan eng oxirgisini qoldirib, unikal kalit qo'yamiz
+    conn.execute("""
+        DELETE FROM files WHERE id NOT IN (
+            SELECT MAX(id) FROM files GROUP BY stir, soliq_turi, oy, file_type
+        )
+    """)
+    conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS ux_files_key ON files (stir, soliq_turi, oy, file_type)")
+
+    # firm_owners: bir xil (stir, phone) juftliklari bir marta qoladi
+    conn.execute("""
+        DELETE FROM firm_owners WHERE id NOT IN (
+            SELECT MIN(id) FROM firm_owners GROUP BY stir, phone
+        )
+    """)
+    conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS ux_firm_owners_stir_phone ON firm_owners (stir, phone)")
+
+    conn.execute("CREATE INDEX IF NOT EXISTS ix_reports_stir_oy ON reports (stir, oy)")
+    conn.execute("CREATE INDEX IF NOT EXISTS ix_reports_yagona_stir_oy ON reports_yagona (stir, oy)")
+    conn.execute("CREATE INDEX IF NOT EXISTS ix_reports_qqs_stir_oy ON reports_qqs (stir, oy)")
+    conn.execute("CREATE INDEX IF NOT EXISTS ix_firm_access_log_key ON firm_access_log (stir, user_id, timestamp)")
+    conn.execute("CREATE INDEX IF NOT EXISTS ix_downloads_log_key ON downloads_log (phone, stir, downloaded_at)")
+
+
+def _m002_download_counters(conn):
+    # Kunlik yuklashlar soni: today_downloads downloads_log ni skan qilmaydi
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS download_counters (
+            phone TEXT,
+            stir TEXT,
+            day TEXT,
+            count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (phone, stir, day)
+        ) WITHOUT ROWID
+    """)
+    conn.execute("""
+        INSERT OR REPLACE INTO download_counters (phone, stir, day, count)
+        SELECT phone, stir, DATE(downloaded_at), COUNT(*) FROM downloads_log
+        WHERE downloaded_at IS NOT NULL
+        GROUP BY phone, stir, DATE(downloaded_at)
+    """)
+
+
+def _m003_numeric_rates(conn):
+    # Stavkalar bazis punktlarda (12% = 1200), soliq turi bit maskada
+    for column in ("soliq_flags INTEGER NOT NULL DEFAULT 0", "ds_bp INTEGER", "ys_bp INTEGER", "qqs_bp INTEGER"):
+        conn.execute(f"ALTER TABLE firms ADD COLUMN {column}")
+    rows = conn.execute("SELECT stir, soliq_turi, ds_stavka, ys_stavka, qqs_stavka FROM firms").fetchall()
+    updates = []
+    for stir, soliq_turi, ds, ys, qqs in rows:
+        rates = []
+        for value in (ds, ys, qqs):
+            try:
+                rates.append(parse_rate_bp(value))
+            except ValueError:
+                logger.warning(f"Noto'g'ri stavka o'tkazib yuborildi: STIR={stir}, qiymat={value!r}")
+                rates.append(None)
+        updates.append((soliq_flags(soliq_turi), *rates, stir))
+    conn.executemany("UPDATE firms SET soliq_flags = ?, ds_bp = ?, ys_bp = ?, qqs_bp = ? WHERE stir = ?", updates)
+
+
+REPORT_TABLES = ('reports', 'reports_yagona', 'reports_qqs', 'files')
+REPORT_KINDS = ('reports', 'reports_yagona', 'reports_qqs')
+LEGACY_REPORT_YEAR = 2025   # yil ustunidan oldingi yozuvlar va fayllar shu yilga tegishli
+
+
+def _m004_report_year(conn):
+    # Davr = (yil, oy); mavjud yozuvlar LEGACY_REPORT_YEAR ga yoziladi
+    for table in REPORT_TABLES:
+        conn.execute(f"ALTER TABLE {table} ADD COLUMN yil INTEGER NOT NULL DEFAULT {LEGACY_REPORT_YEAR}")
+    conn.execute("DROP INDEX IF EXISTS ux_files_key")
+    conn.execute("CREATE UNIQUE INDEX ux_files_key ON files (stir, soliq_turi, yil, oy, file_type)")
+    for table in ('reports', 'reports_yagona', 'reports_qqs'):
+        conn.execute(f"DROP INDEX IF EXISTS ix_{table}_stir_oy")
+        conn.execute(f"CREATE INDEX ix_{table}_stir_yil_oy ON {table} (stir, yil, oy)")
+    # archive_report_year butun yilni indeks bo'yicha tanlaydi
+    for table in REPORT_TABLES:
+        conn.execute(f"CREATE INDEX ix_{table}_yil ON {table} (yil)")
+
+
+def _m005_report_upserts(conn):
+    # Har bir (stir, yil, oy) uchun bitta qator. Eski qatorlar (takroriy
+    # tasdiqlashlar) report_revisions ga ko'chadi, eng oxirgisi qoladi.
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS report_revisions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            report_table TEXT NOT NULL,
+            stir TEXT NOT NULL,
+            yil INTEGER NOT NULL,
+            oy TEXT NOT NULL,
+            revision INTEGER NOT NULL,
+            data TEXT,
+            replaced_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    conn.execute("CREATE INDEX ix_report_revisions_key ON report_revisions (report_table, stir, yil, oy, revision)")
+    for table in REPORT_KINDS:
+        conn.execute(f"ALTER TABLE {table} ADD COLUMN revision INTEGER NOT NULL DEFAULT 1")
+        conn.execute(f"ALTER TABLE {table} ADD COLUMN updated_at DATETIME")
+        cursor = conn.execute(f"SELECT * FROM {table} ORDER BY stir, yil, oy, id")
+        columns = [col[0] for col in cursor.description]
+        groups = {}
+        for row in cursor.fetchall():
+            record = dict(zip(columns, row))
+            groups.setdefault((record['stir'], record['yil'], record['oy']), []).append(record)
+        history, stale, revisions = [], [], []
+        for (stir, yil, oy), records in groups.items():
+            if len(records) == 1:
+                continue
+            for number, record in enumerate(records[:-1], 1):
+                history.append((table, stir, yil, oy, number, json.dumps(record, ensure_ascii=False)))
+                stale.append((record['id'],))
+            revisions.append((len(records), records[-1]['id']))
+        conn.executemany(QUERIES['report_revisions.add'], history)
+        conn.executemany(f"DELETE FROM {table} WHERE id = ?", stale)
+        conn.executemany(f"UPDATE {table} SET revision = ? WHERE id = ?", revisions)
+        if stale:
+            logger.info(f"{table}: {len(stale)} ta takroriy hisobot report_revisions ga ko'chirildi")
+        # Unikal kalit (stir, yil, oy) indeksini ham almashtiradi
+        conn.execute(f"DROP INDEX IF EXISTS ix_{table}_stir_yil_oy")
+        conn.execute(f"CREATE UNIQUE INDEX ux_{table}_period ON {table} (stir, yil, oy)")
+
+
+def _m006_firm_name_forms(conn):
+    # Nom va rahbarning lotin/kirill va qidiruv shakllari yozishda bir marta hisoblanadi
+    for column in ("name_latin", "name_cyrillic", "name_search", "rahbar_latin", "rahbar_cyrillic"):
+        conn.execute(f"ALTER TABLE firms ADD COLUMN {column} TEXT")
+    rows = conn.execute("SELECT stir, name, rahbar FROM firms").fetchall()
+    conn.executemany(QUERIES['firms.set_names'],
+                     [firm_names(name) + firm_names(rahbar)[:2] + (stir,) for stir, name, rahbar in rows])
+
+
+FTS_COLUMNS = ('stir', 'name', 'name_latin', 'name_cyrillic', 'rahbar', 'rahbar_latin', 'rahbar_cyrillic')
+
+
+def _m007_firms_fts(conn):
+    # firms jadvaliga bog'langan (external content) FTS5 indeks, triggerlar bilan sinxron
+    columns = ", ".join(FTS_COLUMNS)
+    new_values = ", ".join(f"new.{column}" for column in FTS_COLUMNS)
+    old_values = ", ".join(f"old.{column}" for column in FTS_COLUMNS)
+    try:
+        conn.execute(f"""
+            CREATE VIRTUAL TABLE firms_fts USING fts5(
+                {columns}, content='firms', content_rowid='rowid',
+                tokenize='trigram case_sensitive 0'
+            )
+        """)
+    except sqlite3.OperationalError as e:
+        # SQLite FTS5/trigram siz yig'ilgan - SEARCH_BACKEND=memory ishlatiladi.
+        # False: migratsiya yozilmaydi va keyingi ishga tushishda qayta uriniladi
+        logger.warning(f"firms_fts yaratilmadi: {e}")
+        return False
+    conn.execute(f"""
+        CREATE TRIGGER firms_fts_ai AFTER INSERT ON firms BEGIN
+            INSERT INTO firms_fts (rowid, {columns}) VALUES (new.rowid, {new_values});
+        END
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER firms_fts_ad AFTER DELETE ON firms BEGIN
+            INSERT INTO firms_fts (firms_fts, rowid, {columns}) VALUES ('delete', old.rowid, {old_values});
+        END
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER firms_fts_au AFTER UPDATE OF {columns} ON firms BEGIN
+            INSERT INTO firms_fts (firms_fts, rowid, {columns}) VALUES ('delete', old.rowid, {old_values});
+            INSERT INTO firms_fts (rowid, {columns}) VALUES (new.rowid, {new_values});
+        END
+    """)
+    conn.execute("INSERT INTO firms_fts (firms_fts) VALUES ('rebuild')")
+
+
+def _m008_firms_name_index(conn):
+    conn.execute("CREATE INDEX ix_firms_name_stir ON firms (name, stir)")
+
+
+MIGRATIONS = [
+    (1, "Tez-tez ishlatiladigan so'rovlar uchun indekslar, files/firm_owners dublikatlari", _m001_hot_query_indexes),
+    (2, "download_counters: kunlik yuklashlar hisoblagichi", _m002_download_counters),
+    (3, "firms: raqamli stavkalar (bazis punkt) va soliq_flags", _m003_numeric_rates),
+    (4, "Hisobot jadvallari va files uchun yil ustuni, (stir, yil, oy) indekslari", _m004_report_year),
+    (5, "Hisobotlar: (stir, yil, oy) unikal kaliti, revision va report_revisions tarixi", _m005_report_upserts),
+    (6, "firms: nom va rahbarning lotin/kirill va qidiruv shakllari", _m006_firm_name_forms),
+    (7, "firms_fts: FTS5 qidiruv indeksi va sinxronlash triggerlari", _m007_firms_fts),
+    (8, "firms: keyset sahifalash uchun (name, stir) indeksi", _m008_firms_name_index),
+]
+
+
+def get_schema_version():
+    conn = get_connection()
+    with conn:
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                version INTEGER PRIMARY KEY,
+                description TEXT,
+                applied_at DATETIME DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+    row = conn.execute("SELECT MAX(version) FROM schema_migrations").fetchone()
+    return row[0] or 0
+
+
+def run_migrations():
+    """init_db() va init_security_tables() dan keyin chaqiriladi.
+
+    Migratsiya False qaytarsa (masalan, SQLite da FTS5 yo'q) u yozilmaydi va
+    keyingi ishga tushishda qayta uriniladi, shuning uchun bajarilganlar
+    MAX(version) bo'yicha emas, har bir versiya bo'yicha tekshiriladi.
+    """
+    get_schema_version()
+    conn = get_connection()
+    applied = {row[0] for row in conn.execute("SELECT version FROM schema_migrations")}
+    for version, description, migrate in MIGRATIONS:
+        if version in applied:
+            continue
+        try:
+            # IMMEDIATE: boshqa jarayonlar yozuvi tugashini kutib, yozish lockini oladi
+            conn.execute("BEGIN IMMEDIATE")
+            # Lockni kutayotganda boshqa jarayon shu migratsiyani bajargan bo'lishi mumkin
+            if conn.execute("SELECT 1 FROM schema_migrations WHERE version = ?", (version,)).fetchone():
+                conn.rollback()
+                continue
+            if migrate(conn) is False:
+                conn.rollback()
+                logger.warning(f"Migratsiya keyinroqqa qoldirildi: v{version} - {description}")
+                continue
+            conn.execute("INSERT INTO schema_migrations (version, description) VALUES (?, ?)",
+                         (version, description))
+            conn.commit()
+            logger.info(f"Migratsiya bajarildi: v{version} - {description}")
+        except Exception as e:
+            conn.rollback()
+            logger.error(f"Migratsiya xatosi: v{version} - {e}")
+            raise
 
 
 MAX_CHECKS = 10
 BLOCK_SECONDS = 24 * 60 * 60
 
+# --- Tekshiruv limiti (sliding window) ---
+# Har bir (stir, user_id) uchun oxirgi BLOCK_SECONDS ichidagi urinishlar vaqti
+# xotirada deque sifatida saqlanadi, is_blocked bazaga murojaat qilmaydi.
+# firm_access_log ga yozuvlar audit navbati orqali tushadi (write_audit_batch),
+# bot qayta ishga tushganda load_access_windows oynalarni jadvaldan tiklaydi.
+
+_access_windows = {}   # (stir, user_id) -> deque([timestamp, ...])
+_access_lock = threading.Lock()
+
+
+def _access_window(stir, user_id, now):
+    """Oynani qaytaradi va eskirgan urinishlarni tashlaydi (lock ichida chaqiriladi)."""
+    window = _access_windows.setdefault((str(stir), user_id), deque())
+    while window and window[0] <= now - BLOCK_SECONDS:
+        window.popleft()
+    return window
+
+
+def load_access_windows():
+    """Oxirgi BLOCK_SECONDS dagi urinishlarni firm_access_log dan xotiraga yuklaydi."""
+    rows = fetch_all('access_log.recent', (BLOCK_SECONDS,))
+    with _access_lock:
+        _access_windows.clear()
+        for stir, user_id, ts in rows:
+            _access_windows.setdefault((str(stir), user_id), deque()).append(int(ts))
+    logger.info(f"Tekshiruv oynalari tiklandi: {len(rows)} ta urinish")
+
+
+def record_access_attempt(stir, user_id, timestamp):
+    """Urinishni faqat xotiradagi oynaga qo'shadi (bazaga yozish chaqiruvchida)."""
+    with _access_lock:
+        _access_window(stir, user_id, timestamp).append(timestamp)
+
+
 def log_access_attempt(stir, phone, user_id):
-    conn = sqlite3.connect(os.path.join(DATA_PATH, "bot.db"))
-    c = conn.cursor()
-    c.execute("""
-        INSERT INTO firm_access_log (stir, phone, user_id, timestamp)
-        VALUES (?, ?, ?, strftime('%s','now'))
-    """, (stir, phone, user_id))
-    conn.commit()
-    conn.close()
+    now = int(time.time())
+    record_access_attempt(stir, user_id, now)
+    write_audit_batch([('access', (stir, phone, user_id, now))])
 
 
 def is_blocked(stir, user_id):
-    conn = sqlite3.connect(os.path.join(DATA_PATH, "bot.db"))
-    c = conn.cursor()
-    c.execute("""
-        SELECT COUNT(*) FROM firm_access_log
-        WHERE stir=? AND user_id=? AND timestamp > strftime('%s','now') - ?
-    """, (stir, user_id, BLOCK_SECONDS))
-    count = c.fetchone()[0]
-    conn.close()
-    return count >= MAX_CHECKS
+    now = int(time.time())
+    with _access_lock:
+        return len(_access_window(stir, user_id, now)) >= MAX_CHECKS
+
+
+# --- Audit yozuvlari ---
+# downloads_log, security_alerts va firm_access_log qatorlari bitta
+# tranzaksiyada yoziladi. Vaqt navbatga qo'yilgan paytda olinadi, shuning
+# uchun kechiktirib yozilgan qatorlar ham voqea vaqtini saqlaydi.
 
+AUDIT_KINDS = ('download', 'alert', 'access')   # QUERIES dagi 'audit.<tur>'
 
 
+def audit_timestamp():
+    """CURRENT_TIMESTAMP bilan bir xil format (UTC)."""
+    return time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime())
 
 
+def write_audit_batch(events):
+    """events: [(tur, qator), ...] - tur AUDIT_KINDS dan biri."""
+    grouped = {}
+    for kind, row in events:
+        grouped.setdefault(kind, []).append(row)
+    conn = get_connection()
+    with conn:
+        for kind, rows in grouped.items():
+            run_query_many(f'audit.{kind}', rows, conn)
+        # Kunlik hisoblagichlar log bilan bitta tranzaksiyada yangilanadi
+        counts = {}
+        for uid, phone, stir, file, downloaded_at in grouped.get('download', ()):
+            key = (phone, stir, downloaded_at[:10])
+            counts[key] = counts.get(key, 0) + 1
+        if counts:
+            run_query_many('download_counters.add', [key + (n,) for key, n in counts.items()], conn)
+    return len(events)
+
 
 def add_firm_owner(stir, phone):
-    conn = sqlite3.connect(os.path.join(DATA_PATH, "bot.db"))
-    c = conn.cursor()
-    c.execute("INSERT INTO firm_owners (stir, phone) VALUES (?,?)", (stir, phone))
-    conn.commit()
-    conn.close()
+    conn = get_connection()
+    with conn:
+        run_query('firm_owners.add', (stir, phone), conn)
 
 
 def verify_owner_phone(stir, phone):
-    conn = sqlite3.connect(os.path.join(DATA_PATH, "bot.db"))
-    c = conn.cursor()
-    c.execute("SELECT id FROM firm_owners WHERE stir=? AND phone=?", (stir, phone))
-    result = c.fetchone()
-    conn.close()
-    return result is not None
+    return fetch_one('firm_owners.verify', (stir, phone)) is not None
 
 
 
 def log_download(uid, phone, stir, file):
-    conn = sqlite3.connect(os.path.join(DATA_PATH, "bot.db"))
-    c = conn.cursor()
-    c.execute("INSERT INTO downloads_log (user_id, phone, stir, file_type) VALUES (?,?,?,?)",
-             (uid, phone, stir, file))
-    conn.commit()
-    conn.close()
+    write_audit_batch([('download', (uid, phone, stir, file, audit_timestamp()))])
 
 
 
 def today_downloads(phone, stir):
-    conn = sqlite3.connect(os.path.join(DATA_PATH, "bot.db"))
-    c = conn.cursor()
-    c.execute("""
-        SELECT COUNT(*) FROM downloads_log 
-        WHERE phone=? AND stir=? AND DATE(downloaded_at)=DATE('now')
-    """, (phone, stir))
-    cnt = c.fetchone()[0]
-    conn.close()
-    return cnt
+    row = fetch_one('download_counters.today', (phone, stir))
+    return row[0] if row else 0
 
 
 def log_alert(uid, phone, stir, event):
-    conn = sqlite3.connect(os.path.join(DATA_PATH, "bot.db"))
-    c = conn.cursor()
-    c.execute("INSERT INTO security_alerts (user_id, phone, stir, event) VALUES (?,?,?,?)",
-             (uid, phone, stir, event))
-    conn.commit()
-    conn.close()
+    write_audit_batch([('alert', (uid, phone, stir, event, audit_timestamp()))])
 
 
 def save_firm_docs(stir, pdf1, pdf2, pfx):
-    conn = sqlite3.connect(os.path.join(DATA_PATH, "bot.db"))
-    c = conn.cursor()
-    c.execute("""
-        INSERT OR REPLACE INTO firm_docs (stir, pdf1, pdf2, pfx)
-        VALUES (?, ?, ?, ?)
-    """, (stir, pdf1, pdf2, pfx))
-    conn.commit()
-    conn.close()
+    conn = get_connection()
+    with conn:
+        run_query('firm_docs.save', (stir, pdf1, pdf2, pfx), conn)
 
 def get_firm_docs(stir):
-    conn = sqlite3.connect(os.path.join(DATA_PATH, "bot.db"))
-    c = conn.cursor()
-    c.execute("SELECT pdf1, pdf2, pfx FROM firm_docs WHERE stir=?", (stir,))
-    result = c.fetchone()
-    conn.close()
-    return result
+    return fetch_one('firm_docs.get', (stir,))
 
 
 def get_owner_phone(stir):
-    conn = sqlite3.connect(os.path.join(DATA_PATH, "bot.db"))
-    c = conn.cursor()
-    c.execute("SELECT phone FROM firm_owners WHERE stir=?", (stir,))
-    row = c.fetchone()
-    conn.close()
+    row = fetch_one('firm_owners.phone', (stir,))
     return row[0] if row else None
 
 
-def save_yagona_report(stir, oy, firma_name, rahbar, soliq_turi_yagona, yil_boshidan_aylanma, shu_oy_aylanma, yagona_soliq):
-    conn = sqlite3.connect(os.path.join(DATA_PATH, "bot.db"))
-    c = conn.cursor()
-    c.execute("""
-        INSERT INTO reports_yagona (stir, oy, firma_name, rahbar, soliq_turi_yagona, yil_boshidan_aylanma, shu_oy_aylanma, yagona_soliq)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-    """, (stir, oy, firma_name, rahbar, soliq_turi_yagona, yil_boshidan_aylanma, shu_oy_aylanma, yagona_soliq))
-    conn.commit()
-    conn.close()
+def save_yagona_report(stir, oy, firma_name, rahbar, soliq_turi_yagona, yil_boshidan_aylanma, shu_oy_aylanma, yagona_soliq, yil=None):
+    return _upsert_report('reports_yagona', stir, yil or REPORT_YEAR, oy,
+                          (firma_name, rahbar, soliq_turi_yagona, yil_boshidan_aylanma, shu_oy_aylanma, yagona_soliq))
 
-def save_qqs_report(stir, oy, firma_name, rahbar, soliq_turi_qqs, yil_boshidan_qqs, shu_oy_qqs, qqs_soliq):
-    conn = sqlite3.connect(os.path.join(DATA_PATH, "bot.db"))
-    c = conn.cursor()
-    c.execute("""
-        INSERT INTO reports_qqs (stir, oy, firma_name, rahbar, soliq_turi_qqs, yil_boshidan_qqs, shu_oy_qqs, qqs_soliq)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-    """, (stir, oy, firma_name, rahbar, soliq_turi_qqs, yil_boshidan_qqs, shu_oy_qqs, qqs_soliq))
-    conn.commit()
-    conn.close()
+def save_qqs_report(stir, oy, firma_name, rahbar, soliq_turi_qqs, yil_boshidan_qqs, shu_oy_qqs, qqs_soliq, yil=None):
+    return _upsert_report('reports_qqs', stir, yil or REPORT_YEAR, oy,
+                          (firma_name, rahbar, soliq_turi_qqs, yil_boshidan_qqs, shu_oy_qqs, qqs_soliq))
 
-def get_yagona_report(stir, oy):
-    conn = sqlite3.connect(os.path.join(DATA_PATH, "bot.db"))
-    c = conn.cursor()
-    c.execute("SELECT * FROM reports_yagona WHERE stir = ? AND oy = ?", (stir, oy))
-    result = c.fetchone()
-    conn.close()
-    return result
+def get_yagona_report(stir, oy, yil=None):
+    """(firma_name, rahbar, soliq_turi_yagona, yil_boshidan_aylanma, shu_oy_aylanma, yagona_soliq) yoki None."""
+    return fetch_one('reports_yagona.get', (stir, yil or REPORT_YEAR, oy))
+
+def get_qqs_report(stir, oy, yil=None):
+    """(firma_name, rahbar, soliq_turi_qqs, yil_boshidan_qqs, shu_oy_qqs, qqs_soliq) yoki None."""
+    return fetch_one('reports_qqs.get', (stir, yil or REPORT_YEAR, oy))
 
-def get_qqs_report(stir, oy):
-    conn = sqlite3.connect(os.path.join(DATA_PATH, "bot.db"))
-    c = conn.cursor()
-    c.execute("SELECT * FROM reports_qqs WHERE stir = ? AND oy = ?", (stir, oy))
-    result = c.fetchone()
-    conn.close()
-    return result
 
 
+# --- Soliq stavkalari va turlari ---
+# Stavkalar yozishda bir marta tekshirilib bazis punktga (1% = 100) o'tkaziladi,
+# soliq turi ('ds-ys', 'ds-qqs') esa bit maskada saqlanadi. O'qishda hech
+# narsa parse qilinmaydi.
+
+SOLIQ_DS = 1
+SOLIQ_YS = 2
+SOLIQ_QQS = 4
+DEFAULT_SOLIQ_FLAGS = SOLIQ_DS | SOLIQ_YS   # soliq turi ko'rsatilmagan firmalar uchun
+_SOLIQ_PARTS = {'ds': SOLIQ_DS, 'ys': SOLIQ_YS, 'qqs': SOLIQ_QQS}
+
+
+def soliq_flags(soliq_turi):
+    """'ds-ys' -> SOLIQ_DS | SOLIQ_YS; bo'sh qiymat -> 0."""
+    flags = 0
+    for part in (soliq_turi or '').lower().split('-'):
+        flags |= _SOLIQ_PARTS.get(part.strip(), 0)
+    return flags
+
+
+def parse_rate_bp(value):
+    """'12', '12%', '12,5', 12.0 -> bazis punkt (1200, 1250); bo'sh -> None.
+
+    Noto'g'ri yoki 0..100% oralig'idan tashqari qiymat uchun ValueError.
+    """
+    if value is None:
+        return None
+    text = str(value).strip().replace('%', '').replace(',', '.').strip()
+    if not text:
+        return None
+    try:
+        bp = (Decimal(text) * 100).to_integral_value(rounding=ROUND_HALF_UP)
+    except InvalidOperation:
+        raise ValueError(f"Noto'g'ri stavka: {value!r}")
+    if not 0 <= bp <= 10000:
+        raise ValueError(f"Stavka 0..100% oralig'ida bo'lishi kerak: {value!r}")
+    return int(bp)
+
+
+def format_rate(bp):
+    """1200 -> '12', 1250 -> '12.5'; None -> None."""
+    if bp is None:
+        return None
+    return f"{(Decimal(bp) / 100).normalize():f}"
+
+
+def apply_rate(amount, bp):
+    """Summadan stavka bo'yicha soliq (butun so'm, kasr qismi tashlanadi)."""
+    return int(amount) * bp // 10000
+
+
+def firm_names(text):
+    """Nom yoki rahbar uchun (lotin, kirill, qidiruv) shakllari; bo'sh qiymat -> None lar.
+
+    Qidiruv shakli - kichik harfli lotin yozuvi.
+    """
+    if not text:
+        return (None, None, None)
+    text = normalize_text(str(text))
+    latin = convert_to_latin(text)
+    return (latin, convert_to_cyrillic(text), latin.lower())
+
+
+def _firm_row(name, rahbar, soliq_turi, ds_stavka, ys_stavka, qqs_stavka):
+    """Reyestr/jadval qatori: stavkalar tekshiriladi va bir xil ko'rinishga keltiriladi,
+    nom va rahbarning lotin/kirill shakllari shu yerda bir marta hisoblanadi."""
+    ds_bp, ys_bp, qqs_bp = parse_rate_bp(ds_stavka), parse_rate_bp(ys_stavka), parse_rate_bp(qqs_stavka)
+    return (name, rahbar, soliq_turi, format_rate(ds_bp), format_rate(ys_bp), format_rate(qqs_bp),
+            soliq_flags(soliq_turi), ds_bp, ys_bp, qqs_bp) + firm_names(name) + firm_names(rahbar)[:2]
+
+
+# --- Firmalar reyestri ---
+# firms jadvali bir marta xotiraga yuklanadi va faqat shu moduldagi yozish
+# funksiyalari (add_firma, update_firma_name) orqali yangilanadi. O'qishlar
+# SQLite ga tushmaydi: STIR bo'yicha qidiruv O(1).
+
+_firms = None          # stir -> _firm_row() natijasi
+_firms_sorted = None   # get_all_firms() natijasi, yozuvda bekor qilinadi
+_firm_listeners = []   # on_firm_change() orqali ro'yxatdan o'tgan funksiyalar
+_firms_lock = threading.RLock()
+
+
+def load_firm_registry():
+    """firms jadvalini (qayta) xotiraga yuklaydi; bot ishga tushganda chaqiriladi."""
+    global _firms, _firms_sorted
+    registry = {str(row[0]): tuple(row[1:]) for row in fetch_all('firms.all')}
+    with _firms_lock:
+        _firms = registry
+        _firms_sorted = None
+    logger.info(f"Firmalar reyestri yuklandi: {len(registry)} ta firma")
+    _notify_firm_change(None)
+    return registry
+
+
+def on_firm_change(callback):
+    """callback(stirs) firmalar yozilgandan keyin chaqiriladi; stirs=None -
+    reyestr to'liq qayta yuklandi. Qidiruv indekslari shu orqali yangilanadi."""
+    _firm_listeners.append(callback)
+    return callback
+
+
+def _notify_firm_change(stirs):
+    for callback in list(_firm_listeners):
+        try:
+            callback(stirs)
+        except Exception as e:
+            logger.error(f"Firma o'zgarishi tinglovchisida xato ({callback.__name__}): {e}")
+
+
+def _firm_registry():
+    registry = _firms
+    if registry is None:
+        with _firms_lock:
+            registry = _firms if _firms is not None else load_firm_registry()
+    return registry
+
+
+def _registry_put(stir, row):
+    global _firms_sorted
+    registry = _firm_registry()
+    with _firms_lock:
+        registry[str(stir)] = row
+        _firms_sorted = None
+    _notify_firm_change([str(stir)])
+
 
 def add_firma(stir, name, rahbar=None, soliq_turi=None, ds_stavka=None, ys_stavka=None, qqs_stavka=None):
-    conn = sqlite3.connect(os.path.join(DATA_PATH, "bot.db"))
-    c = conn.cursor()
-    c.execute("INSERT INTO firms (stir, name, rahbar, soliq_turi, ds_stavka, ys_stavka, qqs_stavka) VALUES (?, ?, ?, ?, ?, ?, ?)",
-              (stir, name, rahbar, soliq_turi, ds_stavka, ys_stavka, qqs_stavka))
-    conn.commit()
-    conn.close()
+    row = _firm_row(name, rahbar, soliq_turi, ds_stavka, ys_stavka, qqs_stavka)
+    conn = get_connection()
+    with conn:
+        run_query('firms.insert', (stir,) + row, conn)
+    _registry_put(stir, row)
 
-def get_firma_info(stir):
-    conn = sqlite3.connect(os.path.join(DATA_PATH, "bot.db"))
-    c = conn.cursor()
-    c.execute("SELECT name, rahbar, soliq_turi, ds_stavka, ys_stavka, qqs_stavka FROM firms WHERE stir = ?", (stir,))
-    result = c.fetchone()
-    conn.close()
+def bulk_upsert_firms(firms):
+    """Firmalar va egalarini bitta tranzaksiyada yozadi.
+
+    firms: parse_firms_excel natijasi (stir, firma_nomi, rahbar, soliq_turi,
+    phone, ds_stavka, ys_stavka, qqs_stavka kalitli dict lar). Xato bo'lsa
+    hech narsa yozilmaydi. Bo'sh STIR/nom yoki noto'g'ri stavkali qatorlar
+    rad etiladi. {'inserted', 'updated', 'rejected', 'accepted'} qaytaradi;
+    accepted - yozilgan STIR lar ro'yxati.
+    """
+    global _firms_sorted
+    rows = {}
+    owners = []
+    rejected = 0
+    for firm in firms:
+        stir = str(firm.get('stir') or '').strip()
+        if not stir or not firm.get('firma_nomi'):
+            rejected += 1
+            continue
+        try:
+            row = _firm_row(firm['firma_nomi'], firm.get('rahbar'), firm.get('soliq_turi'),
+                            firm.get('ds_stavka'), firm.get('ys_stavka'), firm.get('qqs_stavka'))
+        except ValueError as e:
+            logger.warning(f"Firma rad etildi: STIR={stir}: {e}")
+            rejected += 1
+            continue
+        # Fayl ichida takrorlangan STIR: oxirgi qator qoladi
+        rows[stir] = (stir,) + row
+        if firm.get('phone'):
+            owners.append((stir, firm['phone']))
+
+    registry = _firm_registry()
+    updated = sum(1 for stir in rows if stir in registry)
+    conn = get_connection()
+    with conn:
+        run_query_many('firms.upsert', list(rows.values()), conn)
+        run_query_many('firm_owners.add', owners, conn)
+    with _firms_lock:
+        for stir, row in rows.items():
+            registry[stir] = row[1:]
+        _firms_sorted = None
+    _notify_firm_change(list(rows))
+    result = {'inserted': len(rows) - updated, 'updated': updated, 'rejected': rejected}
+    logger.info(f"Firmalar import qilindi: {result}")
+    result['accepted'] = list(rows)
     return result
 
+def update_firma_name(stir, new_name):
+    names = firm_names(new_name)
+    conn = get_connection()
+    with conn:
+        run_query('firms.rename', (new_name,) + names + (stir,), conn)
+    row = _firm_registry().get(str(stir))
+    if row:
+        _registry_put(stir, (new_name,) + row[1:10] + names + row[13:])
+
+def get_firma_info(stir):
+    """(name, rahbar, soliq_turi, ds_stavka, ys_stavka, qqs_stavka) yoki None."""
+    row = _firm_registry().get(str(stir))
+    return row[:6] if row else None
+
+
+def get_soliq_flags(stir):
+    """Firma soliq turlari bit maskasi (SOLIQ_*); noma'lum bo'lsa DEFAULT_SOLIQ_FLAGS."""
+    row = _firm_registry().get(str(stir))
+    return (row[6] if row else 0) or DEFAULT_SOLIQ_FLAGS
+
+
+def get_firma_rates(stir):
+    """(ds_bp, ys_bp, qqs_bp) bazis punktlarda yoki None."""
+    row = _firm_registry().get(str(stir))
+    return row[7:10] if row else None
+
+
+def get_firma_display(stir, lang):
+    """(name, rahbar) foydalanuvchi yozuvida (saqlangan shakllardan) yoki None.
+
+    lang.translate_text(name, lang) bilan bir xil natija, lekin transliteratsiyasiz.
+    """
+    row = _firm_registry().get(str(stir))
+    if not row:
+        return None
+    if lang == 'uz_cyrillic':
+        return row[11], row[14]
+    if lang == 'uz_latin':
+        return row[10], row[13]
+    return row[0], row[1]
+
 
 def check_firma(stir):
-    conn = sqlite3.connect(os.path.join(DATA_PATH, "bot.db"))
-    c = conn.cursor()
-    c.execute("SELECT stir FROM firms WHERE stir = ?", (stir,))
-    result = c.fetchone()
-    conn.close()
-    return result is not None
+    return str(stir) in _firm_registry()
 
 def get_all_firms():
-    conn = sqlite3.connect(os.path.join(DATA_PATH, "bot.db"))
-    c = conn.cursor()
-    c.execute("SELECT stir, name FROM firms ORDER BY name ASC")
-    firms = c.fetchall()
-    conn.close()
-    return [(str(stir), str(name).lower() if name else "") for stir, name in firms]
+    global _firms_sorted
+    firms = _firms_sorted
+    if firms is None:
+        with _firms_lock:
+            # SQLite dagi "ORDER BY name ASC" bilan bir xil: NULL nomlar birinchi
+            items = sorted(_firm_registry().items(), key=lambda item: (item[1][0] is not None, item[1][0] or ""))
+            firms = [(stir, str(row[0]).lower() if row[0] else "") for stir, row in items]
+            _firms_sorted = firms
+    return list(firms)
+
+def count_firms():
+    return len(_firm_registry())
+
+def has_firms_fts():
+    """firms_fts (migratsiya 7) mavjudmi - SEARCH_BACKEND=fts uchun kerak."""
+    row = get_connection().execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'firms_fts'").fetchone()
+    return row is not None
+
+def search_firms(query, limit=20, offset=0):
+    """firms_fts bo'yicha qidiruv: [(stir, name), ...].
+
+    So'rov o'zi, lotin va kirill shakllarida qidiriladi; nom, rahbar, STIR va
+    ularning transliteratsiyalari bo'yicha qism-satr mosligi. FTS5 bo'lmasa
+    sqlite3.OperationalError.
+    """
+    text = normalize_text(query)
+    if not text:
+        return []
+    if len(text) < 3:
+        pattern = "%" + text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+        return fetch_all('firms_fts.search_short', (pattern, limit, offset))
+    variants = dict.fromkeys((text, convert_to_latin(text), convert_to_cyrillic(text)))
+    match = " OR ".join('"' + variant.replace('"', '""') + '"' for variant in variants)
+    return fetch_all('firms_fts.search', (match, limit, offset))
+
+
+def firm_page_anchor(index):
+    """(name, stir) tartibida `index`-o'rindagi (0 dan) firmaning kaliti yoki None."""
+    row = fetch_one('firms.page_anchor', (index,))
+    return tuple(row) if row else None
+
+def list_firms_after(anchor, limit):
+    """(name, stir) tartibida anchor dan keyingi `limit` ta firma
+    [(stir, name, name_latin, name_cyrillic), ...].
+
+    anchor - oldingi sahifaning oxirgi (name, stir) kaliti; None - boshidan.
+    """
+    if anchor is None:
+        return fetch_all('firms.page_first', (limit,))
+    if anchor[0] is None:
+        return fetch_all('firms.page_after_null', (anchor[1], limit))
+    return fetch_all('firms.page_after', tuple(anchor) + (limit,))
 
 
 
 def get_firma_name(stir):
-    conn = sqlite3.connect(os.path.join(DATA_PATH, "bot.db"))
-    c = conn.cursor()
-    c.execute("SELECT name FROM firms WHERE stir = ?", (stir,))
-    result = c.fetchone()
-    conn.close()
-    return result[0] if result else "Noma'lum"
+    row = _firm_registry().get(str(stir))
+    return row[0] if row else "Noma'lum"
 
-def save_file(stir, soliq_turi, oy, file_type, file_path):
+def report_dir(stir, soliq_turi, yil=None):
+    """Hisobot fayllari papkasi: data/<stir>/<soliq_turi>/<yil>."""
+    return os.path.join(DATA_PATH, str(stir), soliq_turi, str(yil or REPORT_YEAR))
+
+
+def save_file(stir, soliq_turi, oy, file_type, file_path, yil=None):
     try:
-        conn = sqlite3.connect(os.path.join(DATA_PATH, "bot.db"))
-        c = conn.cursor()
-        c.execute("INSERT OR REPLACE INTO files (stir, soliq_turi, oy, file_type, file_path) VALUES (?, ?, ?, ?, ?)",
-                 (stir, soliq_turi, oy.lower(), file_type, file_path))
-        conn.commit()
+        conn = get_connection()
+        with conn:
+            run_query('files.save', (stir, soliq_turi, yil or REPORT_YEAR, oy.lower(), file_type, file_path), conn)
         logger.info(f"Fayl saqlandi: stir={stir}, soliq_turi={soliq_turi}, oy={oy}, file_type={file_type}, file_path={file_path}")
     except sqlite3.Error as e:
         logger.error(f"SQL xatosi faylni saqlashda: {e}, stir={stir}, soliq_turi={soliq_turi}, oy={oy}, file_type={file_type}")
-    finally:
-        conn.close()
 
-def check_file(stir, soliq_turi, oy, file_type):
+def check_file(stir, soliq_turi, oy, file_type, yil=None):
     try:
-        conn = sqlite3.connect(os.path.join(DATA_PATH, "bot.db"))
-        c = conn.cursor()
-        c.execute("SELECT file_path FROM files WHERE stir=? AND soliq_turi=? AND oy=? AND file_type=?", 
-                 (stir, soliq_turi, oy.lower(), file_type))
-        result = c.fetchone()
-        logger.info(f"check_file: stir={stir}, soliq_turi={soliq_turi}, oy={oy}, file_type={file_type}, result={result}")
+        result = fetch_one('files.get', (stir, soliq_turi, yil or REPORT_YEAR, oy.lower(), file_type))
+        logger.debug(f"check_file: stir={stir}, soliq_turi={soliq_turi}, oy={oy}, file_type={file_type}, result={result}")
         return result[0] if result else None
     except sqlite3.Error as e:
         logger.error(f"check_file xatosi: {e}, stir={stir}, soliq_turi={soliq_turi}, oy={oy}, file_type={file_type}")
         return None
-    finally:
-        conn.close()
 
+REPORT_FILE_TYPES = ['excel1', 'excel2', 'html']
 
-def save_manual_report(stir, oy, firma_name, xodimlar_soni, xodimlar_data, hisobot_davri_oylik, jami_oylik, soliq):
-    conn = sqlite3.connect(os.path.join(DATA_PATH, "bot.db"))
-    c = conn.cursor()
-    c.execute("""
-        INSERT INTO reports (stir, oy, firma_name, xodimlar_soni, xodimlar_data, hisobot_davri_oylik, jami_oylik, soliq)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-    """, (stir, oy, firma_name, xodimlar_soni, xodimlar_data, hisobot_davri_oylik, jami_oylik, soliq))
+def resolve_report_files(stir, soliq_turi, oy, lang, yil=None):
+    """Hisobot fayllarini bitta so'rov bilan topib, yuborish rejasini qaytaradi.
+
+    Har bir fayl turi uchun avval foydalanuvchi tilidagi, so'ng ikkinchi
+    alifbodagi variant olinadi (html uchun bitta variant). Natija
+    REPORT_FILE_TYPES tartibida: file_type, db_file_type, file_path, fallback.
+    """
+    preferred_lang = 'latin' if lang == 'uz_latin' else 'cyrillic'
+    fallback_lang = 'cyrillic' if lang == 'uz_latin' else 'latin'
+    try:
+        paths = dict(fetch_all('files.for_month', (stir, soliq_turi, yil or REPORT_YEAR, oy.lower())))
+    except sqlite3.Error as e:
+        logger.error(f"resolve_report_files xatosi: {e}, stir={stir}, soliq_turi={soliq_turi}, oy={oy}")
+        paths = {}
+
+    plan = []
+    for file_type in REPORT_FILE_TYPES:
+        if file_type == 'html':
+            candidates = [('html', False)]
+        else:
+            candidates = [(f"{file_type}_{preferred_lang}", False), (f"{file_type}_{fallback_lang}", True)]
+        for db_file_type, fallback in candidates:
+            if paths.get(db_file_type):
+                break
+        plan.append({
+            'file_type': file_type,
+            'db_file_type': db_file_type,
+            'file_path': paths.get(db_file_type),
+            'fallback': fallback,
+        })
+    return plan
+
+def delete_report_data(stir, oy, yil=None):
+    yil = yil or REPORT_YEAR
+    conn = get_connection()
+    with conn:
+        run_query('reports.delete_month', (stir, yil, oy), conn)
+        run_query('files.delete_month', (stir, yil, oy), conn)
+
+
+def archive_report_year(yil):
+    """Tugagan yil hisobotlarini data/archive/reports_<yil>.db ga ko'chiradi.
+
+    Joriy yil (REPORT_YEAR) va undan keyingilarga tegmaydi. Har bir jadvaldan
+    ko'chirilgan qatorlar sonini qaytaradi.
+    """
+    yil = int(yil)
+    if yil >= REPORT_YEAR:
+        raise ValueError(f"Joriy yoki kelgusi yilni arxivlab bo'lmaydi: {yil}")
+    archive_dir = os.path.join(DATA_PATH, "archive")
+    os.makedirs(archive_dir, exist_ok=True)
+    conn = get_connection()
     conn.commit()
-    conn.close()
+    conn.execute("ATTACH DATABASE ? AS arch", (os.path.join(archive_dir, f"reports_{yil}.db"),))
+    moved = {}
+    try:
+        with conn:
+            for table in REPORT_TABLES + ('report_revisions',):
+                conn.execute(f"CREATE TABLE IF NOT EXISTS arch.{table} AS SELECT * FROM main.{table} WHERE 0")
+                conn.execute(f"INSERT INTO arch.{table} SELECT * FROM main.{table} WHERE yil = ?", (yil,))
+                moved[table] = conn.execute(f"DELETE FROM main.{table} WHERE yil = ?", (yil,)).rowcount
+    finally:
+        conn.execute("DETACH DATABASE arch")
+    logger.info(f"{yil}-yil hisobotlari arxivlandi: {moved}")
+    return moved
+
+
+def _upsert_report(table, stir, yil, oy, values):
+    """Davr hisobotini yozadi yoki yangilaydi; oldingi holat report_revisions
+    ga tushadi. Yangi revision raqamini qaytaradi."""
+    conn = get_connection()
+    revision = 1
+    with conn:
+        cursor = run_query(f'{table}.snapshot', (stir, yil, oy), conn)
+        previous = cursor.fetchone()
+        if previous is not None:
+            record = dict(zip([col[0] for col in cursor.description], previous))
+            revision = record['revision'] + 1
+            run_query('report_revisions.add', (table, stir, yil, oy, record['revision'],
+                                               json.dumps(record, ensure_ascii=False)), conn)
+        run_query(f'{table}.upsert', (stir, oy, *values, yil), conn)
+    return revision
+
+def get_report_revisions(table, stir, oy, yil=None):
+    """Davr hisobotining oldingi holatlari: [(revision, dict, replaced_at), ...]"""
+    if table not in REPORT_KINDS:
+        raise ValueError(f"Noma'lum hisobot jadvali: {table}")
+    rows = fetch_all('report_revisions.list', (table, stir, yil or REPORT_YEAR, oy))
+    return [(revision, json.loads(data), replaced_at) for revision, data, replaced_at in rows]
+
+def save_manual_report(stir, oy, firma_name, xodimlar_soni, xodimlar_data, hisobot_davri_oylik, jami_oylik, soliq, yil=None):
+    return _upsert_report('reports', stir, yil or REPORT_YEAR, oy,
+                          (firma_name, xodimlar_soni, xodimlar_data, hisobot_davri_oylik, jami_oylik, soliq))
+
+def get_manual_report(stir, oy, yil=None):
+    """(firma_name, xodimlar_soni, xodimlar_data, hisobot_davri_oylik, jami_oylik, soliq) yoki None."""
+    return fetch_one('reports.get', (stir, yil or REPORT_YEAR, oy))
+
+# --- Foydalanuvchi tili keshi ---
+# get_user_language deyarli har bir handlerda chaqiriladi. Tillar LRU keshda
+# saqlanadi: birinchi murojaatda bazadan o'qiladi, set_user_language esa
+# keshni darhol yangilaydi.
+
+USER_LANG_CACHE_SIZE = 10000
+
+_user_langs = OrderedDict()
+_user_langs_lock = threading.Lock()
+_user_lang_stats = {'hits': 0, 'misses': 0}
+
+
+def _cache_user_language(user_id, lang):
+    with _user_langs_lock:
+        _user_langs[user_id] = lang
+        _user_langs.move_to_end(user_id)
+        while len(_user_langs) > USER_LANG_CACHE_SIZE:
+            _user_langs.popitem(last=False)
+
+
+def get_cached_user_language(user_id):
+    """Keshdagi tilni qaytaradi, bo'lmasa None (bazaga murojaat qilmaydi)."""
+    with _user_langs_lock:
+        lang = _user_langs.get(user_id)
+        if lang is None:
+            return None
+        _user_langs.move_to_end(user_id)
+        _user_lang_stats['hits'] += 1
+        return lang
+
+
+def user_language_cache_stats():
+    with _user_langs_lock:
+        return dict(_user_lang_stats, size=len(_user_langs), maxsize=USER_LANG_CACHE_SIZE)
 
-def get_manual_report(stir, oy):
-    conn = sqlite3.connect(os.path.join(DATA_PATH, "bot.db"))
-    c = conn.cursor()
-    c.execute("SELECT * FROM reports WHERE stir = ? AND oy = ?", (stir, oy))
-    result = c.fetchone()
-    conn.close()
-    return result
 
 def set_user_language(user_id, language):
     try:
@@ -370,48 +1206,44 @@ def set_user_language(user_id, language):
             language = 'uz_cyrillic'
         elif language == 'latin':
             language = 'uz_latin'
-        conn = sqlite3.connect(os.path.join(DATA_PATH, "bot.db"))
-        c = conn.cursor()
-        c.execute("INSERT OR REPLACE INTO users (user_id, language) VALUES (?, ?)", (user_id, language))
-        conn.commit()
-        conn.close()
+        conn = get_connection()
+        with conn:
+            run_query('users.set_language', (user_id, language), conn)
+        _cache_user_language(user_id, language)
         logger.info(f"set_user_language: user_id={user_id}, language={language}")
     except Exception as e:
         logger.error(f"set_user_language xatosi: {e}")
 
 def get_user_language(user_id):
+    lang = get_cached_user_language(user_id)
+    if lang is not None:
+        return lang
     try:
-        conn = sqlite3.connect(os.path.join(DATA_PATH, "bot.db"))
-        c = conn.cursor()
-        c.execute("SELECT language FROM users WHERE user_id = ?", (user_id,))
-        result = c.fetchone()
-        conn.close()
+        result = fetch_one('users.get_language', (user_id,))
         lang = result[0] if result else 'uz_latin'
         # cyrillic ni uz_cyrillic bilan almashtiramiz
         if lang == 'cyrillic':
             lang = 'uz_cyrillic'
-        logger.info(f"get_user_language: user_id={user_id}, lang={lang}")
-        return lang
     except Exception as e:
         logger.error(f"get_user_language xatosi: {e}")
         return 'uz_latin'
-    
+    with _user_langs_lock:
+        _user_lang_stats['misses'] += 1
+    _cache_user_language(user_id, lang)
+    return lang
+
 
 
 def update_firm_phone(stir, phone):
-    conn = sqlite3.connect(os.path.join(DATA_PATH, "bot.db"))
-    c = conn.cursor()
-    c.execute("UPDATE firm_owners SET phone=? WHERE stir=?", (phone, stir))
-    conn.commit()
-    conn.close()
+    conn = get_connection()
+    with conn:
+        run_query('firm_owners.update_phone', (phone, stir), conn)
 
 
-async def cleanup_access_logs():
-    conn = sqlite3.connect(os.path.join(DATA_PATH, "bot.db"))
-    c = conn.cursor()
-    c.execute(
-        "DELETE FROM firm_access_log WHERE timestamp <= strftime('%s','now') - ?",
-        (BLOCK_SECONDS,)
-    )
-    conn.commit()
-    conn.close()
+def prune_access_windows():
+    """Bo'shab qolgan tekshiruv oynalarini xotiradan olib tashlaydi."""
+    now = int(time.time())
+    with _access_lock:
+        for key in list(_access_windows):
+            if not _access_window(key[0], key[1], now):
+                del _access_windows[key]
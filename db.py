@@ -0,0 +1,268 @@
+"""database.py funksiyalarining asinxron varianti.
+
+Handlerlar ``await db.get_firma_info(stir)`` ko'rinishida chaqiradi: so'rov
+alohida DB oqimida bajariladi va event loop boshqa foydalanuvchilarni
+kutib qolmaydi. Skriptlar uchun database.py dagi sinxron funksiyalar
+o'zgarishsiz qoladi.
+"""
+import asyncio
+import contextvars
+import functools
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import database
+
+logger = logging.getLogger(__name__)
+
+# Bitta DB oqimi: SQLite yozuvlari navbat bilan bajariladi, lock uchun kurash yo'q
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="db")
+
+
+async def run(func, *args, **kwargs):
+    """Istalgan sinxron DB funksiyasini DB oqimida bajaradi."""
+    loop = asyncio.get_running_loop()
+    # Kontekst bilan: query_stats joriy update so'rovlarini sanay olishi uchun
+    ctx = contextvars.copy_context()
+    return await loop.run_in_executor(_executor, functools.partial(ctx.run, func, *args, **kwargs))
+
+
+def shutdown():
+    _executor.shutdown(wait=True)
+    database.close_connections()
+    logger.info("DB oqimi to'xtatildi")
+
+
+# --- Foydalanuvchilar ---
+
+def user_language_cache_stats():
+    return database.user_language_cache_stats()
+
+async def get_user_language(user_id):
+    # Keshda bo'lsa DB oqimiga navbat kutmasdan qaytaramiz
+    lang = database.get_cached_user_language(user_id)
+    if lang is not None:
+        return lang
+    return await run(database.get_user_language, user_id)
+
+async def set_user_language(user_id, language):
+    return await run(database.set_user_language, user_id, language)
+
+
+# --- Firmalar ---
+
+async def add_firma(stir, name, rahbar=None, soliq_turi=None, ds_stavka=None, ys_stavka=None, qqs_stavka=None):
+    return await run(database.add_firma, stir, name, rahbar, soliq_turi, ds_stavka, ys_stavka, qqs_stavka)
+
+async def bulk_upsert_firms(firms):
+    return await run(database.bulk_upsert_firms, firms)
+
+async def update_firma_name(stir, new_name):
+    return await run(database.update_firma_name, stir, new_name)
+
+# Quyidagilar xotiradagi firmalar reyestridan o'qiydi (database.load_firm_registry),
+# shuning uchun DB oqimiga yuborilmaydi
+
+async def get_firma_info(stir):
+    return database.get_firma_info(stir)
+
+async def check_firma(stir):
+    return database.check_firma(stir)
+
+async def get_firma_name(stir):
+    return database.get_firma_name(stir)
+
+async def get_firma_display(stir, lang):
+    return database.get_firma_display(stir, lang)
+
+async def get_soliq_flags(stir):
+    return database.get_soliq_flags(stir)
+
+async def get_firma_rates(stir):
+    return database.get_firma_rates(stir)
+
+async def get_all_firms():
+    return database.get_all_firms()
+
+async def count_firms():
+    return database.count_firms()
+
+async def firm_page_anchor(index):
+    return await run(database.firm_page_anchor, index)
+
+async def list_firms_after(anchor, limit):
+    return await run(database.list_firms_after, anchor, limit)
+
+async def search_firms(query, limit=20, offset=0):
+    return await run(database.search_firms, query, limit, offset)
+
+
+# --- Firma egalari va hujjatlar ---
+
+async def add_firm_owner(stir, phone):
+    return await run(database.add_firm_owner, stir, phone)
+
+async def verify_owner_phone(stir, phone):
+    return await run(database.verify_owner_phone, stir, phone)
+
+async def get_owner_phone(stir):
+    return await run(database.get_owner_phone, stir)
+
+async def update_firm_phone(stir, phone):
+    return await run(database.update_firm_phone, stir, phone)
+
+async def save_firm_docs(stir, pdf1, pdf2, pfx):
+    return await run(database.save_firm_docs, stir, pdf1, pdf2, pfx)
+
+async def get_firm_docs(stir):
+    return await run(database.get_firm_docs, stir)
+
+
+# --- Fayllar va hisobotlar ---
+
+async def save_file(stir, soliq_turi, oy, file_type, file_path, yil=None):
+    return await run(database.save_file, stir, soliq_turi, oy, file_type, file_path, yil)
+
+async def check_file(stir, soliq_turi, oy, file_type, yil=None):
+    return await run(database.check_file, stir, soliq_turi, oy, file_type, yil)
+
+async def resolve_report_files(stir, soliq_turi, oy, lang, yil=None):
+    return await run(database.resolve_report_files, stir, soliq_turi, oy, lang, yil)
+
+async def delete_report_data(stir, oy, yil=None):
+    return await run(database.delete_report_data, stir, oy, yil)
+
+async def archive_report_year(yil):
+    return await run(database.archive_report_year, yil)
+
+async def save_manual_report(stir, oy, firma_name, xodimlar_soni, xodimlar_data, hisobot_davri_oylik, jami_oylik, soliq, yil=None):
+    return await run(database.save_manual_report, stir, oy, firma_name, xodimlar_soni, xodimlar_data,
+                     hisobot_davri_oylik, jami_oylik, soliq, yil)
+
+async def get_manual_report(stir, oy, yil=None):
+    return await run(database.get_manual_report, stir, oy, yil)
+
+async def get_report_revisions(table, stir, oy, yil=None):
+    return await run(database.get_report_revisions, table, stir, oy, yil)
+
+async def save_yagona_report(stir, oy, firma_name, rahbar, soliq_turi_yagona, yil_boshidan_aylanma, shu_oy_aylanma, yagona_soliq, yil=None):
+    return await run(database.save_yagona_report, stir, oy, firma_name, rahbar, soliq_turi_yagona,
+                     yil_boshidan_aylanma, shu_oy_aylanma, yagona_soliq, yil)
+
+async def get_yagona_report(stir, oy, yil=None):
+    return await run(database.get_yagona_report, stir, oy, yil)
+
+async def save_qqs_report(stir, oy, firma_name, rahbar, soliq_turi_qqs, yil_boshidan_qqs, shu_oy_qqs, qqs_soliq, yil=None):
+    return await run(database.save_qqs_report, stir, oy, firma_name, rahbar, soliq_turi_qqs,
+                     yil_boshidan_qqs, shu_oy_qqs, qqs_soliq, yil)
+
+async def get_qqs_report(stir, oy, yil=None):
+    return await run(database.get_qqs_report, stir, oy, yil)
+
+
+# --- Xavfsizlik va loglar ---
+
+async def log_access_attempt(stir, phone, user_id):
+    now = int(time.time())
+    database.record_access_attempt(stir, user_id, now)
+    await _enqueue_audit('access', (stir, phone, user_id, now))
+
+async def is_blocked(stir, user_id):
+    # Limit xotirada tekshiriladi
+    return database.is_blocked(stir, user_id)
+
+async def log_download(uid, phone, stir, file):
+    key = (phone, stir)
+    _pending_downloads[key] = _pending_downloads.get(key, 0) + 1
+    await _enqueue_audit('download', (uid, phone, stir, file, database.audit_timestamp()))
+
+async def today_downloads(phone, stir):
+    # Navbatda turgan (hali yozilmagan) yuklashlar ham limitga kiradi
+    return await run(database.today_downloads, phone, stir) + _pending_downloads.get((phone, stir), 0)
+
+async def log_alert(uid, phone, stir, event):
+    await _enqueue_audit('alert', (uid, phone, stir, event, database.audit_timestamp()))
+
+
+# --- Audit navbati (write-behind) ---
+# log_download, log_alert va log_access_attempt qatorlari navbatga qo'yiladi
+# va fon vazifasi ularni AUDIT_FLUSH_MS yoki AUDIT_FLUSH_ROWS ga yetganda bitta
+# tranzaksiyada yozadi. Navbat to'lsa put() kutadi (backpressure).
+
+AUDIT_QUEUE_SIZE = 10000
+AUDIT_FLUSH_ROWS = 200
+AUDIT_FLUSH_MS = 500
+
+_audit_queue = None
+_audit_task = None
+_pending_downloads = {}   # (phone, stir) -> navbatdagi yuklashlar soni
+
+
+async def _enqueue_audit(kind, row):
+    if _audit_queue is None:
+        # Navbat ishga tushmagan (masalan, skriptlarda) - darhol yozamiz
+        await _write_audit([(kind, row)])
+        return
+    await _audit_queue.put((kind, row))
+
+
+async def _write_audit(batch):
+    try:
+        await run(database.write_audit_batch, batch)
+    except Exception as e:
+        logger.error(f"Audit yozuvlarini saqlashda xato ({len(batch)} ta): {e}")
+    finally:
+        for kind, row in batch:
+            if kind == 'download':
+                key = (row[1], row[2])
+                left = _pending_downloads.get(key, 0) - 1
+                if left > 0:
+                    _pending_downloads[key] = left
+                else:
+                    _pending_downloads.pop(key, None)
+
+
+async def _audit_writer():
+    loop = asyncio.get_running_loop()
+    while True:
+        item = await _audit_queue.get()
+        if item is None:
+            return
+        batch = [item]
+        deadline = loop.time() + AUDIT_FLUSH_MS / 1000
+        stop = False
+        while len(batch) < AUDIT_FLUSH_ROWS:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                item = await asyncio.wait_for(_audit_queue.get(), timeout)
+            except asyncio.TimeoutError:
+                break
+            if item is None:
+                stop = True
+                break
+            batch.append(item)
+        await _write_audit(batch)
+        if stop:
+            return
+
+
+def start_audit_writer():
+    """on_startup da chaqiriladi."""
+    global _audit_queue, _audit_task
+    _audit_queue = asyncio.Queue(maxsize=AUDIT_QUEUE_SIZE)
+    _audit_task = asyncio.create_task(_audit_writer())
+
+
+async def stop_audit_writer():
+    """Navbatdagi hamma yozuvlarni saqlab, fon vazifasini to'xtatadi."""
+    global _audit_queue, _audit_task
+    if _audit_task is None:
+        return
+    await _audit_queue.put(None)
+    await _audit_task
+    _audit_queue = None
+    _audit_task = None
+    logger.info("Audit navbati yopildi")
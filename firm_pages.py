@@ -0,0 +1,114 @@
+"""Admin firmalar ro'yxati va firma tanlash tugmalari uchun keyset sahifalash.
+
+Sahifalar (name, stir) kaliti bo'yicha olinadi (database.list_firms_after,
+ix_firms_name_stir indeksi): n-sahifa (n-1)-sahifaning oxirgi kalitidan
+keyin boshlanadi, shuning uchun chuqur sahifalar OFFSET kabi sekinlashmaydi.
+Sahifa chegaralari (anchor), sahifa qatorlari va tayyor matnlar keshlanadi;
+firmalar o'zgarganda database.on_firm_change orqali hammasi tozalanadi.
+"""
+import threading
+from collections import OrderedDict
+
+import database
+import db
+
+PAGE_SIZE = 10
+MAX_CACHED = 512    # eslab qolinadigan sahifa qatorlari va matnlar soni
+
+_anchors = {}             # (per_page, page) -> shu sahifa oxirgi qatorining (name, stir) kaliti
+_pages = OrderedDict()    # (per_page, page) -> [(stir, name, name_latin, name_cyrillic), ...]
+_rendered = OrderedDict() # (kind, lang, per_page, page) -> render_page() dagi build natijasi
+_lock = threading.Lock()
+_generation = 0           # har bir firma o'zgarishida oshadi
+
+
+def _on_firm_change(stirs):
+    global _generation
+    with _lock:
+        _anchors.clear()
+        _pages.clear()
+        _rendered.clear()
+        _generation += 1
+
+
+database.on_firm_change(_on_firm_change)
+
+
+def _remember(cache, key, value):
+    cache[key] = value
+    if len(cache) > MAX_CACHED:
+        cache.popitem(last=False)
+
+
+def display_name(row, lang):
+    """Sahifa qatoridagi nom foydalanuvchi yozuvida (saqlangan shakldan,
+    database.get_firma_display kabi transliteratsiyasiz)."""
+    stir, name, name_latin, name_cyrillic = row
+    if lang == 'uz_cyrillic':
+        return name_cyrillic or name or ""
+    if lang == 'uz_latin':
+        return name_latin or name or ""
+    return name or ""
+
+
+def total_pages(per_page=PAGE_SIZE):
+    # Firmalar soni xotiradagi reyestrdan - COUNT(*) so'rovisiz
+    return max(1, (database.count_firms() + per_page - 1) // per_page)
+
+
+async def get_page(page, per_page=PAGE_SIZE):
+    """(qatorlar, sahifa, jami sahifalar); qatorlar
+    [(stir, name, name_latin, name_cyrillic), ...].
+
+    Sahifa raqami [1, jami] oralig'iga keltiriladi. Oldingi sahifa chegarasi
+    keshda bo'lmasa u indeksning o'zidan bitta qator bilan topiladi
+    (database.firm_page_anchor), keyin faqat shu sahifa keyset bilan olinadi.
+    """
+    pages = total_pages(per_page)
+    page = max(1, min(page, pages))
+    key = (per_page, page)
+    with _lock:
+        rows = _pages.get(key)
+        if rows is not None:
+            _pages.move_to_end(key)
+            return rows, page, pages
+        generation = _generation
+        anchor = _anchors.get((per_page, page - 1))
+
+    if anchor is None and page > 1:
+        anchor = await db.firm_page_anchor((page - 1) * per_page - 1)
+    rows = await db.list_firms_after(anchor, per_page)
+
+    with _lock:
+        # So'rov paytida firmalar o'zgargan bo'lsa natija keshga yozilmaydi
+        if generation == _generation:
+            if anchor is not None:
+                _anchors[(per_page, page - 1)] = anchor
+            if rows:
+                stir, name = rows[-1][:2]
+                _anchors[(per_page, page)] = (name, stir)
+            _remember(_pages, key, rows)
+    return rows, page, pages
+
+
+async def render_page(kind, lang, page, build, per_page=PAGE_SIZE):
+    """(build(qatorlar, sahifa, jami), sahifa, jami).
+
+    build natijasi (kind, lang, sahifa) bo'yicha eslab qolinadi - masalan,
+    foydalanuvchi tilidagi ro'yxat matni yoki tugma yozuvlari. Firmalar
+    o'zgarganda kesh tozalanadi.
+    """
+    pages = total_pages(per_page)
+    page = max(1, min(page, pages))
+    key = (kind, lang, per_page, page)
+    with _lock:
+        if key in _rendered:
+            _rendered.move_to_end(key)
+            return _rendered[key], page, pages
+        generation = _generation
+    rows, page, pages = await get_page(page, per_page)
+    value = build(rows, page, pages)
+    with _lock:
+        if generation == _generation:
+            _remember(_rendered, key, value)
+    return value, page, pages
@@ -5,15 +5,15 @@ from aiogram.dispatcher import FSMContext
 from aiogram.dispatcher.filters.state import State, StatesGroup
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 from loader import dp, bot
-from database import get_firma_name, get_firma_info, check_firma, get_manual_report, check_file, get_user_language, set_user_language, update_firm_phone, get_owner_phone, cleanup_access_logs
+import db
+from database import SOLIQ_DS, SOLIQ_YS, SOLIQ_QQS
 from config import DATA_PATH
-from lang import get_text, get_month_name, translate_text
+from lang import get_text, get_month_name, translate_text, MONTHS
 from parser_yagona import generate_yagona_summary, generate_qqs_summary
 from converters import convert_to_cyrillic, convert_to_latin
 import logging
 
-from config import ADMIN_IDS
-from database import get_all_firms
+from config import ADMIN_IDS, INLINE_CACHE_TIME, INLINE_RESULTS
 from aiogram.dispatcher.filters.state import State, StatesGroup
 
 class ManualInput(StatesGroup):
@@ -37,8 +37,8 @@ async def start_command(message: types.Message, state: FSMContext):
     user_id = message.from_user.id
     keyboard = types.InlineKeyboardMarkup(row_width=2)
     keyboard.add(
-        types.InlineKeyboardButton(translate_text("O‘zbek (Lotin)", 'uz_latin'), callback_data="set_lang_uz_latin"),
-        types.InlineKeyboardButton(translate_text("Ўзбек (Кирил)", 'uz_cyrillic'), callback_data="set_lang_uz_cyrillic")
+        types.InlineKeyboardButton("O‘zbek (Lotin)", callback_data="set_lang_uz_latin"),
+        types.InlineKeyboardButton("Ўзбек (Кирил)", callback_data="set_lang_uz_cyrillic")
     )
     await message.answer(get_text('uz_latin', 'select_language'), reply_markup=keyboard)
     await LanguageSelection.select_language.set()
@@ -48,7 +48,7 @@ async def process_language_selection(callback_query: types.CallbackQuery, state:
     await callback_query.answer()
     user_id = callback_query.from_user.id
     lang = callback_query.data.replace('set_lang_', '')  # uz_latin yoki uz_cyrillic
-    set_user_language(user_id, lang)
+    await db.set_user_language(user_id, lang)
     logger.info(f"Til o'zgartirildi: user_id={user_id}, lang={lang}")
     await callback_query.message.answer(get_text(lang, 'language_set'))
     await callback_query.message.answer(get_text(lang, 'welcome'))
@@ -57,21 +57,21 @@ async def process_language_selection(callback_query: types.CallbackQuery, state:
 @dp.message_handler(commands=['translate_latin'], state='*')
 async def translate_to_latin_command(message: types.Message, state: FSMContext):
     user_id = message.from_user.id
-    lang = get_user_language(user_id)
+    lang = await db.get_user_language(user_id)
     await message.answer(get_text(lang, 'enter_cyrillic_text'))
     await TranslateState.waiting_for_cyrillic_text.set()
 
 @dp.message_handler(commands=['translate_cyrillic'], state='*')
 async def translate_to_cyrillic_command(message: types.Message, state: FSMContext):
     user_id = message.from_user.id
-    lang = get_user_language(user_id)
+    lang = await db.get_user_language(user_id)
     await message.answer(get_text(lang, 'enter_latin_text'))
     await TranslateState.waiting_for_latin_text.set()
 
 @dp.message_handler(state=TranslateState.waiting_for_latin_text)
 async def process_latin_text(message: types.Message, state: FSMContext):
     user_id = message.from_user.id
-    lang = get_user_language(user_id)
+    lang = await db.get_user_language(user_id)
     text = message.text.strip()
     translated_text = convert_to_cyrillic(text)
     await message.answer(get_text(lang, 'translated_text', text=translated_text))
@@ -80,7 +80,7 @@ async def process_latin_text(message: types.Message, state: FSMContext):
 @dp.message_handler(state=TranslateState.waiting_for_cyrillic_text)
 async def process_cyrillic_text(message: types.Message, state: FSMContext):
     user_id = message.from_user.id
-    lang = get_user_language(user_id)
+    lang = await db.get_user_language(user_id)
     text = message.text.strip()
     translated_text = convert_to_latin(text)
     await message.answer(get_text(lang, 'translated_text', text=translated_text))
@@ -90,9 +90,9 @@ async def process_cyrillic_text(message: types.Message, state: FSMContext):
 async def select_tax_type(message: types.Message):
     stir = message.text.strip()
     user_id = message.from_user.id
-    lang = get_user_language(user_id)
+    lang = await db.get_user_language(user_id)
 
-    firma_info = get_firma_info(stir)
+    firma_info = await db.get_firma_info(stir)
     if not firma_info:
         await message.answer(get_text(lang, 'invalid_stir'), parse_mode='Markdown')
         return
@@ -102,16 +102,16 @@ async def select_tax_type(message: types.Message):
 
     # 🔹 Soliq tugmalari
     keyboard = InlineKeyboardMarkup(row_width=2)
-    soliq_turlari = soliq_turi.split('-') if soliq_turi else ['ds', 'ys']
+    flags = await db.get_soliq_flags(stir)
 
-    if 'ds' in soliq_turlari:
-        keyboard.add(InlineKeyboardButton(translate_text("Daromad solig'i", lang),
+    if flags & SOLIQ_DS:
+        keyboard.add(InlineKeyboardButton(get_text(lang, 'btn_daromad'),
                                           callback_data=f"soliq_daromad_{stir}"))
-    if 'ys' in soliq_turlari:
-        keyboard.add(InlineKeyboardButton(translate_text("Yagona soliq", lang),
+    if flags & SOLIQ_YS:
+        keyboard.add(InlineKeyboardButton(get_text(lang, 'btn_yagona'),
                                           callback_data=f"soliq_yagona_{stir}"))
-    if 'qqs' in soliq_turlari:
-        keyboard.add(InlineKeyboardButton(translate_text("Qo‘shilgan qiymat solig‘i", lang),
+    if flags & SOLIQ_QQS:
+        keyboard.add(InlineKeyboardButton(get_text(lang, 'btn_qqs'),
                                           callback_data=f"soliq_qqs_{stir}"))
 
     # ✅ 📄 Hujjatlarni ko‘rish tugmasi (shu yerda!)
@@ -121,14 +121,14 @@ async def select_tax_type(message: types.Message):
     # Agar birortasi qo‘shilmasa, default
     if not keyboard.inline_keyboard:
         keyboard.add(
-            InlineKeyboardButton(translate_text("Daromad solig'i", lang), callback_data=f"soliq_daromad_{stir}"),
-            InlineKeyboardButton(translate_text("Yagona soliq", lang), callback_data=f"soliq_yagona_{stir}")
+            InlineKeyboardButton(get_text(lang, 'btn_daromad'), callback_data=f"soliq_daromad_{stir}"),
+            InlineKeyboardButton(get_text(lang, 'btn_yagona'), callback_data=f"soliq_yagona_{stir}")
         )
 
     # Firma ma’lumotini yuborib, so‘ng tugmalarni yuboramiz
-    firma_nomi = translate_text(name, lang)
-    rahbar_txt = translate_text(rahbar, lang) if rahbar else translate_text("Noma'lum", lang)
-    soliq_turi_text = translate_text(soliq_turi, lang) if soliq_turi else translate_text("Noma'lum", lang)
+    firma_nomi, rahbar_txt = await db.get_firma_display(stir, lang)
+    rahbar_txt = rahbar_txt or get_text(lang, 'unknown')
+    soliq_turi_text = translate_text(soliq_turi, lang) if soliq_turi else get_text(lang, 'unknown')
 
     response = get_text(lang, 'firma_info',
                         stir=stir, firma_nomi=firma_nomi, rahbar=rahbar_txt,
@@ -144,86 +144,57 @@ async def select_tax_type(message: types.Message):
     logger.info(f"Keyboard sent: {keyboard.inline_keyboard}")
 
 
-async def send_report_files_only(stir, soliq_turi, oy, user_id, lang):
-    logger.info(f"send_report_files_only: user_id={user_id}, stir={stir}, soliq_turi={soliq_turi}, oy={oy}, lang={lang}")
-    file_types = ['excel1', 'excel2', 'html']
+async def send_planned_files(plan, user_id, lang):
     files_found = False
-    preferred_lang = 'latin' if lang == 'uz_latin' else 'cyrillic'
-    fallback_lang = 'cyrillic' if lang == 'uz_latin' else 'latin'
-
-    for file_type in file_types:
-        db_file_type = f"{file_type}_{preferred_lang}" if file_type != 'html' else 'html'
-        file_path = check_file(stir, soliq_turi, oy.lower(), db_file_type)
-        logger.info(f"Fayl qidirilmoqda: file_type={db_file_type}, file_path={file_path}")
-
-        if file_path:
-            normalized_path = os.path.normpath(file_path)
-            logger.info(f"Normallashtirilgan yo'l: {normalized_path}")
-            if os.path.exists(normalized_path):
-                try:
-                    with open(normalized_path, 'rb') as f:
-                        await bot.send_document(
-                            user_id,
-                            f,
-                            caption=translate_text(f"{os.path.basename(normalized_path)} fayli", lang),
-                            parse_mode='HTML'
-                        )
-                    logger.info(f"Fayl yuborildi: {normalized_path}, user_id={user_id}")
-                    files_found = True
-                except Exception as e:
-                    logger.error(f"Fayl yuborishda xato: file_path={normalized_path}, user_id={user_id}, xato={str(e)}")
-                    await bot.send_message(
+    for item in plan:
+        db_file_type = item['db_file_type']
+        file_path = item['file_path']
+        label = "Fallback fayl" if item['fallback'] else "Fayl"
+        logger.debug(f"{label} qidirilmoqda: file_type={db_file_type}, file_path={file_path}")
+
+        if not file_path:
+            if item['file_type'] != 'html':
+                logger.warning(f"{label} bazada topilmadi: file_type={db_file_type}")
+                await bot.send_message(
+                    user_id,
+                    translate_text(f"❌ {db_file_type} fayli ma'lumotlar bazasida topilmadi.", lang),
+                    parse_mode='HTML'
+                )
+            continue
+
+        normalized_path = os.path.normpath(file_path)
+        if os.path.exists(normalized_path):
+            try:
+                with open(normalized_path, 'rb') as f:
+                    await bot.send_document(
                         user_id,
-                        translate_text(f"❌ Fayl yuborishda xato: {os.path.basename(normalized_path)} - {str(e)}", lang),
+                        f,
+                        caption=translate_text(f"{os.path.basename(normalized_path)} fayli", lang),
                         parse_mode='HTML'
                     )
-            else:
-                logger.warning(f"Fayl diskda mavjud emas: {normalized_path}, file_type={db_file_type}")
+                logger.info(f"{label} yuborildi: {normalized_path}, user_id={user_id}")
+                files_found = True
+            except Exception as e:
+                logger.error(f"{label} yuborishda xato: file_path={normalized_path}, user_id={user_id}, xato={str(e)}")
                 await bot.send_message(
                     user_id,
-                    translate_text(f"❌ Fayl diskda topilmadi: {os.path.basename(normalized_path)}", lang),
+                    translate_text(f"❌ {label} yuborishda xato: {os.path.basename(normalized_path)} - {str(e)}", lang),
                     parse_mode='HTML'
                 )
         else:
-            # Fallback faylni sinab ko'rish
-            if file_type != 'html':
-                db_file_type = f"{file_type}_{fallback_lang}"
-                file_path = check_file(stir, soliq_turi, oy.lower(), db_file_type)
-                logger.info(f"Fallback fayl qidirilmoqda: file_type={db_file_type}, file_path={file_path}")
-                if file_path:
-                    normalized_path = os.path.normpath(file_path)
-                    if os.path.exists(normalized_path):
-                        try:
-                            with open(normalized_path, 'rb') as f:
-                                await bot.send_document(
-                                    user_id,
-                                    f,
-                                    caption=translate_text(f"{os.path.basename(normalized_path)} fayli", lang),
-                                    parse_mode='HTML'
-                                )
-                            logger.info(f"Fallback fayl yuborildi: {normalized_path}, user_id={user_id}")
-                            files_found = True
-                        except Exception as e:
-                            logger.error(f"Fallback fayl yuborishda xato: file_path={normalized_path}, user_id={user_id}, xato={str(e)}")
-                            await bot.send_message(
-                                user_id,
-                                translate_text(f"❌ Fallback fayl yuborishda xato: {os.path.basename(normalized_path)} - {str(e)}", lang),
-                                parse_mode='HTML'
-                            )
-                    else:
-                        logger.warning(f"Fallback fayl diskda mavjud emas: {normalized_path}, file_type={db_file_type}")
-                        await bot.send_message(
-                            user_id,
-                            translate_text(f"❌ Fallback fayl diskda topilmadi: {os.path.basename(normalized_path)}", lang),
-                            parse_mode='HTML'
-                        )
-                else:
-                    logger.warning(f"Fallback fayl bazada topilmadi: file_type={db_file_type}, stir={stir}, soliq_turi={soliq_turi}, oy={oy}")
-                    await bot.send_message(
-                        user_id,
-                        translate_text(f"❌ {db_file_type} fayli ma'lumotlar bazasida topilmadi.", lang),
-                        parse_mode='HTML'
-                    )
+            logger.warning(f"{label} diskda mavjud emas: {normalized_path}, file_type={db_file_type}")
+            await bot.send_message(
+                user_id,
+                translate_text(f"❌ {label} diskda topilmadi: {os.path.basename(normalized_path)}", lang),
+                parse_mode='HTML'
+            )
+    return files_found
+
+
+async def send_report_files_only(stir, soliq_turi, oy, user_id, lang):
+    logger.info(f"send_report_files_only: user_id={user_id}, stir={stir}, soliq_turi={soliq_turi}, oy={oy}, lang={lang}")
+    plan = await db.resolve_report_files(stir, soliq_turi, oy, lang)
+    files_found = await send_planned_files(plan, user_id, lang)
 
     if not files_found:
         await bot.send_message(
@@ -238,97 +209,21 @@ async def send_report_files_only(stir, soliq_turi, oy, user_id, lang):
 
 async def send_report_files(stir, soliq_turi, oy, user_id, lang):
     logger.info(f"send_report_files: user_id={user_id}, stir={stir}, soliq_turi={soliq_turi}, oy={oy}, lang={lang}")
-    file_types = ['excel1', 'excel2', 'html']
-    files_found = False
-    preferred_lang = 'latin' if lang == 'uz_latin' else 'cyrillic'
-    fallback_lang = 'cyrillic' if lang == 'uz_latin' else 'latin'
-
-    for file_type in file_types:
-        db_file_type = f"{file_type}_{preferred_lang}" if file_type != 'html' else 'html'
-        file_path = check_file(stir, soliq_turi, oy.lower(), db_file_type)
-        logger.info(f"Fayl qidirilmoqda: file_type={db_file_type}, file_path={file_path}")
-
-        if file_path:
-            normalized_path = os.path.normpath(file_path)
-            logger.info(f"Normallashtirilgan yo'l: {normalized_path}")
-            if os.path.exists(normalized_path):
-                try:
-                    with open(normalized_path, 'rb') as f:
-                        await bot.send_document(
-                            user_id,
-                            f,
-                            caption=translate_text(f"{os.path.basename(normalized_path)} fayli", lang),
-                            parse_mode='HTML'
-                        )
-                    logger.info(f"Fayl yuborildi: {normalized_path}, user_id={user_id}")
-                    files_found = True
-                except Exception as e:
-                    logger.error(f"Fayl yuborishda xato: file_path={normalized_path}, user_id={user_id}, xato={str(e)}")
-                    await bot.send_message(
-                        user_id,
-                        translate_text(f"❌ Fayl yuborishda xato: {os.path.basename(normalized_path)} - {str(e)}", lang),
-                        parse_mode='HTML'
-                    )
-            else:
-                logger.warning(f"Fayl diskda mavjud emas: {normalized_path}, file_type={db_file_type}")
-                await bot.send_message(
-                    user_id,
-                    translate_text(f"❌ Fayl diskda topilmadi: {os.path.basename(normalized_path)}", lang),
-                    parse_mode='HTML'
-                )
-        else:
-            # Fallback faylni sinab ko'rish
-            if file_type != 'html':
-                db_file_type = f"{file_type}_{fallback_lang}"
-                file_path = check_file(stir, soliq_turi, oy.lower(), db_file_type)
-                logger.info(f"Fallback fayl qidirilmoqda: file_type={db_file_type}, file_path={file_path}")
-                if file_path:
-                    normalized_path = os.path.normpath(file_path)
-                    if os.path.exists(normalized_path):
-                        try:
-                            with open(normalized_path, 'rb') as f:
-                                await bot.send_document(
-                                    user_id,
-                                    f,
-                                    caption=translate_text(f"{os.path.basename(normalized_path)} fayli", lang),
-                                    parse_mode='HTML'
-                                )
-                            logger.info(f"Fallback fayl yuborildi: {normalized_path}, user_id={user_id}")
-                            files_found = True
-                        except Exception as e:
-                            logger.error(f"Fallback fayl yuborishda xato: file_path={normalized_path}, user_id={user_id}, xato={str(e)}")
-                            await bot.send_message(
-                                user_id,
-                                translate_text(f"❌ Fallback fayl yuborishda xato: {os.path.basename(normalized_path)} - {str(e)}", lang),
-                                parse_mode='HTML'
-                            )
-                    else:
-                        logger.warning(f"Fallback fayl diskda mavjud emas: {normalized_path}, file_type={db_file_type}")
-                        await bot.send_message(
-                            user_id,
-                            translate_text(f"❌ Fallback fayl diskda topilmadi: {os.path.basename(normalized_path)}", lang),
-                            parse_mode='HTML'
-                        )
-                else:
-                    logger.warning(f"Fallback fayl bazada topilmadi: file_type={db_file_type}, stir={stir}, soliq_turi={soliq_turi}, oy={oy}")
-                    await bot.send_message(
-                        user_id,
-                        translate_text(f"❌ {db_file_type} fayli ma'lumotlar bazasida topilmadi.", lang),
-                        parse_mode='HTML'
-                    )
+    plan = await db.resolve_report_files(stir, soliq_turi, oy, lang)
+    files_found = await send_planned_files(plan, user_id, lang)
 
     # Matn ko‘rinishidagi hisobotni yuborish
     if soliq_turi == "daromad":
-        report = get_manual_report(stir, oy)
+        report = await db.get_manual_report(stir, oy)
         if report:
-            _, _, _, firma_name, xodimlar_soni, xodimlar_data, hisobot_davri_oylik, jami_oylik, soliq = report
+            firma_name, xodimlar_soni, xodimlar_data, hisobot_davri_oylik, jami_oylik, soliq = report
             xodimlar_lines = xodimlar_data.split("\n")
             formatted_xodimlar_data = []
             for line in xodimlar_lines:
                 match = re.match(r'^(\d+) \((.*?)\) – (.*?), (.*?): ([\d,]+) (.*?)\s*\((.*?): ([\d,]+) (.*?)\)$', line)
                 if match:
                     index, lavozim, ism, _, shu_oy, _, _, yil_boshidan, _ = match.groups()
-                    formatted_line = f"{index} ({lavozim}) – {ism}, {translate_text('bu_oy_uchun_hisobotda', lang)}: {shu_oy} {translate_text('so‘m', lang)} ({translate_text('yil_boshidan_hisobotda', lang)}: {yil_boshidan} {translate_text('so‘m', lang)})"
+                    formatted_line = f"{index} ({lavozim}) – {ism}, {get_text(lang, 'bu_oy_uchun_hisobotda')}: {shu_oy} {get_text(lang, 'som')} ({get_text(lang, 'yil_boshidan_hisobotda')}: {yil_boshidan} {get_text(lang, 'som')})"
                     formatted_xodimlar_data.append(formatted_line)
                 else:
                     formatted_xodimlar_data.append(line)
@@ -368,12 +263,12 @@ async def send_report_files(stir, soliq_turi, oy, user_id, lang):
 @dp.callback_query_handler(lambda c: c.data.startswith("soliq_"))
 async def select_month_handler(callback_query: types.CallbackQuery):
     user_id = callback_query.from_user.id
-    lang = get_user_language(user_id)
+    lang = await db.get_user_language(user_id)
     _, soliq_turi, stir = callback_query.data.split("_")
 
     # Inline keyboard yaratish
     keyboard = InlineKeyboardMarkup(row_width=3)
-    oylar = ["yanvar", "fevral", "mart", "aprel", "may", "iyun", "iyul"]
+    oylar = MONTHS
     for oy in oylar:
         keyboard.insert(InlineKeyboardButton(get_month_name(lang, oy), callback_data=f"hisobot_{soliq_turi}_{stir}_{oy}"))
 
@@ -381,10 +276,10 @@ async def select_month_handler(callback_query: types.CallbackQuery):
     await callback_query.message.edit_reply_markup(reply_markup=None)
 
     # Yangisini yuborish
-    soliq_turi_text = translate_text(
-        "Daromad solig'i" if soliq_turi == "daromad" else
-        "Yagona soliq" if soliq_turi == "yagona" else
-        "Qo‘shilgan qiymat solig‘i", lang
+    soliq_turi_text = get_text(lang,
+        'btn_daromad' if soliq_turi == "daromad" else
+        'btn_yagona' if soliq_turi == "yagona" else
+        'btn_qqs'
     )
     await bot.send_message(
         callback_query.from_user.id,
@@ -398,7 +293,7 @@ async def select_month_handler(callback_query: types.CallbackQuery):
 async def process_report_files(callback_query: types.CallbackQuery):
     await bot.answer_callback_query(callback_query.id)
     user_id = callback_query.from_user.id
-    lang = get_user_language(user_id)
+    lang = await db.get_user_language(user_id)
     logger.info(f"process_report_files: user_id={user_id}, lang={lang}")
     _, soliq_turi, stir, oy = callback_query.data.split("_")
 
@@ -410,9 +305,9 @@ async def process_report_files(callback_query: types.CallbackQuery):
 
     # Soliq turiga qarab qo‘shimcha ma'lumotlar
     if soliq_turi == "daromad":
-        report = get_manual_report(stir, oy)
+        report = await db.get_manual_report(stir, oy)
         if report:
-            _, _, _, firma_name, xodimlar_soni, xodimlar_data, hisobot_davri_oylik, jami_oylik, soliq = report
+            firma_name, xodimlar_soni, xodimlar_data, hisobot_davri_oylik, jami_oylik, soliq = report
             # Xodimlar ma'lumotlarini qayta formatlash
             xodimlar_lines = xodimlar_data.split("\n")
             formatted_xodimlar_data = []
@@ -420,7 +315,7 @@ async def process_report_files(callback_query: types.CallbackQuery):
                 match = re.match(r'^(\d+) \((.*?)\) – (.*?), (.*?): ([\d,]+) (.*?)\s*\((.*?): ([\d,]+) (.*?)\)$', line)
                 if match:
                     index, lavozim, ism, _, shu_oy, _, _, yil_boshidan, _ = match.groups()
-                    formatted_line = f"{index} ({lavozim}) – {ism}, {translate_text('bu_oy_uchun_hisobotda', lang)}: {shu_oy} {translate_text('so‘m', lang)} ({translate_text('yil_boshidan_hisobotda', lang)}: {yil_boshidan} {translate_text('so‘m', lang)})"
+                    formatted_line = f"{index} ({lavozim}) – {ism}, {get_text(lang, 'bu_oy_uchun_hisobotda')}: {shu_oy} {get_text(lang, 'som')} ({get_text(lang, 'yil_boshidan_hisobotda')}: {yil_boshidan} {get_text(lang, 'som')})"
                     formatted_xodimlar_data.append(formatted_line)
                 else:
                     formatted_xodimlar_data.append(line)
@@ -437,25 +332,25 @@ async def process_report_files(callback_query: types.CallbackQuery):
             await bot.send_message(callback_query.from_user.id, result)
         else:
             keyboard = InlineKeyboardMarkup(row_width=1)
-            keyboard.add(InlineKeyboardButton(translate_text("Admin panelda qo'lda kiritish", lang), callback_data="manual_input"))
+            keyboard.add(InlineKeyboardButton(get_text(lang, 'btn_admin_manual_input'), callback_data="manual_input"))
             await bot.send_message(
                 callback_query.from_user.id,
                 get_text(lang, 'no_manual_report', oy=get_month_name(lang, oy)),
                 reply_markup=keyboard
             )
     elif soliq_turi == "yagona":
-        firma_name = get_firma_name(stir)
+        firma_name = await db.get_firma_name(stir)
         summary = generate_yagona_summary(stir, oy, lang)
         await bot.send_message(callback_query.from_user.id, summary)
     elif soliq_turi == "qqs":
-        firma_name = get_firma_name(stir)
+        firma_name = await db.get_firma_name(stir)
         summary = generate_qqs_summary(stir, oy, lang)
         await bot.send_message(callback_query.from_user.id, summary)
 
     keyboard = InlineKeyboardMarkup(row_width=2)
     keyboard.add(
-        InlineKeyboardButton(translate_text("Soliq turini qayta tanlash", lang), callback_data=f"soliq_{soliq_turi}_{stir}"),
-        InlineKeyboardButton(translate_text("Boshqa firma tanlash", lang), callback_data="start")
+        InlineKeyboardButton(get_text(lang, 'btn_reselect_tax_type'), callback_data=f"soliq_{soliq_turi}_{stir}"),
+        InlineKeyboardButton(get_text(lang, 'btn_other_firma'), callback_data="start")
     )
     await bot.send_message(callback_query.from_user.id, get_text(lang, 'back_options'), reply_markup=keyboard)
 
@@ -464,42 +359,42 @@ async def process_report_files(callback_query: types.CallbackQuery):
 async def restart_handler(callback_query: types.CallbackQuery):
     await bot.answer_callback_query(callback_query.id)
     user_id = callback_query.from_user.id
-    lang = get_user_language(user_id)
+    lang = await db.get_user_language(user_id)
     logger.info(f"restart_handler: user_id={user_id}, lang={lang}")
     await bot.send_message(callback_query.from_user.id, get_text(lang, 'welcome'))
 
 @dp.message_handler(commands=['search_firma'])
 async def search_firma_command(message: types.Message):
     user_id = message.from_user.id
-    lang = get_user_language(user_id)
+    lang = await db.get_user_language(user_id)
     logger.info(f"search_firma_command: user_id={user_id}, lang={lang}")
-    await message.answer(translate_text("Firma STIR raqamini kiriting (9 raqam, masalan: 123456789):", lang))
+    await message.answer(get_text(lang, 'enter_stir'))
     await SearchFirma.waiting_for_stir.set()
 
 @dp.message_handler(state=SearchFirma.waiting_for_stir)
 async def process_firma_search(message: types.Message, state: FSMContext):
     user_id = message.from_user.id
-    lang = get_user_language(user_id)
+    lang = await db.get_user_language(user_id)
     stir = message.text.strip()
     logger.info(f"STIR kiritildi: '{stir}', uzunligi: {len(stir)}, faqat raqamlar: {stir.isdigit()}")
 
     if not stir.isdigit() or len(stir) != 9:
-        await message.answer(translate_text("❌ STIR 9 raqamdan iborat bo'lishi kerak.", lang))
+        await message.answer(get_text(lang, 'stir_must_be_9_digits'))
         logger.error(f"Noto'g'ri STIR formati: '{stir}'")
         await state.finish()
         return
 
-    firma_info = get_firma_info(stir)
+    firma_info = await db.get_firma_info(stir)
     if not firma_info:
-        await message.answer(translate_text("❌ Bu STIR bo'yicha firma topilmadi.", lang))
+        await message.answer(get_text(lang, 'invalid_stir'))
         logger.warning(f"Firma topilmadi: STIR={stir}")
         await state.finish()
         return
 
     name, rahbar, soliq_turi, ds_stavka, ys_stavka, qqs_stavka = firma_info
     logger.info(f"Firma topildi: STIR={stir}, Name={name}, Rahbar={rahbar}, Soliq turi={soliq_turi}")
-    firma_nomi = translate_text(name, lang)
-    rahbar = translate_text(rahbar, lang) if rahbar else "Noma'lum"
+    firma_nomi, rahbar = await db.get_firma_display(stir, lang)
+    rahbar = rahbar or "Noma'lum"
     soliq_turi = translate_text(soliq_turi, lang) if soliq_turi else "Noma'lum"
     ds_stavka = ds_stavka if ds_stavka else "Noma'lum"
     ys_stavka = ys_stavka if ys_stavka else "Noma'lum"
@@ -519,8 +414,9 @@ async def process_firma_search(message: types.Message, state: FSMContext):
 
 
 import re
-import unicodedata
 from converters import convert_to_latin, convert_to_cyrillic
+import search_index
+import result_pages
 
 
 
@@ -539,6 +435,36 @@ async def start_name_search(message: types.Message, state: FSMContext):
     await message.answer("🔎 Firma nomini yoki STIR’ini kiriting (Lotin/Kirill farqsiz):")
     await ManualInput.search.set()
 
+
+@dp.inline_handler()
+async def inline_firm_search(inline_query: types.InlineQuery):
+    """@bot <so'rov> - firma kartochkalari; tanlanganda STIR xabar sifatida
+    yuboriladi va select_tax_type odatdagidek ishlaydi."""
+    query = inline_query.query.strip()
+    user_id = inline_query.from_user.id
+    if user_id in ADMIN_IDS:
+        firms = await search_index.find_firms_cached(query, INLINE_RESULTS) if query else []
+    elif query.isdigit() and len(query) == 9 and await db.get_firma_info(query):
+        # Nom bo'yicha qidiruv faqat adminlar uchun, boshqalarga STIR yozilgandagi natija
+        firms = [(query, None)]
+    else:
+        firms = []
+
+    lang = await db.get_user_language(user_id)
+    results = []
+    for stir, _ in firms:
+        firma_nomi, rahbar = await db.get_firma_display(stir, lang)
+        results.append(types.InlineQueryResultArticle(
+            id=stir,
+            title=firma_nomi or stir,
+            description=get_text(lang, 'inline_firma_description', stir=stir,
+                                 rahbar=rahbar or get_text(lang, 'unknown')),
+            input_message_content=types.InputTextMessageContent(stir),
+        ))
+    # Natija foydalanuvchiga bog'liq (admin/oddiy, til), shuning uchun is_personal
+    await bot.answer_inline_query(inline_query.id, results, cache_time=INLINE_CACHE_TIME,
+                                  is_personal=True)
+
 class VerifyOwnerPhone(StatesGroup):
     waiting_for_phone = State()
 
@@ -548,7 +474,7 @@ class VerifyOwnerPhone(StatesGroup):
 async def handle_select_firma(callback_query: types.CallbackQuery, state: FSMContext):
     await bot.answer_callback_query(callback_query.id)
     user_id = callback_query.from_user.id
-    lang = get_user_language(user_id)
+    lang = await db.get_user_language(user_id)
 
     # callback_data: select_firma_123456789
     try:
@@ -557,40 +483,40 @@ async def handle_select_firma(callback_query: types.CallbackQuery, state: FSMCon
         await bot.send_message(user_id, "❌ Noto‘g‘ri format.")
         return
 
-    firma_info = get_firma_info(stir)
+    firma_info = await db.get_firma_info(stir)
     if not firma_info:
-        await bot.send_message(user_id, translate_text("❌ Bu STIR bo‘yicha firma topilmadi.", lang))
+        await bot.send_message(user_id, get_text(lang, 'stir_not_found'))
         return
 
     # Tanlangan firmaga hozirgi “soliq turini tanlash” logikasini qayta ishlatamiz:
     name, rahbar, soliq_turi, ds_stavka, ys_stavka, qqs_stavka = firma_info
     soliq_turi = soliq_turi.lower() if soliq_turi else 'ds-ys'
     keyboard = InlineKeyboardMarkup(row_width=2)
-    soliq_turlari = soliq_turi.split('-') if soliq_turi else ['ds', 'ys']
+    flags = await db.get_soliq_flags(stir)
 
-    if 'ds' in soliq_turlari:
-        keyboard.add(InlineKeyboardButton(translate_text("Daromad solig'i", lang), callback_data=f"soliq_daromad_{stir}"))
-    if 'ys' in soliq_turlari:
-        keyboard.add(InlineKeyboardButton(translate_text("Yagona soliq", lang), callback_data=f"soliq_yagona_{stir}"))
-    if 'qqs' in soliq_turlari:
-        keyboard.add(InlineKeyboardButton(translate_text("Qo‘shilgan qiymat solig‘i", lang), callback_data=f"soliq_qqs_{stir}"))
+    if flags & SOLIQ_DS:
+        keyboard.add(InlineKeyboardButton(get_text(lang, 'btn_daromad'), callback_data=f"soliq_daromad_{stir}"))
+    if flags & SOLIQ_YS:
+        keyboard.add(InlineKeyboardButton(get_text(lang, 'btn_yagona'), callback_data=f"soliq_yagona_{stir}"))
+    if flags & SOLIQ_QQS:
+        keyboard.add(InlineKeyboardButton(get_text(lang, 'btn_qqs'), callback_data=f"soliq_qqs_{stir}"))
 
 
 
     keyboard.add(
-        InlineKeyboardButton(translate_text("📄 Hujjatlarni ko‘rish", lang), callback_data=f"view_docs_{stir}")
+        InlineKeyboardButton(get_text(lang, 'btn_view_docs'), callback_data=f"view_docs_{stir}")
         )
 
     
     if not keyboard.inline_keyboard:
         keyboard.add(
-            InlineKeyboardButton(translate_text("Daromad solig'i", lang), callback_data=f"soliq_daromad_{stir}"),
-            InlineKeyboardButton(translate_text("Yagona soliq", lang), callback_data=f"soliq_yagona_{stir}")
+            InlineKeyboardButton(get_text(lang, 'btn_daromad'), callback_data=f"soliq_daromad_{stir}"),
+            InlineKeyboardButton(get_text(lang, 'btn_yagona'), callback_data=f"soliq_yagona_{stir}")
         )
 
-    firma_nomi = translate_text(name, lang)
-    rahbar_txt = translate_text(rahbar, lang) if rahbar else translate_text("Noma'lum", lang)
-    soliq_turi_text = translate_text(soliq_turi, lang) if soliq_turi else translate_text("Noma'lum", lang)
+    firma_nomi, rahbar_txt = await db.get_firma_display(stir, lang)
+    rahbar_txt = rahbar_txt or get_text(lang, 'unknown')
+    soliq_turi_text = translate_text(soliq_turi, lang) if soliq_turi else get_text(lang, 'unknown')
     ds_stavka = ds_stavka if ds_stavka else "Noma'lum"
     ys_stavka = ys_stavka if ys_stavka else "Noma'lum"
     qqs_stavka = qqs_stavka if qqs_stavka else "Noma'lum"
@@ -625,7 +551,6 @@ import glob
 
 
 from config import ADMIN_IDS
-from database import log_access_attempt, is_blocked
 
 
 
@@ -637,18 +562,18 @@ async def verify_phone_and_send_docs(message: types.Message, state: FSMContext):
     data = await state.get_data()
     user_id = message.from_user.id
     stir = data['stir']
-    real_phone = get_owner_phone(stir)
+    real_phone = await db.get_owner_phone(stir)
 
     # ✅ Admin uchun cheklov yo'q
     if user_id not in ADMIN_IDS:
         # ✅ Cheklov tekshirish
-        if is_blocked(stir, user_id):
+        if await db.is_blocked(stir, user_id):
             await message.answer("⛔ Ko‘p noto‘g‘ri urinish! 24 soatdan keyin yana urinib ko‘ring.")
             await state.finish()
             return
         
         # ✅ Har urinishni logga yozamiz
-        log_access_attempt(stir, entered_phone, user_id)
+        await db.log_access_attempt(stir, entered_phone, user_id)
 
     # Telefon tekshiruv
     if not real_phone:
@@ -711,7 +636,7 @@ async def process_new_phone(message: types.Message, state: FSMContext):
     data = await state.get_data()
     stir = data['stir']
 
-    update_firm_phone(stir, phone)
+    await db.update_firm_phone(stir, phone)
 
     await message.answer(f"✅ Telefon yangilandi!\n📌 STIR: {stir}\n📞 Yangi raqam: {phone}")
     await state.finish()
@@ -719,19 +644,10 @@ async def process_new_phone(message: types.Message, state: FSMContext):
 
 
 
-def _norm(s: str) -> str:
-    if not s:
-        return ""
-    # Unicode normalizatsiya + ortiqcha bo'shliqlarni yig'ish
-    s = unicodedata.normalize("NFKC", s)
-    s = re.sub(r"\s+", " ", s.strip())
-    return s
-
-
 @dp.message_handler(state=ManualInput.search, user_id=ADMIN_IDS)
 async def process_search(message: types.Message, state: FSMContext):
     user_id = message.from_user.id
-    lang = get_user_language(user_id)
+    lang = await db.get_user_language(user_id)
 
     raw_query = (message.text or "").strip()
 
@@ -739,18 +655,18 @@ async def process_search(message: types.Message, state: FSMContext):
     if raw_query.isdigit() and len(raw_query) == 9:
         stir = raw_query
         try:
-            firma_info = get_firma_info(stir)  # agar sync bo'lsa ham, shu yerda ishlayveradi
+            firma_info = await db.get_firma_info(stir)  # agar sync bo'lsa ham, shu yerda ishlayveradi
             if not firma_info:
-                await message.answer(translate_text("❌ Bu STIR bo‘yicha firma topilmadi.", lang))
+                await message.answer(get_text(lang, 'stir_not_found'))
                 await state.finish()
                 return
 
             name, rahbar, soliq_turi, ds_stavka, ys_stavka, qqs_stavka = firma_info
-            kb = build_tax_keyboard(lang, stir, (soliq_turi or 'ds-ys').lower())
+            kb = build_tax_keyboard(lang, stir, await db.get_soliq_flags(stir))
 
-            firma_nomi = translate_text(name, lang)
-            rahbar_txt = translate_text(rahbar, lang) if rahbar else translate_text("Noma'lum", lang)
-            soliq_turi_text = translate_text(soliq_turi, lang) if soliq_turi else translate_text("Noma'lum", lang)
+            firma_nomi, rahbar_txt = await db.get_firma_display(stir, lang)
+            rahbar_txt = rahbar_txt or get_text(lang, 'unknown')
+            soliq_turi_text = translate_text(soliq_turi, lang) if soliq_turi else get_text(lang, 'unknown')
 
             resp = get_text(lang, 'firma_info',
                             stir=stir, firma_nomi=firma_nomi, rahbar=rahbar_txt,
@@ -764,45 +680,21 @@ async def process_search(message: types.Message, state: FSMContext):
                                  reply_markup=kb, parse_mode='Markdown')
         except Exception:
             logging.exception("STIR search failed in ManualInput.search")
-            await message.answer(translate_text("❌ Qidiruvda xatolik. Keyinroq qayta urinib ko‘ring.", lang))
+            await message.answer(get_text(lang, 'search_error'))
         finally:
             await state.finish()
         return
     # --- /STIR branch ---
 
     # --- Nom bo‘yicha branch (sizdagi mavjud kod) ---
-    query = _norm(raw_query).lower()
-    query_lat = convert_to_latin(_norm(raw_query)).lower()
-    query_cyr = convert_to_cyrillic(_norm(raw_query)).lower()
-
     data = await state.get_data()
     search_context = data.get("search_context")
 
-    firms = get_all_firms()  # [(stir, name), ...]
-    filtered_firms = []
-    for stir, name in firms:
-        stir_s = str(stir).strip()
-        name_s = _norm(str(name) if name is not None else "")
-
-        name_lc = name_s.lower()
-        name_lat = convert_to_latin(name_s).lower()
-        name_cyr = convert_to_cyrillic(name_s).lower()
-
-        hit = (
-            query in stir_s or
-            query in name_lc or
-            query_lat in name_lc or
-            query in name_lat or
-            query in name_cyr or
-            query_cyr in name_lc or
-            query_lat in name_lat or
-            query_cyr in name_cyr
-        )
-        if hit:
-            filtered_firms.append((stir_s, name_s))
+    # Qidiruv indeksi (SEARCH_BACKEND): lotin/kirill farqsiz, eng moslari birinchi
+    filtered_firms = await search_index.find_firms(raw_query, result_pages.MAX_RESULTS)
 
     if not filtered_firms:
-        await message.answer(translate_text("❌ Qidiruv bo‘yicha firma topilmadi.", lang))
+        await message.answer(get_text(lang, 'search_no_results'))
         await state.finish()
         return
 
@@ -814,42 +706,84 @@ async def process_search(message: types.Message, state: FSMContext):
     )
     await bot.send_message(
         message.chat.id,
-        translate_text(f"🔎 Qidiruv natijalari (Sahifa {page}/{total_pages}):", lang),
+        get_text(lang, 'search_results_page', page=page, total_pages=total_pages),
         reply_markup=keyboard
     )
     await state.finish()
 
 
-def build_tax_keyboard(lang: str, stir: str, soliq_turi: str) -> InlineKeyboardMarkup:
+def build_tax_keyboard(lang: str, stir: str, flags: int) -> InlineKeyboardMarkup:
     keyboard = InlineKeyboardMarkup(row_width=2)
-    soliq_turlari = (soliq_turi or 'ds-ys').split('-')
-    if 'ds' in soliq_turlari:
-        keyboard.add(InlineKeyboardButton(translate_text("Daromad solig'i", lang),
+    if flags & SOLIQ_DS:
+        keyboard.add(InlineKeyboardButton(get_text(lang, 'btn_daromad'),
                                           callback_data=f"soliq_daromad_{stir}"))
-    if 'ys' in soliq_turlari:
-        keyboard.add(InlineKeyboardButton(translate_text("Yagona soliq", lang),
+    if flags & SOLIQ_YS:
+        keyboard.add(InlineKeyboardButton(get_text(lang, 'btn_yagona'),
                                           callback_data=f"soliq_yagona_{stir}"))
-    if 'qqs' in soliq_turlari:
-        keyboard.add(InlineKeyboardButton(translate_text("Qo‘shilgan qiymat solig‘i", lang),
+    if flags & SOLIQ_QQS:
+        keyboard.add(InlineKeyboardButton(get_text(lang, 'btn_qqs'),
                                           callback_data=f"soliq_qqs_{stir}"))
-    keyboard.add(InlineKeyboardButton(translate_text("📄 Hujjatlarni ko‘rish", lang),
+    keyboard.add(InlineKeyboardButton(get_text(lang, 'btn_view_docs'),
                                       callback_data=f"view_docs_{stir}"))
     return keyboard
 
 
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 
-def create_paginated_keyboard(items, prefix, page=1, lang="uz_latin", per_page=30):
+def create_paginated_keyboard(items, prefix, page=1, lang="uz_latin", per_page=result_pages.PAGE_SIZE):
     """
     items: [(stir, name), ...]
     prefix: masalan 'edit_firma' -> callback_data = 'edit_firma_{stir}'
+
+    Natijalar tugma matnlari bilan result_pages ga bir marta yoziladi, sahifa
+    tugmalari esa faqat token va offsetni olib yuradi (srch_{token}_{offset}).
     """
+    labels = [(stir, f"{name} ({stir})") for stir, name in items]
+    token = result_pages.put((labels, prefix, lang))
+    total_pages = max(1, (len(labels) + per_page - 1) // per_page)
+    page = max(1, min(page, total_pages))
+    return _search_page_keyboard(token, labels, prefix, lang, (page - 1) * per_page, per_page)
+
+
+def _search_page_keyboard(token, labels, prefix, lang, offset, per_page=result_pages.PAGE_SIZE):
     keyboard = InlineKeyboardMarkup(row_width=1)
+    for stir, label in labels[offset:offset + per_page]:
+        keyboard.add(InlineKeyboardButton(label, callback_data=f"{prefix}_{stir}"))
+
+    nav_buttons = []
+    if offset > 0:
+        nav_buttons.append(InlineKeyboardButton(get_text(lang, 'btn_prev'),
+                                                callback_data=f"srch_{token}_{max(0, offset - per_page)}"))
+    if offset + per_page < len(labels):
+        nav_buttons.append(InlineKeyboardButton(get_text(lang, 'btn_next'),
+                                                callback_data=f"srch_{token}_{offset + per_page}"))
+    if nav_buttons:
+        keyboard.row(*nav_buttons)
+
+    total_pages = max(1, (len(labels) + per_page - 1) // per_page)
+    return keyboard, offset // per_page + 1, total_pages
 
-    # Hozircha soddalik uchun pagination yo‘q — 30 taga cheklaymiz:
-    for stir, name in items[:per_page]:
-        text = f"{name} ({stir})"
-        keyboard.add(InlineKeyboardButton(text, callback_data=f"{prefix}_{stir}"))
 
-    # Qaytishda sahifa/umumiy sahifa 1/1 deymiz — qolgan kod o‘zgarmaydi
-    return keyboard, 1, 1
+@dp.callback_query_handler(lambda c: c.data.startswith("srch_"), user_id=ADMIN_IDS)
+async def search_results_page(callback_query: types.CallbackQuery):
+    try:
+        _, token, offset = callback_query.data.split("_")
+        offset = int(offset)
+    except ValueError:
+        await callback_query.answer()
+        return
+
+    entry = result_pages.get(token)
+    if entry is None:
+        lang = await db.get_user_language(callback_query.from_user.id)
+        await callback_query.answer(get_text(lang, 'search_results_expired'), show_alert=True)
+        return
+
+    labels, prefix, lang = entry
+    offset = max(0, min(offset, len(labels) - 1))
+    keyboard, page, total_pages = _search_page_keyboard(token, labels, prefix, lang, offset)
+    await callback_query.answer()
+    await callback_query.message.edit_text(
+        get_text(lang, 'search_results_page', page=page, total_pages=total_pages),
+        reply_markup=keyboard
+    )
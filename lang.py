@@ -1,3 +1,8 @@
+import re
+import threading
+from collections import OrderedDict
+
+from config import TRANSLATE_CACHE_SIZE
 from converters import convert_to_cyrillic, convert_to_latin
 
 LANGUAGES = {
@@ -40,7 +45,7 @@ LANGUAGES = {
             "📋 *YAGONA SOLIQ HISOBOTI – {oy} OYI*\n\n"
             "💼 *Firma nomi*: {firma_nomi}\n"
             "👤 *Raxbar*: {rahbar}\n"
-            "📅 *Hisobot davri*: 2025-yil {oy}\n"
+            "📅 *Hisobot davri*: {yil}-yil {oy}\n"
             "📌 *Hisobot turi*: Aylanma tushumdan hisoblangan yagona soliq\n\n"
             "🔁 *Aylanma tushum (yil boshidan olingan jami aylanma)*: {yil_boshidan_aylanma} so‘m\n\n"
             "🔁 *Aylanma tushum (oy davomida olingan jami aylanma)*: {shu_oy_aylanma} so‘m\n\n"
@@ -58,7 +63,7 @@ LANGUAGES = {
             "📋 *QQS HISOBOTI – {oy} OYI*\n\n"
             "💼 *Firma nomi*: {firma_nomi}\n"
             "👤 *Raxbar*: {rahbar}\n"
-            "📅 *Hisobot davri*: 2025-yil {oy}\n"
+            "📅 *Hisobot davri*: {yil}-yil {oy}\n"
             "📌 *Hisobot turi*: Qo‘shilgan qiymat solig‘i (QQS)\n\n"
             "🔁 *Savdo tushum (yil davomida amalga oshirilgan savdo hajmi)*: {yil_boshidan_qqs} so‘m\n\n"
             "🔁 *Savdo tushum (oy davomida amalga oshirilgan savdo hajmi)*: {shu_oy_qqs} so‘m\n\n"
@@ -112,7 +117,7 @@ LANGUAGES = {
             "📋 *ЯГОНА СОЛИҚ ҲИСОБОТИ – {oy} ОЙИ*\n\n"
             "💼 *Фирма номи*: {firma_nomi}\n"
             "👤 *Раҳбар*: {rahbar}\n"
-            "📅 *Ҳисобот даври*: 2025-йил {oy}\n"
+            "📅 *Ҳисобот даври*: {yil}-йил {oy}\n"
             "📌 *Ҳисобот тури*: Айланма тушумдан ҳисобланган ягона солиқ\n\n"
             "🔁 *Айланма тушум (йил бошидан олинган жами айланма)*: {yil_boshidan_aylanma} сўм\n\n"
             "🔁 *Айланма тушум (ой давомида олинган жами айланма)*: {shu_oy_aylanma} сўм\n\n"
@@ -130,7 +135,7 @@ LANGUAGES = {
             "📋 *ҚҚС ҲИСОБОТИ – {oy} ОЙИ*\n\n"
             "💼 *Фирма номи*: {firma_nomi}\n"
             "👤 *Раҳбар*: {rahbar}\n"
-            "📅 *Ҳисобот даври*: 2025-йил {oy}\n"
+            "📅 *Ҳисобот даври*: {yil}-йил {oy}\n"
             "📌 *Ҳисобот тури*: Қўшилган қиймат солиғи (ҚҚС)\n\n"
             "🔁 *Савдо тушум (йил давомида амалга оширилган савдо ҳажми)*: {yil_boshidan_qqs} сўм\n\n"
             "🔁 *Савдо тушум (ой давомида амалга оширилган савдо ҳажми)*: {shu_oy_qqs} сўм\n\n"
@@ -147,26 +152,224 @@ LANGUAGES = {
     }
 }
 
+# --- Tugma va xabar matnlari ---
+# Handlerlardagi o'zgarmas matnlar. Kirill varianti import paytida bir marta
+# convert_to_cyrillic bilan yaratiladi, shuning uchun get_text(lang, kalit)
+# oddiy dict murojaati bo'ladi. {format} o'rinlari o'girilmaydi (_ui_cyrillic).
+UI_TEXTS = {
+    'btn_prev': '⬅️ Oldingi',
+    'btn_next': 'Keyingi ➡️',
+    'btn_search': '🔍 Qidirish',
+    'btn_back': '🔙 Orqaga',
+    'btn_back_to_admin': 'Admin paneliga qaytish',
+    'no_firms_now': '❌ Hozirda hech qanday firma mavjud emas.',
+    'firms_list_title': 'Firmalar ro‘yxati',
+    'page': 'Sahifa',
+    'btn_add_firma': "Yangi firma qo'shish",
+    'btn_add_firms_excel': "Excel orqali firmalar qo'shish",
+    'btn_edit_firma': 'Firma tahrirlash',
+    'btn_upload_files': 'Fayl yuklash',
+    'btn_manual_report': "Qo'lda hisobot kiritish",
+    'btn_delete_report': "Hisobot o'chirish",
+    'btn_list_firms': "Firmalar ro'yxati",
+    'btn_upload_firm_docs': '📎 Firma hujjat yuklash',
+    'admin_welcome': '🔒 Admin paneliga xush kelibsiz!',
+    'enter_firma_stir': '✍️ Firma STIR raqamini kiriting:',
+    'error_try_again': "❌ Xatolik yuz berdi, qayta urinib ko'ring.",
+    'btn_back_plain': 'Orqaga',
+    'message_text': 'Xabar matni',
+    'enter_new_firma_stir': 'Yangi firma STIR raqamini kiriting (9 raqam, masalan: 302824863):',
+    'operation_cancelled_admin': '✅ Amaliyot bekor qilindi, admin paneldasiz.',
+    'invalid_soliq_turi_format': "❌ Soliq turi 'ds-ys' yoki 'ds-qqs' bo'lishi kerak.",
+    'enter_firma_name': 'Firma nomini kiriting (kamida 3 belgi):',
+    'stir_must_be_9_digits': "❌ STIR 9 raqamdan iborat bo'lishi kerak.",
+    'stir_exists': '❌ Bu STIR allaqachon mavjud.',
+    'enter_soliq_turi': 'Soliq turini kiriting (ds-ys, ds-qqs):',
+    'no_firms_yet': '❌ Hozircha firmalar mavjud emas.',
+    'search_firma_prompt': 'Firma STIR yoki nomini kiriting (qisman moslik uchun):',
+    'firma_name_too_short': "❌ Firma nomi kamida 3 ta belgidan iborat bo'lishi kerak.",
+    'db_error': "❌ Ma'lumotlar bazasida xato yuz berdi.",
+    'firma_not_found': '❌ Firma topilmadi.',
+    'unknown': "Noma'lum",
+    'choose_tax_type': 'Soliq turini tanlang',
+    'btn_daromad': "Daromad solig'i",
+    'btn_yagona': 'Yagona soliq',
+    'btn_qqs': 'Qo‘shilgan qiymat solig‘i',
+    'upload_which_month': 'Fayllarni qaysi oy uchun yuklamoqchisiz?',
+    'no_stir_restart': "❌ STIR ma'lumoti yo'q. Iltimos, qayta boshlang.",
+    'upload_excel1': '1-Excel faylni yuklang (.xlsx):',
+    'col_stir': 'STIR',
+    'col_oy': 'Oy',
+    'col_firma_nomi': 'Firma nomi',
+    'col_rahbar': 'Raxbar',
+    'col_soliq_turi_yagona': 'Soliq turi yagona',
+    'col_yil_boshidan_aylanma': 'Yil boshidan aylanma',
+    'col_shu_oy_aylanma': 'Shu oy uchun aylanma',
+    'col_xodim_lavozimi': 'Xodim lavozimi',
+    'col_ism_familyasi': 'Ism Familyasi',
+    'col_yil_boshidan': 'Yil boshidan',
+    'col_shu_oy_oylik': 'Shu Oy uchun oylik',
+    'only_xlsx': '❌ Faqat .xlsx fayllarni yuklang.',
+    'excel1_uploaded_send_excel2': '✅ 1-Excel fayl yuklangan, endi 2-Excel faylni yuklang (.xlsx). Bekor qilish uchun /cancel bosing.',
+    'missing_upload_data': "❌ STIR, soliq turi yoki oy ma'lumotlari yo'q. Qayta boshlang.",
+    'upload_html_xlsx_or_cancel': 'html_xlsx faylni yuklang yoki /cancel bosib amaliyotni bekor qilin',
+    'only_html': '❌ Faqat .html fayllarni yuklang.',
+    'missing_upload_data_user': "❌ STIR, soliq turi, oy yoki user_id ma'lumotlari yo'q. Qayta boshlang.",
+    'delete_which_month': "Qaysi oyning hisobotini o'chirishni xohlaysiz?",
+    'btn_confirm_delete': "Ha, o'chirish",
+    'btn_cancel_delete': "Yo'q, bekor qilish",
+    'delete_cancelled': "❌ O'chirish bekor qilindi.",
+    'manual_choose_tax_type': 'Hisobot kiritish uchun soliq turini tanlang:',
+    'btn_upload_excel': 'Excel fayl yuklash',
+    'btn_manual_input': "Qo'lda kiritish",
+    'upload_xlsx_or_cancel': 'xlsx faylni yuklang yoki /cancel bosib amaliyotni bekor qilin',
+    'invalid_soliq_turi': "❌ Noto'g'ri soliq turi.",
+    'search_excel_firma_prompt': 'Excel faylidagi firma STIR yoki nomini kiriting (qisman moslik uchun):',
+    'invalid_stir_restart': "❌ Noto'g'ri STIR formati. /admin orqali qayta boshlang.",
+    'invalid_month_restart': "❌ Noto'g'ri oy formati. /admin orqali qayta boshlang.",
+    'btn_confirm': 'Tasdiqlash',
+    'btn_edit': 'Tahrirlash',
+    'btn_cancel': 'Bekor qilish',
+    'confirm_question': 'Tasdiqlaysizmi?',
+    'manual_which_month': 'Qaysi oy uchun hisobot kiritmoqchisiz?',
+    'error_restart_admin': '❌ Xatolik yuz berdi. /admin orqali qayta boshlang.',
+    'bu_oy_uchun_hisobotda': 'bu_oy_uchun_hisobotda',
+    'som': 'so‘m',
+    'yil_boshidan_hisobotda': 'yil_boshidan_hisobotda',
+    'aylanma_not_number': "❌ Aylanma summalari raqam bo'lishi kerak.",
+    'qqs_not_number': "❌ QQS summalari raqam bo'lishi kerak.",
+    'xodimlar_soni_positive': "❌ Xodimlar soni 0 dan katta bo'lishi kerak.",
+    'xodimlar_soni_not_number': "❌ Xodimlar soni raqam bo'lishi kerak.",
+    'firma_name_missing_restart': '❌ Firma nomi topilmadi. Iltimos, qayta boshlang.',
+    'report_saved_excel_failed': '⚠️ Hisobot saqlandi, lekin Excel fayllarini yaratishda xato yuz berdi.',
+    'invalid_soliq_turi_restart': "❌ Noto'g'ri soliq turi. Iltimos, qayta boshlang.",
+    'report_input_cancelled': '❌ Hisobot kiritish bekor qilindi.',
+    'search_no_results': '❌ Qidiruv bo‘yicha firma topilmadi.',
+    'btn_admin_manual_input': "Admin panelda qo'lda kiritish",
+    'btn_reselect_tax_type': 'Soliq turini qayta tanlash',
+    'btn_other_firma': 'Boshqa firma tanlash',
+    'enter_stir': 'Firma STIR raqamini kiriting (9 raqam, masalan: 123456789):',
+    'stir_not_found': '❌ Bu STIR bo‘yicha firma topilmadi.',
+    'btn_view_docs': '📄 Hujjatlarni ko‘rish',
+    'search_error': '❌ Qidiruvda xatolik. Keyinroq qayta urinib ko‘ring.',
+    'inline_firma_description': 'STIR: {stir} · Rahbar: {rahbar}',
+    'search_results_page': '🔎 Qidiruv natijalari (Sahifa {page}/{total_pages}):',
+    'search_results_expired': '⌛ Qidiruv natijalari eskirgan. Iltimos, qayta qidiring.',
+    'enter_xodimlar_soni': "Xodimlar sonini kiriting (raqam bilan, masalan: 2):",
+    'enter_xodimlar_data': "Xodimlar ma'lumotlarini kiriting (har bir xodim uchun: raqam (lavozim) – shu oy summasi so'm (yil boshidan jami so'm), masalan:\n1 (Rahbar) – 0 so'm (5000000 so'm)\nHar bir xodimni alohida kiriting, 1-xodimdan boshlang:",
+    'reenter_yagona_data': "Yagona soliq ma'lumotlarini qayta kiriting (soliq stavkasi %, yil boshidan aylanma, shu oy aylanma, masalan: 4%, 10000000, 5000000):",
+    'invalid_rate': "❌ Noto'g'ri soliq stavkasi: {stavka} (0% dan 100% gacha bo'lishi kerak).",
+    'reenter_qqs_data': "QQS ma'lumotlarini qayta kiriting (soliq stavkasi %, yil boshidan QQS, shu oy QQS, masalan: 15%, 20000000, 10000000):",
+}
+LANGUAGES['uz_latin'].update(UI_TEXTS)
+def _ui_cyrillic(text):
+    # {stir} kabi o'rinlar nomi get_text(**kwargs) kalitlari bilan bir xil qolishi kerak
+    parts = re.split(r'(\{[a-z_]+\})', text)
+    return ''.join(part if i % 2 else convert_to_cyrillic(part) for i, part in enumerate(parts))
+
+
+LANGUAGES['uz_cyrillic'].update({key: _ui_cyrillic(text) for key, text in UI_TEXTS.items()})
+
 def get_text(lang, key, **kwargs):
     text = LANGUAGES.get(lang, LANGUAGES['uz_latin']).get(key, "Matn topilmadi")
     return text.format(**kwargs) if kwargs else text
 
+# Oylar kalitlari (bazada va callback_data da shu ko'rinishda saqlanadi)
+MONTHS = ['yanvar', 'fevral', 'mart', 'aprel', 'may', 'iyun',
+          'iyul', 'avgust', 'sentabr', 'oktabr', 'noyabr', 'dekabr']
+
+MONTH_NAMES = {
+    'uz_latin': dict(zip(MONTHS, ['Yanvar', 'Fevral', 'Mart', 'Aprel', 'May', 'Iyun',
+                                  'Iyul', 'Avgust', 'Sentabr', 'Oktabr', 'Noyabr', 'Dekabr'])),
+    'uz_cyrillic': dict(zip(MONTHS, ['Январ', 'Феврал', 'Март', 'Апрел', 'Май', 'Июн',
+                                     'Июл', 'Август', 'Сентябр', 'Октябр', 'Ноябр', 'Декабр'])),
+}
+
+# Exceldagi oy nomi (lotin yoki kirill, istalgan registrda) -> oy kaliti
+MONTH_ALIASES = {name.lower(): key for names in MONTH_NAMES.values() for key, name in names.items()}
+# Rus yozuvidagi yumshoq belgili shakllar (Январь, Сентябрь) va ularning lotinchasi
+# (Sentyabr, Oktyabr), shuningdek eski "Сентабр"/"Октабр" yozilishi
+MONTH_ALIASES.update({alias.lower(): key
+                      for key, name in MONTH_NAMES['uz_cyrillic'].items()
+                      for alias in (name + 'ь', convert_to_latin(name))})
+MONTH_ALIASES.update({'сентабр': 'sentabr', 'октабр': 'oktabr'})
+
+
+def normalize_month(oy):
+    """'Май', 'MAY', 'may' -> 'may'; noma'lum oy uchun None."""
+    return MONTH_ALIASES.get(str(oy).strip().lower())
+
+
 def get_month_name(lang, oy):
-    months = {
-        'uz_latin': {
-            'yanvar': 'Yanvar', 'fevral': 'Fevral', 'mart': 'Mart',
-            'aprel': 'Aprel', 'may': 'May', 'iyun': 'Iyun', 'iyul': 'Iyul'
-        },
-        'uz_cyrillic': {
-            'yanvar': 'Январ', 'fevral': 'Феврал', 'mart': 'Март',
-            'aprel': 'Апрел', 'may': 'Май', 'iyun': 'Июн', 'iyul': 'Июл'
-        }
-    }
-    return months.get(lang, months['uz_latin']).get(oy, oy)
+    return MONTH_NAMES.get(lang, MONTH_NAMES['uz_latin']).get(oy, oy)
+
+# --- Transliteratsiya keshi ---
+# Lavozimlar ("Rahbar", "Bosh hisobchi"), tugma matnlari va xabarlar ko'p
+# takrorlanadi, shuning uchun natijalar LRU keshda saqlanadi. Juda uzun
+# matnlar (foydalanuvchi kiritgan erkin matn) keshga qo'yilmaydi.
+
+TRANSLATE_CACHE_MAX_LEN = 256
+
+_translations = OrderedDict()   # (text, lang) -> natija
+_translations_lock = threading.Lock()
+_translation_stats = {'hits': 0, 'misses': 0}
+_CONVERTERS = {'uz_cyrillic': convert_to_cyrillic, 'uz_latin': convert_to_latin}
+
+
+def _cache_translation(key, result):
+    if len(key[0]) > TRANSLATE_CACHE_MAX_LEN:
+        return
+    with _translations_lock:
+        _translations[key] = result
+        _translations.move_to_end(key)
+        while len(_translations) > TRANSLATE_CACHE_SIZE:
+            _translations.popitem(last=False)
+
 
 def translate_text(text, lang):
-    if lang == 'uz_cyrillic':
-        return convert_to_cyrillic(text)
-    elif lang == 'uz_latin':
-        return convert_to_latin(text)
-    return text
\ No newline at end of file
+    convert = _CONVERTERS.get(lang)
+    if convert is None:
+        return text
+    key = (text, lang)
+    with _translations_lock:
+        result = _translations.get(key)
+        if result is not None:
+            _translations.move_to_end(key)
+            _translation_stats['hits'] += 1
+            return result
+        _translation_stats['misses'] += 1
+    result = convert(text)
+    _cache_translation(key, result)
+    return result
+
+
+def translate_many(texts, lang):
+    """Matnlar ro'yxatini bitta chaqiruvda tarjima qiladi (masalan, Excel ustuni).
+
+    Takrorlangan qiymatlar bir marta o'giriladi; tartib saqlanadi.
+    """
+    texts = list(texts)
+    convert = _CONVERTERS.get(lang)
+    if convert is None:
+        return texts
+    results = {}
+    with _translations_lock:
+        for text in texts:
+            if text in results:
+                continue
+            cached = _translations.get((text, lang))
+            if cached is not None:
+                _translations.move_to_end((text, lang))
+                _translation_stats['hits'] += 1
+            else:
+                _translation_stats['misses'] += 1
+            results[text] = cached
+    for text in [text for text, result in results.items() if result is None]:
+        results[text] = convert(text)
+        _cache_translation((text, lang), results[text])
+    return [results[text] for text in texts]
+
+
+def translation_cache_stats():
+    with _translations_lock:
+        return dict(_translation_stats, size=len(_translations), maxsize=TRANSLATE_CACHE_SIZE)
\ No newline at end of file
@@ -6,24 +6,45 @@ import os
 import handlers
 from aiogram import executor
 import logging
-from config import DATA_PATH
+from config import DATA_PATH, SEARCH_BACKEND
 import admin
-from database import init_db, init_security_tables, BLOCK_SECONDS  
-from database import cleanup_access_logs
+from database import init_db, init_security_tables, run_migrations, load_firm_registry, load_access_windows, has_firms_fts, BLOCK_SECONDS  
+import db
+import retention
+import search_index
+from middlewares import QueryCounterMiddleware
 
 async def scheduler():
     while True:
-        await cleanup_access_logs()
+        try:
+            await retention.run_retention()
+        except Exception as e:
+            logging.error(f"Retention xatosi: {e}")
         await asyncio.sleep(3600)  # 1 soat kutadi
 
 async def on_startup(dp):
+    db.start_audit_writer()
     asyncio.create_task(scheduler())
     print("✅ Background cleaner ishga tushdi")
 
+async def on_shutdown(dp):
+    await db.stop_audit_writer()
+    db.shutdown()
+
 
 logging.basicConfig(level=logging.INFO, filename="bot.log", encoding="utf-8")
+dp.middleware.setup(QueryCounterMiddleware())
 
 if __name__ == '__main__':
     init_db()  # Ma'lumotlar bazasini ishga tushirish
     init_security_tables()
-    executor.start_polling(dp, skip_updates=True, on_startup=on_startup)
\ No newline at end of file
+    run_migrations()
+    load_firm_registry()
+    if SEARCH_BACKEND == 'fts' and not has_firms_fts():
+        raise SystemExit("SEARCH_BACKEND=fts, lekin firms_fts yo'q (SQLite FTS5/trigram qo'llab-quvvatlanmaydi). "
+                         "SEARCH_BACKEND=memory ni ishlating yoki SQLite ni yangilang.")
+    if SEARCH_BACKEND == 'memory':
+        search_index.build()
+    load_access_windows()
+    retention.enable_incremental_vacuum()
+    executor.start_polling(dp, skip_updates=True, on_startup=on_startup, on_shutdown=on_shutdown)
\ No newline at end of file
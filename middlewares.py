@@ -0,0 +1,15 @@
+from aiogram.dispatcher.middlewares import BaseMiddleware
+
+import query_stats
+
+
+class QueryCounterMiddleware(BaseMiddleware):
+    """Har bir update uchun SQL so'rovlar sonini sanaydi (query_stats)."""
+
+    async def on_pre_process_update(self, update, data):
+        data['_query_counter'] = query_stats.begin_update()
+
+    async def on_post_process_update(self, update, result, data):
+        state = data.pop('_query_counter', None)
+        if state is not None:
+            query_stats.end_update(update.update_id, *state)
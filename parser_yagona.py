@@ -1,15 +1,27 @@
-import sqlite3
 import re
 import os
 import openpyxl
-from database import get_firma_name, check_firma, get_manual_report, check_file, get_user_language
-from config import DATA_PATH
-from lang import get_text, get_month_name, translate_text
-from converters import convert_to_cyrillic
+from database import get_firma_name, check_firma, get_manual_report, check_file, get_user_language, get_firma_info, get_firma_display
+from database import get_yagona_report, get_qqs_report, get_firma_rates
+from database import parse_rate_bp, format_rate, apply_rate, report_dir, LEGACY_REPORT_YEAR
+from config import DATA_PATH, REPORT_YEAR
+from lang import get_text, get_month_name, translate_text, normalize_month
 import logging
 
 logger = logging.getLogger(__name__)
 
+
+def find_report_file(stir, soliq_turi, file_name, yil=None):
+    """data/<stir>/<soliq_turi>/<yil>/ dagi fayl. Yil papkalaridan oldin
+    yuklangan fayllar eski data/<stir>/<soliq_turi>/ joyida qolgan."""
+    yil = yil or REPORT_YEAR
+    file_path = os.path.join(report_dir(stir, soliq_turi, yil), file_name)
+    if yil == LEGACY_REPORT_YEAR and not os.path.exists(file_path):
+        legacy_path = os.path.join(DATA_PATH, stir, soliq_turi, file_name)
+        if os.path.exists(legacy_path):
+            return legacy_path
+    return file_path
+
 def parse_yagona_excel(file_path, lang='uz_latin'):
     try:
         # Fayl mavjudligini tekshirish
@@ -43,25 +55,19 @@ def parse_yagona_excel(file_path, lang='uz_latin'):
                 continue
 
             # Oy ni kichik harfga aylantirish va kirill/lotinni qabul qilish
-            oy = str(oy).lower()
-            month_map = {
-                'январ': 'yanvar', 'феврал': 'fevral', 'март': 'mart', 
-                'апрел': 'aprel', 'май': 'may', 'июн': 'iyun', 'июл': 'iyul',
-                'yanvar': 'yanvar', 'fevral': 'fevral', 'mart': 'mart', 
-                'aprel': 'aprel', 'may': 'may', 'iyun': 'iyun', 'iyul': 'iyul'
-            }
-            oy = month_map.get(oy, oy)
-            if oy not in ['yanvar', 'fevral', 'mart', 'aprel', 'may', 'iyun', 'iyul']:
-                logger.warning(f"Noto'g'ri oy: {oy}, original: {row[1]}")
+            oy = normalize_month(oy)
+            if oy is None:
+                logger.warning(f"Noto'g'ri oy: {row[1]}")
+                continue
+            try:
+                soliq_bp = parse_rate_bp(soliq_turi_yagona)
+            except ValueError as e:
+                logger.warning(f"Noto'g'ri stavka: {e}, qator: {row}")
                 continue
 
             # Ma'lumotlarni tilga qarab tarjima qilish
-            if lang == 'uz_cyrillic':
-                firma_nomi = convert_to_cyrillic(firma_nomi)
-                rahbar = convert_to_cyrillic(rahbar)
-            else:
-                firma_nomi = translate_text(firma_nomi, lang)
-                rahbar = translate_text(rahbar, lang)
+            firma_nomi = translate_text(firma_nomi, lang)
+            rahbar = translate_text(rahbar, lang)
 
             key = (str(stir), oy)
             firms[key] = {
@@ -70,6 +76,7 @@ def parse_yagona_excel(file_path, lang='uz_latin'):
                 'firma_nomi': firma_nomi,
                 'rahbar': rahbar,
                 'soliq_turi_yagona': soliq_turi_yagona,
+                'soliq_bp': soliq_bp,
                 'yil_boshidan_aylanma': int(yil_boshidan_aylanma),
                 'shu_oy_aylanma': int(shu_oy_aylanma)
             }
@@ -116,25 +123,19 @@ def parse_qqs_excel(file_path, lang='uz_latin'):
                 continue
 
             # Oy ni kichik harfga aylantirish va kirill/lotinni qabul qilish
-            oy = str(oy).lower()
-            month_map = {
-                'январ': 'yanvar', 'феврал': 'fevral', 'март': 'mart', 
-                'апрел': 'aprel', 'май': 'may', 'июн': 'iyun', 'июл': 'iyul',
-                'yanvar': 'yanvar', 'fevral': 'fevral', 'mart': 'mart', 
-                'aprel': 'aprel', 'may': 'may', 'iyun': 'iyun', 'iyul': 'iyul'
-            }
-            oy = month_map.get(oy, oy)
-            if oy not in ['yanvar', 'fevral', 'mart', 'aprel', 'may', 'iyun', 'iyul']:
-                logger.warning(f"Noto'g'ri oy: {oy}, original: {row[1]}")
+            oy = normalize_month(oy)
+            if oy is None:
+                logger.warning(f"Noto'g'ri oy: {row[1]}")
+                continue
+            try:
+                soliq_bp = parse_rate_bp(soliq_turi_qqs)
+            except ValueError as e:
+                logger.warning(f"Noto'g'ri stavka: {e}, qator: {row}")
                 continue
 
             # Ma'lumotlarni tilga qarab tarjima qilish
-            if lang == 'uz_cyrillic':
-                firma_nomi = convert_to_cyrillic(firma_nomi)
-                rahbar = convert_to_cyrillic(rahbar)
-            else:
-                firma_nomi = translate_text(firma_nomi, lang)
-                rahbar = translate_text(rahbar, lang)
+            firma_nomi = translate_text(firma_nomi, lang)
+            rahbar = translate_text(rahbar, lang)
 
             key = (str(stir), oy)
             firms[key] = {
@@ -143,6 +144,7 @@ def parse_qqs_excel(file_path, lang='uz_latin'):
                 'firma_nomi': firma_nomi,
                 'rahbar': rahbar,
                 'soliq_turi_qqs': soliq_turi_qqs,
+                'soliq_bp': soliq_bp,
                 'yil_boshidan_qqs': int(yil_boshidan_qqs),
                 'shu_oy_qqs': int(shu_oy_qqs)
             }
@@ -158,42 +160,48 @@ def parse_qqs_excel(file_path, lang='uz_latin'):
 
 def generate_yagona_summary(stir, oy, lang='uz_latin'):
     try:
-        conn = sqlite3.connect(os.path.join(DATA_PATH, "bot.db"))
-        c = conn.cursor()
-        c.execute("SELECT name, rahbar, ys_stavka FROM firms WHERE stir = ?", (stir,))
-        result = c.fetchone()
-        conn.close()
+        result = get_firma_info(stir)
 
         if not result:
-            return translate_text("❌ Firma topilmadi.", lang)
+            return get_text(lang, 'firma_not_found')
 
-        firma_nomi, rahbar, ys_stavka = result
+        firma_nomi, rahbar = result[:2]
         if lang == 'uz_cyrillic':
-            firma_nomi = convert_to_cyrillic(firma_nomi)
-            rahbar = convert_to_cyrillic(rahbar)
-
-        # Tilga qarab fayl nomini tanlash
-        file_name = f"{get_month_name(lang, oy)}1.xlsx" if lang == 'uz_latin' else f"Май1.xlsx"
-        file_path = os.path.join(DATA_PATH, stir, "yagona", file_name)
-        logger.info(f"Yagona fayl yo‘li: {file_path}")
-
-        firms, error = parse_yagona_excel(file_path, lang)
-        if error or not firms:
-            return translate_text(f"❌ Yagona hisoboti uchun ma'lumot topilmadi: {error or 'Malumotlar topilmadi'}", lang)
-
-        key = (stir, oy.lower())
-        if key not in firms:
-            return translate_text(f"❌ {get_month_name(lang, oy)} uchun yagona hisoboti topilmadi.", lang)
-
-        firm = firms[key]
-        yil_boshidan_aylanma = firm['yil_boshidan_aylanma']
-        shu_oy_aylanma = firm['shu_oy_aylanma']
-        soliq_turi_yagona = firm['soliq_turi_yagona']
-        yagona_soliq = int(shu_oy_aylanma * (float(soliq_turi_yagona.strip('%')) / 100))
+            firma_nomi, rahbar = get_firma_display(stir, lang)
+
+        # Saqlangan hisobot bo'lsa summalar bazadan, stavka firmalar reyestridan
+        # olinadi; Excel fayl faqat bazada qator bo'lmaganda o'qiladi
+        report = get_yagona_report(stir, oy.lower())
+        if report:
+            _, _, soliq_turi_yagona, yil_boshidan_aylanma, shu_oy_aylanma, yagona_soliq = report
+            soliq_bp = get_firma_rates(stir)[1]
+            if soliq_bp is not None:
+                soliq_turi_yagona = f"{format_rate(soliq_bp)}%"
+                yagona_soliq = apply_rate(shu_oy_aylanma, soliq_bp)
+        else:
+            # Tilga qarab fayl nomini tanlash
+            file_name = f"{get_month_name(lang, oy)}1.xlsx"
+            file_path = find_report_file(stir, "yagona", file_name)
+            logger.info(f"Yagona fayl yo‘li: {file_path}")
+
+            firms, error = parse_yagona_excel(file_path, lang)
+            if error or not firms:
+                return translate_text(f"❌ Yagona hisoboti uchun ma'lumot topilmadi: {error or 'Malumotlar topilmadi'}", lang)
+
+            key = (stir, oy.lower())
+            if key not in firms:
+                return translate_text(f"❌ {get_month_name(lang, oy)} uchun yagona hisoboti topilmadi.", lang)
+
+            firm = firms[key]
+            yil_boshidan_aylanma = firm['yil_boshidan_aylanma']
+            shu_oy_aylanma = firm['shu_oy_aylanma']
+            soliq_turi_yagona = firm['soliq_turi_yagona']
+            yagona_soliq = apply_rate(shu_oy_aylanma, firm['soliq_bp'])
 
         return get_text(
             lang,
             'yagona_report',
+            yil=REPORT_YEAR,
             firma_nomi=firma_nomi,
             rahbar=rahbar,
             oy=get_month_name(lang, oy),
@@ -208,42 +216,48 @@ def generate_yagona_summary(stir, oy, lang='uz_latin'):
 
 def generate_qqs_summary(stir, oy, lang='uz_latin'):
     try:
-        conn = sqlite3.connect(os.path.join(DATA_PATH, "bot.db"))
-        c = conn.cursor()
-        c.execute("SELECT name, rahbar, qqs_stavka FROM firms WHERE stir = ?", (stir,))
-        result = c.fetchone()
-        conn.close()
+        result = get_firma_info(stir)
 
         if not result:
-            return translate_text("❌ Firma topilmadi.", lang)
+            return get_text(lang, 'firma_not_found')
 
-        firma_nomi, rahbar, qqs_stavka = result
+        firma_nomi, rahbar = result[:2]
         if lang == 'uz_cyrillic':
-            firma_nomi = convert_to_cyrillic(firma_nomi)
-            rahbar = convert_to_cyrillic(rahbar)
-
-        # Tilga qarab fayl nomini tanlash
-        file_name = f"{get_month_name(lang, oy)}1.xlsx" if lang == 'uz_latin' else f"Май1.xlsx"
-        file_path = os.path.join(DATA_PATH, stir, "qqs", file_name)
-        logger.info(f"QQS fayl yo‘li: {file_path}")
-
-        firms, error = parse_qqs_excel(file_path, lang)
-        if error or not firms:
-            return translate_text(f"❌ QQS hisoboti uchun ma'lumot topilmadi: {error or 'Malumotlar topilmadi'}", lang)
-
-        key = (stir, oy.lower())
-        if key not in firms:
-            return translate_text(f"❌ {get_month_name(lang, oy)} uchun QQS hisoboti topilmadi.", lang)
-
-        firm = firms[key]
-        yil_boshidan_qqs = firm['yil_boshidan_qqs']
-        shu_oy_qqs = firm['shu_oy_qqs']
-        soliq_turi_qqs = firm['soliq_turi_qqs']
-        qqs_soliq = int(shu_oy_qqs * (float(soliq_turi_qqs.strip('%')) / 100))
+            firma_nomi, rahbar = get_firma_display(stir, lang)
+
+        # Saqlangan hisobot bo'lsa summalar bazadan, stavka firmalar reyestridan
+        # olinadi; Excel fayl faqat bazada qator bo'lmaganda o'qiladi
+        report = get_qqs_report(stir, oy.lower())
+        if report:
+            _, _, soliq_turi_qqs, yil_boshidan_qqs, shu_oy_qqs, qqs_soliq = report
+            soliq_bp = get_firma_rates(stir)[2]
+            if soliq_bp is not None:
+                soliq_turi_qqs = f"{format_rate(soliq_bp)}%"
+                qqs_soliq = apply_rate(shu_oy_qqs, soliq_bp)
+        else:
+            # Tilga qarab fayl nomini tanlash
+            file_name = f"{get_month_name(lang, oy)}1.xlsx"
+            file_path = find_report_file(stir, "qqs", file_name)
+            logger.info(f"QQS fayl yo‘li: {file_path}")
+
+            firms, error = parse_qqs_excel(file_path, lang)
+            if error or not firms:
+                return translate_text(f"❌ QQS hisoboti uchun ma'lumot topilmadi: {error or 'Malumotlar topilmadi'}", lang)
+
+            key = (stir, oy.lower())
+            if key not in firms:
+                return translate_text(f"❌ {get_month_name(lang, oy)} uchun QQS hisoboti topilmadi.", lang)
+
+            firm = firms[key]
+            yil_boshidan_qqs = firm['yil_boshidan_qqs']
+            shu_oy_qqs = firm['shu_oy_qqs']
+            soliq_turi_qqs = firm['soliq_turi_qqs']
+            qqs_soliq = apply_rate(shu_oy_qqs, firm['soliq_bp'])
 
         return get_text(
             lang,
             'qqs_report',
+            yil=REPORT_YEAR,
             firma_nomi=firma_nomi,
             rahbar=rahbar,
             oy=get_month_name(lang, oy),
@@ -0,0 +1,110 @@
+"""SQL so'rovlar statistikasi.
+
+database.QUERIES dagi har bir nomlangan so'rov uchun chaqiruvlar soni, umumiy
+va p50/p95 vaqt hamda qaytgan qatorlar soni yig'iladi. begin_update() /
+end_update() bitta Telegram update nechta so'rov yuborganini sanaydi va
+QUERY_WARN_THRESHOLD dan oshganlarini (N+1) logga yozadi (bot tomonida
+middlewares.QueryCounterMiddleware chaqiradi). Admin /db_stats buyrug'i
+format_report() natijasini ko'rsatadi.
+
+aiogram ga bog'liq emas - database.py ni skriptlardan ham import qilish mumkin.
+"""
+import contextvars
+import logging
+import threading
+from collections import Counter, deque
+
+logger = logging.getLogger(__name__)
+
+LATENCY_SAMPLES = 1024      # har bir so'rov uchun oxirgi o'lchovlar
+QUERY_WARN_THRESHOLD = 10   # bitta update uchun ruxsat etilgan so'rovlar
+
+_stats = {}   # nom -> {'calls', 'total', 'rows', 'samples'}
+_lock = threading.Lock()
+_flagged = deque(maxlen=10)
+_flagged_total = 0
+
+# Joriy update uchun hisoblagich. DB oqimiga contextvars.copy_context() bilan
+# o'tadi; qiymat o'zgaruvchan Counter bo'lgani uchun oqimdagi yozuvlar
+# handler tomonida ham ko'rinadi.
+_update_queries = contextvars.ContextVar('update_queries', default=None)
+
+
+def record(name, seconds, rows):
+    with _lock:
+        entry = _stats.get(name)
+        if entry is None:
+            entry = _stats[name] = {'calls': 0, 'total': 0.0, 'rows': 0,
+                                    'samples': deque(maxlen=LATENCY_SAMPLES)}
+        entry['calls'] += 1
+        entry['total'] += seconds
+        entry['rows'] += rows
+        entry['samples'].append(seconds)
+    counter = _update_queries.get()
+    if counter is not None:
+        counter[name] += 1
+
+
+def _percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+
+def snapshot():
+    """So'rovlar statistikasi, umumiy vaqt bo'yicha kamayish tartibida."""
+    with _lock:
+        items = [(name, dict(entry, samples=list(entry['samples']))) for name, entry in _stats.items()]
+    result = []
+    for name, entry in items:
+        result.append({
+            'name': name,
+            'calls': entry['calls'],
+            'total_ms': entry['total'] * 1000,
+            'p50_ms': _percentile(entry['samples'], 0.50) * 1000,
+            'p95_ms': _percentile(entry['samples'], 0.95) * 1000,
+            'rows': entry['rows'],
+        })
+    result.sort(key=lambda item: item['total_ms'], reverse=True)
+    return result
+
+
+def reset():
+    global _flagged_total
+    with _lock:
+        _stats.clear()
+        _flagged.clear()
+        _flagged_total = 0
+
+
+def format_report(limit=20):
+    lines = ["📊 SQL so'rovlar statistikasi", ""]
+    for item in snapshot()[:limit]:
+        lines.append(
+            f"{item['name']}: {item['calls']} ta, jami {item['total_ms']:.1f} ms, "
+            f"p50 {item['p50_ms']:.2f} / p95 {item['p95_ms']:.2f} ms, {item['rows']} qator"
+        )
+    if len(lines) == 2:
+        lines.append("Hali so'rovlar yo'q")
+    lines.append("")
+    lines.append(f"⚠️ {QUERY_WARN_THRESHOLD} tadan ko'p so'rov yuborgan updatelar: {_flagged_total}")
+    for update_id, total, top in list(_flagged):
+        lines.append(f"update {update_id}: {total} ta ({top})")
+    return "\n".join(lines)
+
+
+def begin_update():
+    """Update boshlanishida: (hisoblagich, token); end_update() ga beriladi."""
+    counter = Counter()
+    return counter, _update_queries.set(counter)
+
+
+def end_update(update_id, counter, token):
+    global _flagged_total
+    _update_queries.reset(token)
+    total = sum(counter.values())
+    if total > QUERY_WARN_THRESHOLD:
+        top = ", ".join(f"{name} x{n}" for name, n in counter.most_common(3))
+        with _lock:
+            _flagged_total += 1
+            _flagged.append((update_id, total, top))
+        logger.warning(f"N+1 shubhasi: update {update_id} {total} ta so'rov yubordi ({top})")
@@ -0,0 +1,66 @@
+"""Qidiruv natijalarini sahifalash uchun server tomondagi vaqtinchalik ombor.
+
+Natijalar ro'yxati bir marta saqlanadi va qisqa token oladi; sahifa tugmalari
+callback_data da faqat token va offsetni olib yuradi (srch_{token}_{offset}),
+shuning uchun sahifa almashtirilganda qidiruv qayta bajarilmaydi. Yozuvlar
+TTL o'tgach yoki MAX_TOKENS dan oshganda eng uzoq ishlatilmagani o'chiriladi.
+"""
+import secrets
+import threading
+import time
+from collections import OrderedDict
+
+PAGE_SIZE = 10       # bitta sahifadagi tugmalar soni
+MAX_RESULTS = 200    # bitta qidiruvdan saqlanadigan eng ko'p natija
+TTL = 30 * 60        # token amal qiladigan vaqt (soniya)
+MAX_TOKENS = 1000    # bir vaqtda saqlanadigan natijalar soni
+
+_store = OrderedDict()   # token -> (muddati, qiymat); eng oxirgi ishlatilgani oxirida
+_lock = threading.Lock()
+
+
+def _purge(now):
+    # Eng eski yozuvlar boshida - muddati o'tmagani uchraganda to'xtaymiz
+    while _store:
+        token, (expires, _) = next(iter(_store.items()))
+        if expires > now:
+            break
+        del _store[token]
+
+
+def put(value):
+    """Qiymatni saqlaydi va uning tokenini qaytaradi (8 ta hex belgi)."""
+    now = time.monotonic()
+    with _lock:
+        _purge(now)
+        token = secrets.token_hex(4)
+        while token in _store:
+            token = secrets.token_hex(4)
+        _store[token] = (now + TTL, value)
+        while len(_store) > MAX_TOKENS:
+            _store.popitem(last=False)
+    return token
+
+
+def get(token):
+    """Token bo'yicha qiymat; topilmasa yoki muddati o'tgan bo'lsa None.
+
+    Har bir murojaat muddatni yangilaydi - foydalanuvchi varaqlab turgan
+    natijalar o'chib ketmaydi.
+    """
+    now = time.monotonic()
+    with _lock:
+        entry = _store.get(token)
+        if entry is None:
+            return None
+        if entry[0] <= now:
+            del _store[token]
+            return None
+        _store[token] = (now + TTL, entry[1])
+        _store.move_to_end(token)
+        return entry[1]
+
+
+def stats():
+    with _lock:
+        return {'tokens': len(_store)}
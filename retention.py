@@ -0,0 +1,109 @@
+"""Log jadvallarini tozalash (retention).
+
+Har bir jadval uchun siyosat: qaysi qatorlar eskirgan, ularni arxivlash
+kerakmi. Qatorlar BATCH_SIZE tadan o'chiriladi, har bir partiya alohida
+qisqa tranzaksiya, shuning uchun yozish lock uzoq ushlanmaydi va handlerlar
+so'rovlari partiyalar orasida bajarilib turadi. Oxirida incremental VACUUM
+bo'shagan sahifalarni fayl tizimiga qaytaradi.
+"""
+import gzip
+import json
+import logging
+import os
+import time
+
+import database
+import db
+from config import DATA_PATH
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_PATH = os.path.join(DATA_PATH, "archive")
+BATCH_SIZE = 500
+VACUUM_PAGES = 1000
+
+# (jadval, eskirganlik sharti, shart parametri, arxivlash)
+POLICIES = [
+    ('firm_access_log', "timestamp <= strftime('%s','now') - ?", database.BLOCK_SECONDS, False),
+    ('downloads_log', "downloaded_at < datetime('now', ?)", '-180 days', True),
+    ('security_alerts', "created_at < datetime('now', ?)", '-365 days', True),
+    # Kunlik hisoblagich faqat bugungi limit uchun kerak; xom yozuvlar downloads_log da
+    ('download_counters', "day < date('now', ?)", '-30 days', False),
+]
+
+# WITHOUT ROWID jadvallar partiyalarda asosiy kalit bo'yicha o'chiriladi
+ROW_KEYS = {'download_counters': 'phone, stir, day'}
+
+
+def _archive_rows(table, columns, rows):
+    os.makedirs(ARCHIVE_PATH, exist_ok=True)
+    path = os.path.join(ARCHIVE_PATH, f"{table}-{time.strftime('%Y%m')}.jsonl.gz")
+    # gzip "a" rejimi fayl oxiriga yangi blok qo'shadi, o'qishda hammasi bitta oqim
+    with gzip.open(path, "at", encoding="utf-8") as f:
+        for row in rows:
+            f.write(json.dumps(dict(zip(columns, row)), ensure_ascii=False, default=str) + "\n")
+
+
+def purge_batch(table, condition, param, archive):
+    """Bitta partiyani o'chiradi; o'chirilgan qatorlar sonini qaytaradi."""
+    conn = database.get_connection()
+    with conn:
+        if archive:
+            c = conn.execute(f"SELECT rowid, * FROM {table} WHERE {condition} ORDER BY rowid LIMIT ?",
+                             (param, BATCH_SIZE))
+            rows = c.fetchall()
+            if not rows:
+                return 0
+            columns = [d[0] for d in c.description][1:]
+            _archive_rows(table, columns, [row[1:] for row in rows])
+            conn.executemany(f"DELETE FROM {table} WHERE rowid = ?", [(row[0],) for row in rows])
+            return len(rows)
+        key = ROW_KEYS.get(table, 'rowid')
+        c = conn.execute(f"""
+            DELETE FROM {table} WHERE ({key}) IN (
+                SELECT {key} FROM {table} WHERE {condition} ORDER BY {key} LIMIT ?
+            )
+        """, (param, BATCH_SIZE))
+        return c.rowcount
+
+
+def enable_incremental_vacuum():
+    """auto_vacuum=INCREMENTAL ni yoqadi; eski bazada bir marta to'liq VACUUM kerak."""
+    conn = database.get_connection()
+    if conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2:
+        return
+    conn.commit()
+    conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+    conn.execute("VACUUM")
+    logger.info("auto_vacuum=INCREMENTAL yoqildi")
+
+
+def incremental_vacuum():
+    """Bo'sh sahifalarning bir qismini qaytaradi; qaytarilgan sahifalar soni."""
+    conn = database.get_connection()
+    before = conn.execute("PRAGMA freelist_count").fetchone()[0]
+    # execute() pragmani bir qadam bajaradi (bitta sahifa), executescript oxirigacha
+    conn.executescript(f"PRAGMA incremental_vacuum({VACUUM_PAGES})")
+    return before - conn.execute("PRAGMA freelist_count").fetchone()[0]
+
+
+async def run_retention():
+    """Hamma siyosatlarni bajaradi va hisobot qaytaradi."""
+    report = {}
+    started = time.monotonic()
+    for table, condition, param, archive in POLICIES:
+        table_started = time.monotonic()
+        deleted = 0
+        while True:
+            n = await db.run(purge_batch, table, condition, param, archive)
+            deleted += n
+            if n < BATCH_SIZE:
+                break
+        report[table] = {'deleted': deleted, 'archived': deleted if archive else 0,
+                         'seconds': round(time.monotonic() - table_started, 3)}
+    database.prune_access_windows()
+    pages = await db.run(incremental_vacuum)
+    report['vacuum_pages'] = pages
+    report['seconds'] = round(time.monotonic() - started, 3)
+    logger.info(f"Retention: {report}")
+    return report
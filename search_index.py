@@ -0,0 +1,223 @@
+"""Firmalarni nom va STIR bo'yicha qidirish uchun xotiradagi trigram indeks.
+
+Har bir firma uchun qidiruv kaliti - nomning kirill shakli (firms.name_cyrillic)
+kichik harfda qaytadan lotinga o'girilgan ko'rinishi. Shu tufayli lotin va
+kirill so'rovlar, shuningdek "h"/"x", "'"/"ʻ" kabi farqlar bir xil kalitga
+tushadi. Indeks: trigram -> STIR lar to'plami; STIR raqamlari ham shu indeksga
+kiradi; search_ranked() uchun so'z boshi/oxiri belgilangan trigramlar ham
+saqlanadi. Firmalar o'zgarganda database.on_firm_change orqali faqat o'zgargan
+firmalar qayta indekslanadi.
+"""
+import heapq
+import logging
+import sqlite3
+import threading
+from collections import Counter, OrderedDict
+
+import database
+import db
+from config import SEARCH_BACKEND
+from converters import convert_to_cyrillic, convert_to_latin, normalize_text
+
+logger = logging.getLogger(__name__)
+
+NGRAM = 3
+TOP_K = 50          # search_ranked() qaytaradigan eng ko'p natija
+MIN_SCORE = 0.4     # shundan past o'xshashlikdagi firmalar tashlab yuboriladi
+MEMO_SIZE = 512     # find_firms_cached() eslab qoladigan so'rovlar soni
+
+_postings = {}    # trigram -> {stir, ...}
+_entries = {}     # stir -> (kalit, ko'rsatiladigan nom)
+_lock = threading.Lock()
+_built = False
+_memo = OrderedDict()   # (kalit, limit) -> natijalar; eng oxirgi ishlatilgani oxirida
+_memo_lock = threading.Lock()
+_memo_stats = {'hits': 0, 'misses': 0}
+_memo_generation = 0    # har bir firma o'zgarishida oshadi
+
+
+def search_key(text):
+    """Matnni skriptdan qat'i nazar solishtiriladigan lotin shakliga keltiradi."""
+    # Avval kichik harf: 'ШАҲ' ham 'Шаҳ' kabi 'shah' bo'ladi
+    return convert_to_latin(convert_to_cyrillic(normalize_text(text).lower()))
+
+
+def _ngrams(text):
+    return {text[i:i + NGRAM] for i in range(len(text) - NGRAM + 1)}
+
+
+def _word_ngrams(text):
+    # So'zlar boshi/oxiri bilan ("  in", "st ") - xato yozilgan so'zlarni solishtirish uchun
+    grams = set()
+    for word in text.split():
+        grams |= _ngrams(f"  {word} ")
+    return grams
+
+
+def _index_ngrams(key, stir):
+    return _ngrams(key) | _word_ngrams(key) | _ngrams(stir) | _word_ngrams(stir)
+
+
+def _entry(stir):
+    info = database.get_firma_info(stir)
+    if info is None:
+        return None
+    names = database.get_firma_display(stir, 'uz_cyrillic')
+    key = convert_to_latin(names[0].lower()) if names[0] else ""
+    return key, normalize_text(str(info[0] or ""))
+
+
+def _remove(stir):
+    entry = _entries.pop(stir, None)
+    if entry is None:
+        return
+    for gram in _index_ngrams(entry[0], stir):
+        stirs = _postings.get(gram)
+        if stirs is not None:
+            stirs.discard(stir)
+            if not stirs:
+                del _postings[gram]
+
+
+def _add(stir, entry):
+    _entries[stir] = entry
+    for gram in _index_ngrams(entry[0], stir):
+        _postings.setdefault(gram, set()).add(stir)
+
+
+def build():
+    """Indeksni firmalar reyestridan to'liq quradi (bot ishga tushganda)."""
+    global _built
+    entries = {}
+    for stir, _ in database.get_all_firms():
+        entry = _entry(stir)
+        if entry is not None:
+            entries[stir] = entry
+    with _lock:
+        _postings.clear()
+        _entries.clear()
+        for stir, entry in entries.items():
+            _add(stir, entry)
+        _built = True
+    logger.info(f"Qidiruv indeksi qurildi: {len(entries)} ta firma, {len(_postings)} ta trigram")
+
+
+def _on_firm_change(stirs):
+    # Eslab qolingan natijalar eskiradi - indeks qurilmagan bo'lsa ham tozalanadi
+    global _memo_generation
+    with _memo_lock:
+        _memo.clear()
+        _memo_generation += 1
+    if not _built:
+        return
+    if stirs is None:
+        build()
+        return
+    updates = {str(stir): _entry(str(stir)) for stir in stirs}
+    with _lock:
+        for stir, entry in updates.items():
+            _remove(stir)
+            if entry is not None:
+                _add(stir, entry)
+
+
+database.on_firm_change(_on_firm_change)
+
+
+def _score(key, qgram_count, shared, stir, name_key):
+    """So'rov trigramlarining nomda topilgan ulushi + STIR va prefiks bonuslari."""
+    score = shared / qgram_count
+    if stir == key:
+        score += 10          # STIR to'liq mos - har doim birinchi
+    elif stir.startswith(key):
+        score += 2
+    elif key in stir:
+        score += 1
+    if key in name_key:
+        score += 0.5
+        if name_key.startswith(key):
+            score += 0.3
+        elif f" {key}" in name_key:
+            score += 0.15
+    return score
+
+
+def search_ranked(query, limit=TOP_K):
+    """Xatolarga chidamli qidiruv: eng mos `limit` ta firma [(stir, nom), ...].
+
+    O'xshashlik - so'rovning so'z trigramlaridan nechtasi firma kalitida
+    borligi. Natijalar bahosi bo'yicha heapq.nlargest bilan tanlanadi, shuning
+    uchun faqat eng yaxshi `limit` tasi saralanadi.
+    """
+    if not _built:
+        build()
+    key = search_key(query)
+    if not key:
+        return []
+    qgrams = _word_ngrams(key)
+    with _lock:
+        shared = Counter()
+        for gram in qgrams:
+            shared.update(_postings.get(gram, ()))
+        if len(key) < NGRAM:
+            # Qisqa so'rov so'z o'rtasida bo'lsa trigramlari mos kelmaydi
+            for stir, (name_key, _) in _entries.items():
+                if stir not in shared and (key in name_key or key in stir):
+                    shared[stir] = 0
+
+        def scored():
+            for stir, count in shared.items():
+                name_key, name = _entries[stir]
+                score = _score(key, len(qgrams), count, stir, name_key)
+                if score >= MIN_SCORE:
+                    # Teng bahoda qisqaroq nom (aniqroq moslik) oldin
+                    yield score, -len(name_key), stir, name
+
+        top = heapq.nlargest(limit, scored())
+    return [(stir, name) for _, _, stir, name in top]
+
+
+async def find_firms(query, limit=TOP_K):
+    """Handlerlar uchun qidiruv: SEARCH_BACKEND ga qarab xotiradagi indeks
+    yoki SQLite FTS5 (firms_fts). FTS5 mavjud bo'lmasa xotiradagi indeksga
+    qaytadi."""
+    if SEARCH_BACKEND == 'fts':
+        try:
+            return await db.search_firms(query, limit, 0)
+        except sqlite3.OperationalError as e:
+            logger.error(f"FTS qidiruvida xato, xotiradagi indeks ishlatiladi: {e}")
+    return search_ranked(query, limit)
+
+
+async def find_firms_cached(query, limit=TOP_K):
+    """find_firms() + oxirgi so'rovlar LRU keshi (inline rejim uchun).
+
+    Inline rejimda har bir bosilgan harf alohida so'rov bo'ladi, shuning uchun
+    bir xil prefikslar (o'chirib qayta yozish, bir nechta foydalanuvchi) qayta
+    qidirilmaydi. Firmalar o'zgarganda kesh _on_firm_change da tozalanadi.
+    """
+    memo_key = (search_key(query), limit)
+    with _memo_lock:
+        result = _memo.get(memo_key)
+        if result is not None:
+            _memo.move_to_end(memo_key)
+            _memo_stats['hits'] += 1
+            return result
+        _memo_stats['misses'] += 1
+        generation = _memo_generation
+    result = await find_firms(query, limit)
+    with _memo_lock:
+        # Qidiruv paytida firmalar o'zgargan bo'lsa natija keshga yozilmaydi
+        if generation == _memo_generation:
+            _memo[memo_key] = result
+            if len(_memo) > MEMO_SIZE:
+                _memo.popitem(last=False)
+    return result
+
+
+def stats():
+    with _lock:
+        result = {'firms': len(_entries), 'ngrams': len(_postings)}
+    with _memo_lock:
+        result.update(memo_size=len(_memo), **_memo_stats)
+    return result
@@ -0,0 +1,169 @@
+"""converters.py ning regex dvigatellarini eski (belgilab yuruvchi) amalga
+oshirish bilan solishtirish: natijalar bir xil bo'lishi kerak."""
+import random
+
+import pytest
+
+from converters import convert_to_cyrillic, convert_to_latin
+
+
+# --- Eski amalga oshirish (o'zgartirishsiz nusxa, faqat solishtirish uchun) ---
+
+def old_convert_to_cyrillic(text):
+    text = text.replace("'", 'ʻ').replace('‘', 'ʻ').replace('’', 'ʻ')
+
+    translit_map = {
+        # 'shch': 'щ',  # Olib tashlandi, chunki bu O‘zbek tilida kerak emas
+        'ch': 'ч', 'sh': 'ш', 'yo': 'ё', 'yu': 'ю', 'ya': 'я',
+        'oʻ': 'ў', 'gʻ': 'ғ', 'ʻ': 'ъ', 'a': 'а', 'b': 'б', 'v': 'в',
+        'g': 'г', 'd': 'д', 'e': 'е', 'z': 'з', 'i': 'и', 'y': 'й',
+        'k': 'к', 'l': 'л', 'm': 'м', 'n': 'н', 'o': 'о', 'p': 'п',
+        'r': 'р', 's': 'с', 't': 'т', 'u': 'у', 'f': 'ф', 'x': 'ҳ',
+        'ts': 'ц', 'q': 'қ', 'h': 'ҳ', 'j': 'ж'
+    }
+
+    sorted_keys = sorted(translit_map.keys(), key=lambda x: (-len(x), x))
+    result = []
+    i = 0
+
+    while i < len(text):
+        matched = False
+        for key in sorted_keys:
+            end = i + len(key)
+            if end > len(text):
+                continue
+            substring = text[i:end].lower()
+            if substring == key.lower():
+                base = translit_map[key]
+                original = text[i:end]
+                if original.isupper():
+                    converted = base.upper()
+                elif original.istitle():
+                    converted = base.capitalize()
+                else:
+                    converted = base.lower()
+                result.append(converted)
+                i = end
+                matched = True
+                break
+        if not matched:
+            result.append(text[i])
+            i += 1
+
+    return ''.join(result)
+
+
+def old_convert_to_latin(text):
+    translit_map = {
+        'Щ': 'Shch', 'щ': 'shch',
+        'Шаҳ': 'Shah', 'шаҳ': 'shah',  # Maxsus qayta ishlash
+        'Ш': 'Sh', 'ш': 'sh',
+        'Ч': 'Ch', 'ч': 'ch',
+        'Ў': 'Oʻ', 'ў': 'oʻ',
+        'Ғ': 'Gʻ', 'ғ': 'gʻ',
+        'Ҳ': 'X', 'ҳ': 'x',
+        'Қ': 'Q', 'қ': 'q',
+        'Ё': 'Yo', 'ё': 'yo',
+        'Ю': 'Yu', 'ю': 'yu',
+        'Я': 'Ya', 'я': 'ya',
+        'ъ': "'", 'ь': '',
+        'А': 'A', 'а': 'a',
+        'Б': 'B', 'б': 'b',
+        'В': 'V', 'в': 'v',
+        'Г': 'G', 'г': 'g',
+        'Д': 'D', 'д': 'd',
+        'Е': 'E', 'е': 'e',
+        'Ж': 'J', 'ж': 'j',
+        'З': 'Z', 'з': 'z',
+        'И': 'I', 'и': 'i',
+        'Й': 'Y', 'й': 'y',
+        'К': 'K', 'к': 'k',
+        'Л': 'L', 'л': 'l',
+        'М': 'M', 'м': 'm',
+        'Н': 'N', 'н': 'n',
+        'О': 'O', 'о': 'o',
+        'П': 'P', 'п': 'p',
+        'Р': 'R', 'р': 'r',
+        'С': 'S', 'с': 's',
+        'Т': 'T', 'т': 't',
+        'У': 'U', 'у': 'u',
+        'Ф': 'F', 'ф': 'f',
+        'Х': 'X', 'х': 'x',
+        'Ц': 'Ts', 'ц': 'ts',
+        'Ы': 'Y', 'ы': 'y',
+        'Э': 'E', 'э': 'e',
+    }
+
+    sorted_keys = sorted(translit_map.keys(), key=lambda x: (-len(x), x))
+    result = []
+    i = 0
+
+    while i < len(text):
+        matched = False
+        for key in sorted_keys:
+            end = i + len(key)
+            if end > len(text):
+                continue
+            substring = text[i:end]
+            if substring == key:
+                base = translit_map[key]
+                result.append(base)
+                i = end
+                matched = True
+                break
+        if not matched:
+            result.append(text[i])
+            i += 1
+
+    return ''.join(result)
+
+
+# --- Testlar ---
+
+# Lotin/kirill harflari, registrlar, apostrof turlari va .lower() da lotin
+# harfiga aylanadigan maxsus belgilar (Kelvin K, 'ſ', 'İ')
+ALPHABET = (
+    "abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ"
+    "абвгдеёжзийклмнопрстуфхцчшщъыьэюяўқғҳ"
+    "АБВГДЕЁЖЗИЙКЛМНОПРСТУФХЦЧШЩЫЭЮЯЎҚҒҲ"
+    "'‘’ʻ`"
+    "\u212a\u017f\u0130\u0131"
+    "0123456789 .,-\n"
+)
+FRAGMENTS = ["Шаҳ", "шаҳ", "ШАҲ", "Sh", "SH", "sH", "ch", "Ch", "O'", "o‘", "G’", "gʻ", "ts", "TS",
+             "yo", "Yu", "YA", "shch"]
+
+SPECIAL_CASES = [
+    "",
+    "Шаҳ", "шаҳ", "ШАҲ", "Шаҳзода", "Тошкент Шаҳар",
+    "\u212a", "\u212aarim", "\u212aH",     # Kelvin belgisi K
+    "\u017f", "\u017fh", "\u017fH",        # uzun s
+    "\u0130", "\u0130zmir", "\u0131",      # nuqtali I, nuqtasiz i
+    "O'zbekiston", "O‘zbekiston", "O’zbekiston", "Oʻzbekiston", "OʻZBEKISTON",
+    "G'ayrat", "g‘alla", "ma'no", "ta’lim", "san`at",
+    "Shcherbakov", "TSEX", "Choyxona", "YOSHLAR", "Yulduz",
+]
+
+
+def _random_text(rng):
+    parts = []
+    for _ in range(rng.randint(1, 8)):
+        if rng.random() < 0.3:
+            parts.append(rng.choice(FRAGMENTS))
+        else:
+            parts.append("".join(rng.choice(ALPHABET) for _ in range(rng.randint(1, 6))))
+    return "".join(parts)
+
+
+@pytest.mark.parametrize("text", SPECIAL_CASES)
+def test_special_cases_match_old(text):
+    assert convert_to_cyrillic(text) == old_convert_to_cyrillic(text)
+    assert convert_to_latin(text) == old_convert_to_latin(text)
+
+
+def test_random_mixed_script_matches_old():
+    rng = random.Random(20250101)
+    for _ in range(5000):
+        text = _random_text(rng)
+        assert convert_to_cyrillic(text) == old_convert_to_cyrillic(text), repr(text)
+        assert convert_to_latin(text) == old_convert_to_latin(text), repr(text)